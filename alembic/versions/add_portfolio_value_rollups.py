@@ -0,0 +1,85 @@
+"""Add portfolio value rollups
+
+Revision ID: 3c4d5e6f7a8b
+Revises: 2b3c4d5e6f7a
+Create Date: 2026-10-18 00:00:00.000000
+
+The rollups are recomputed from the existing snapshots on every upgrade,
+since the app may already have created the table (and written partial
+rollups) at startup.
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '3c4d5e6f7a8b'
+down_revision = '2b3c4d5e6f7a'
+branch_labels = None
+depends_on = None
+
+
+# Last-row columns: the value of the bucket's latest snapshot (ties go to the higher ID)
+LAST_COLUMNS = (
+    ('close_value', 'total_value'),
+    ('last_snapshot_id', 'id'),
+    ('daily_change_percent', 'daily_change_percent'),
+    ('monthly_change_percent', 'monthly_change_percent'),
+    ('yearly_change_percent', 'yearly_change_percent'),
+)
+
+
+def upgrade():
+    # The app creates its tables at startup, so the table may already exist
+    if not sa.inspect(op.get_bind()).has_table('portfolio_value_rollups'):
+        op.create_table('portfolio_value_rollups',
+            sa.Column('id', sa.Integer(), nullable=False),
+            sa.Column('portfolio_id', sa.Integer(), nullable=False),
+            sa.Column('period', sa.String(), nullable=False),
+            sa.Column('bucket', sa.DateTime(timezone=True), nullable=False),
+            sa.Column('first_date', sa.DateTime(timezone=True), nullable=False),
+            sa.Column('last_date', sa.DateTime(timezone=True), nullable=False),
+            sa.Column('open_value', sa.Float(), nullable=False),
+            sa.Column('close_value', sa.Float(), nullable=False),
+            sa.Column('high_value', sa.Float(), nullable=False),
+            sa.Column('low_value', sa.Float(), nullable=False),
+            sa.Column('snapshot_count', sa.Integer(), nullable=False),
+            sa.Column('last_snapshot_id', sa.Integer(), nullable=True),
+            sa.Column('daily_change_percent', sa.Float(), nullable=True),
+            sa.Column('monthly_change_percent', sa.Float(), nullable=True),
+            sa.Column('yearly_change_percent', sa.Float(), nullable=True),
+            sa.ForeignKeyConstraint(['portfolio_id'], ['portfolios.id'], ondelete='CASCADE'),
+            sa.ForeignKeyConstraint(['last_snapshot_id'], ['portfolio_snapshots.id'], ondelete='SET NULL'),
+            sa.PrimaryKeyConstraint('id'),
+            sa.UniqueConstraint('portfolio_id', 'period', 'bucket', name='uq_portfolio_value_rollups_bucket')
+        )
+        op.create_index(op.f('ix_portfolio_value_rollups_id'), 'portfolio_value_rollups', ['id'], unique=False)
+
+    # Backfill: rollups are derived from the snapshots, so rebuild them all in one pass per period
+    op.execute('DELETE FROM portfolio_value_rollups')
+    last_columns = ', '.join(
+        f'(array_agg({source} ORDER BY date DESC, id DESC))[1]' for _, source in LAST_COLUMNS
+    )
+    for period in ('day', 'week', 'month'):
+        op.execute(f"""
+            INSERT INTO portfolio_value_rollups (
+                portfolio_id, period, bucket, first_date, last_date, open_value,
+                high_value, low_value, snapshot_count, {', '.join(column for column, _ in LAST_COLUMNS)}
+            )
+            SELECT
+                portfolio_id, '{period}', date_trunc('{period}', date), min(date), max(date),
+                (array_agg(total_value ORDER BY date, id))[1],
+                max(total_value), min(total_value), count(*), {last_columns}
+            FROM portfolio_snapshots
+            WHERE portfolio_id IS NOT NULL AND date IS NOT NULL
+            GROUP BY portfolio_id, date_trunc('{period}', date)
+        """)
+
+
+def downgrade():
+    if not sa.inspect(op.get_bind()).has_table('portfolio_value_rollups'):
+        return
+
+    op.drop_index(op.f('ix_portfolio_value_rollups_id'), table_name='portfolio_value_rollups')
+    op.drop_table('portfolio_value_rollups')
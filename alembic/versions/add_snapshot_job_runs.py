@@ -0,0 +1,39 @@
+"""Add snapshot job runs
+
+Revision ID: 4d5e6f7a8b9c
+Revises: 3c4d5e6f7a8b
+Create Date: 2026-10-18 00:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '4d5e6f7a8b9c'
+down_revision = '3c4d5e6f7a8b'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # The app creates its tables at startup, so the table may already exist
+    if sa.inspect(op.get_bind()).has_table('snapshot_job_runs'):
+        return
+
+    op.create_table('snapshot_job_runs',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('scheduled_for', sa.DateTime(timezone=True), nullable=False),
+        sa.Column('claimed_at', sa.DateTime(timezone=True), server_default=sa.text('now()'), nullable=True),
+        sa.PrimaryKeyConstraint('id'),
+        sa.UniqueConstraint('scheduled_for')
+    )
+    op.create_index(op.f('ix_snapshot_job_runs_id'), 'snapshot_job_runs', ['id'], unique=False)
+
+
+def downgrade():
+    if not sa.inspect(op.get_bind()).has_table('snapshot_job_runs'):
+        return
+
+    op.drop_index(op.f('ix_snapshot_job_runs_id'), table_name='snapshot_job_runs')
+    op.drop_table('snapshot_job_runs')
@@ -0,0 +1,54 @@
+"""Add snapshot lookup indexes
+
+Revision ID: 2b3c4d5e6f7a
+Revises: 1a2b3c4d5e6f
+Create Date: 2026-10-18 00:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '2b3c4d5e6f7a'
+down_revision = '1a2b3c4d5e6f'
+branch_labels = None
+depends_on = None
+
+
+def _index_names(table_name):
+    # The snapshot tables (and, on new databases, these indexes) are created by the app
+    # at startup, so only add what is missing
+    inspector = sa.inspect(op.get_bind())
+    if not inspector.has_table(table_name):
+        return None
+    return {index['name'] for index in inspector.get_indexes(table_name)}
+
+
+def upgrade():
+    # Latest snapshot per portfolio before a date (period changes, metrics, history)
+    existing = _index_names('portfolio_snapshots')
+    if existing is not None and 'ix_portfolio_snapshots_portfolio_id_date' not in existing:
+        op.create_index(
+            'ix_portfolio_snapshots_portfolio_id_date',
+            'portfolio_snapshots',
+            ['portfolio_id', sa.text('date DESC')],
+            unique=False
+        )
+
+    # Asset rows of a snapshot
+    existing = _index_names('asset_snapshots')
+    if existing is not None and 'ix_asset_snapshots_snapshot_id' not in existing:
+        op.create_index(
+            op.f('ix_asset_snapshots_snapshot_id'), 'asset_snapshots', ['snapshot_id'], unique=False
+        )
+
+
+def downgrade():
+    existing = _index_names('asset_snapshots')
+    if existing and 'ix_asset_snapshots_snapshot_id' in existing:
+        op.drop_index(op.f('ix_asset_snapshots_snapshot_id'), table_name='asset_snapshots')
+
+    existing = _index_names('portfolio_snapshots')
+    if existing and 'ix_portfolio_snapshots_portfolio_id_date' in existing:
+        op.drop_index('ix_portfolio_snapshots_portfolio_id_date', table_name='portfolio_snapshots')
@@ -1,22 +1,23 @@
 from typing import List, Dict, Optional
-from fastapi import APIRouter, Depends, HTTPException, Body
+from fastapi import APIRouter, Depends, HTTPException, Body, Query
 from sqlalchemy.orm import Session
 
 from ..api import deps
+from ..core.config import settings
 from ..db.session import get_db
 from ..models.portfolio import Portfolio
 from ..services.risk_analyzer import RiskAnalyzer
-from ..services.market_data import MarketDataService
 
 router = APIRouter()
-market_data = MarketDataService()
-risk_analyzer = RiskAnalyzer(market_data)
 
 @router.get("/{portfolio_id}/risk")
 async def get_portfolio_risk_metrics(
     portfolio_id: int,
     days: int = 365,
+    fill_policy: str = Query("drop", regex="^(drop|ffill)$"),
+    correlation_format: str = Query("upper", regex="^(upper|matrix|nested)$"),
     db: Session = Depends(get_db),
+    risk_analyzer: RiskAnalyzer = Depends(deps.get_risk_analyzer),
     current_user = Depends(deps.get_current_user)
 ):
     """Get risk metrics for a portfolio"""
@@ -30,36 +31,144 @@ async def get_portfolio_risk_metrics(
         raise HTTPException(status_code=404, detail="Portfolio not found")
     
     try:
-        metrics = await risk_analyzer.calculate_portfolio_risk_metrics(db, portfolio_id, days)
+        metrics = await risk_analyzer.calculate_portfolio_risk_metrics(
+            db, portfolio_id, days,
+            fill_policy=fill_policy,
+            correlation_format=correlation_format
+        )
         return {"portfolio_id": portfolio_id, "metrics": metrics}
     except ValueError as e:
         raise HTTPException(status_code=400, detail=str(e))
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
+@router.get("/stats")
+async def get_analysis_stats(
+    risk_analyzer: RiskAnalyzer = Depends(deps.get_risk_analyzer),
+    current_user = Depends(deps.get_current_user)
+):
+    """Get analytics executor queue/run times and cache statistics"""
+    return risk_analyzer.get_stats()
+
+@router.get("/{portfolio_id}/var")
+async def get_value_at_risk(
+    portfolio_id: int,
+    days: int = 365,
+    confidence: List[float] = Query([0.95, 0.975, 0.99]),
+    horizon: int = Query(1, ge=1, le=252),
+    method: str = Query("historical", regex="^(historical|bootstrap|parametric)$"),
+    paths: int = Query(10000, ge=100, le=settings.RISK_SIMULATION_MAX_PATHS),
+    seed: Optional[int] = None,
+    fill_policy: str = Query("drop", regex="^(drop|ffill)$"),
+    db: Session = Depends(get_db),
+    risk_analyzer: RiskAnalyzer = Depends(deps.get_risk_analyzer),
+    current_user = Depends(deps.get_current_user)
+):
+    """Get Value at Risk and Expected Shortfall for a portfolio"""
+    # Check if portfolio belongs to current user
+    portfolio = db.query(Portfolio).filter(
+        Portfolio.id == portfolio_id,
+        Portfolio.user_id == current_user.id
+    ).first()
+    
+    if not portfolio:
+        raise HTTPException(status_code=404, detail="Portfolio not found")
+    
+    try:
+        result = await risk_analyzer.calculate_value_at_risk(
+            db, portfolio_id, days,
+            confidence_levels=tuple(confidence),
+            horizon=horizon,
+            method=method,
+            num_paths=paths,
+            seed=seed,
+            fill_policy=fill_policy
+        )
+        return {"portfolio_id": portfolio_id, "value_at_risk": result}
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+@router.get("/{portfolio_id}/frontier")
+async def get_efficient_frontier(
+    portfolio_id: int,
+    days: int = 365,
+    num_points: int = Query(50, ge=2, le=500),
+    max_allocations: Optional[str] = Query(
+        None,
+        description="Comma-separated weight caps by ticker or asset class, e.g. \"US Stocks:0.4,AAPL:0.1\""
+    ),
+    db: Session = Depends(get_db),
+    risk_analyzer: RiskAnalyzer = Depends(deps.get_risk_analyzer),
+    current_user = Depends(deps.get_current_user)
+):
+    """Get the efficient frontier over a portfolio's assets"""
+    # Check if portfolio belongs to current user
+    portfolio = db.query(Portfolio).filter(
+        Portfolio.id == portfolio_id,
+        Portfolio.user_id == current_user.id
+    ).first()
+    
+    if not portfolio:
+        raise HTTPException(status_code=404, detail="Portfolio not found")
+    
+    # Parse "name:fraction" pairs; names may contain spaces ("US Stocks")
+    caps = {}
+    for cap in (max_allocations or "").split(","):
+        if not cap.strip():
+            continue
+        name, _, value = cap.rpartition(":")
+        try:
+            caps[name.strip()] = float(value)
+        except ValueError:
+            name = ""
+        if not name.strip():
+            raise HTTPException(status_code=400, detail=f"Invalid maximum allocation: {cap.strip()}")
+    
+    try:
+        frontier = await risk_analyzer.calculate_efficient_frontier(
+            db, portfolio_id, days,
+            num_points=num_points,
+            max_allocations=caps
+        )
+        return {"portfolio_id": portfolio_id, "frontier": frontier}
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
 @router.post("/compare")
 async def compare_portfolios(
     portfolio_ids: List[int] = Body(...),
     days: int = 365,
+    fill_policy: str = Query("drop", regex="^(drop|ffill)$"),
+    correlation_format: str = Query("upper", regex="^(upper|matrix|nested)$"),
     db: Session = Depends(get_db),
+    risk_analyzer: RiskAnalyzer = Depends(deps.get_risk_analyzer),
     current_user = Depends(deps.get_current_user)
 ):
     """Compare multiple portfolios"""
-    # Check if all portfolios belong to current user
-    for portfolio_id in portfolio_ids:
-        portfolio = db.query(Portfolio).filter(
-            Portfolio.id == portfolio_id,
+    # Check if all portfolios belong to current user (one query for the whole batch)
+    owned_ids = {
+        portfolio_id for (portfolio_id,) in db.query(Portfolio.id).filter(
+            Portfolio.id.in_(portfolio_ids),
             Portfolio.user_id == current_user.id
-        ).first()
-        
-        if not portfolio:
+        ).all()
+    }
+    for portfolio_id in portfolio_ids:
+        if portfolio_id not in owned_ids:
             raise HTTPException(
                 status_code=404, 
                 detail=f"Portfolio with id {portfolio_id} not found or you don't have access to it"
             )
     
     try:
-        comparison = await risk_analyzer.compare_portfolios(db, portfolio_ids, days)
+        comparison = await risk_analyzer.compare_portfolios(
+            db, portfolio_ids, days,
+            fill_policy=fill_policy,
+            correlation_format=correlation_format
+        )
         return comparison
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
\ No newline at end of file
@@ -1,14 +1,21 @@
-from fastapi import Depends, HTTPException, status
+from typing import Optional
+
+from fastapi import Depends, HTTPException, Request, status
 from fastapi.security import OAuth2PasswordBearer
 from jose import jwt, JWTError
 from pydantic import ValidationError
 from sqlalchemy.orm import Session
 
 from ..core.config import settings
+from ..core.container import ServiceContainer
 from ..core.security import ALGORITHM
 from ..db.session import get_db
 from ..models.user import User
 from ..schemas.token import TokenPayload
+from ..services.market_data import MarketDataService
+from ..services.performance_tracker import PerformanceTracker
+from ..services.risk_analyzer import RiskAnalyzer
+from ..services.snapshot_scheduler import SnapshotScheduler
 
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="/api/auth/login")
 
@@ -32,5 +39,28 @@ async def get_current_user(
         raise HTTPException(status_code=404, detail="User not found")
     if not user.is_active:
         raise HTTPException(status_code=400, detail="Inactive user")
-        
-    return user
\ No newline at end of file
+    
+    return user
+
+def get_services(request: Request) -> ServiceContainer:
+    return request.app.state.services
+
+def get_market_data(
+    services: ServiceContainer = Depends(get_services)
+) -> MarketDataService:
+    return services.market_data
+
+def get_risk_analyzer(
+    services: ServiceContainer = Depends(get_services)
+) -> RiskAnalyzer:
+    return services.risk_analyzer
+
+def get_performance_tracker(
+    services: ServiceContainer = Depends(get_services)
+) -> PerformanceTracker:
+    return services.performance_tracker
+
+def get_snapshot_scheduler(
+    services: ServiceContainer = Depends(get_services)
+) -> Optional[SnapshotScheduler]:
+    return services.snapshot_scheduler
\ No newline at end of file
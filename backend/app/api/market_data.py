@@ -4,11 +4,14 @@ from ..services.market_data import MarketDataService
 from ..api import deps
 
 router = APIRouter()
-market_data = MarketDataService()
+
+# Upper bound on symbols accepted by the bulk quote endpoint
+MAX_BATCH_SYMBOLS = 50
 
 @router.get("/price/{symbol}")
 async def get_latest_price(
     symbol: str,
+    market_data: MarketDataService = Depends(deps.get_market_data),
     current_user = Depends(deps.get_current_user)
 ):
     """Get the latest price for a ticker symbol"""
@@ -18,10 +21,30 @@ async def get_latest_price(
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
+@router.get("/prices")
+async def get_latest_prices(
+    symbols: str = Query(..., description="Comma-separated ticker symbols"),
+    market_data: MarketDataService = Depends(deps.get_market_data),
+    current_user = Depends(deps.get_current_user)
+):
+    """Get the latest prices for several ticker symbols"""
+    symbol_list = [symbol.strip() for symbol in symbols.split(",") if symbol.strip()]
+    if not symbol_list:
+        raise HTTPException(status_code=400, detail="At least one symbol is required")
+    if len(symbol_list) > MAX_BATCH_SYMBOLS:
+        raise HTTPException(
+            status_code=400,
+            detail=f"At most {MAX_BATCH_SYMBOLS} symbols can be requested at once"
+        )
+    
+    prices, errors = await market_data.get_latest_prices(symbol_list)
+    return {"prices": prices, "errors": errors}
+
 @router.get("/historical/{symbol}")
 async def get_historical_data(
     symbol: str,
     days: Optional[int] = Query(30, ge=1, le=365),
+    market_data: MarketDataService = Depends(deps.get_market_data),
     current_user = Depends(deps.get_current_user)
 ):
     """Get historical price data for a ticker symbol"""
@@ -43,6 +66,7 @@ async def get_historical_data(
 @router.get("/search")
 async def search_symbols(
     query: str,
+    market_data: MarketDataService = Depends(deps.get_market_data),
     current_user = Depends(deps.get_current_user)
 ):
     """Search for ticker symbols"""
@@ -50,4 +74,12 @@ async def search_symbols(
         results = await market_data.search_symbols(query)
         return {"results": results}
     except Exception as e:
-        raise HTTPException(status_code=500, detail=str(e))
\ No newline at end of file
+        raise HTTPException(status_code=500, detail=str(e))
+
+@router.get("/stats")
+async def get_market_data_stats(
+    market_data: MarketDataService = Depends(deps.get_market_data),
+    current_user = Depends(deps.get_current_user)
+):
+    """Get market data request statistics"""
+    return market_data.get_stats()
\ No newline at end of file
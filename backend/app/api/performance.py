@@ -6,19 +6,29 @@ from sqlalchemy.orm import Session
 from ..api import deps
 from ..db.session import get_db
 from ..models.portfolio import Portfolio
-from ..schemas.performance import PortfolioSnapshot, PerformanceMetrics
+from ..core.config import settings
+from ..schemas.performance import PortfolioSnapshot, PerformanceHistoryPoint, PerformanceMetrics
 from ..services.performance_tracker import PerformanceTracker
-from ..services.market_data import MarketDataService
+from ..services.snapshot_scheduler import SnapshotScheduler
 
 router = APIRouter()
-market_data = MarketDataService()
-performance_tracker = PerformanceTracker(market_data)
+
+@router.get("/stats")
+async def get_snapshot_job_stats(
+    snapshot_scheduler: Optional[SnapshotScheduler] = Depends(deps.get_snapshot_scheduler),
+    current_user = Depends(deps.get_current_user)
+):
+    """Get the batch snapshot schedule, progress and last run throughput"""
+    if not snapshot_scheduler:
+        return {"enabled": False}
+    return {"enabled": True, **snapshot_scheduler.get_stats()}
 
 @router.post("/{portfolio_id}/snapshots", response_model=PortfolioSnapshot)
 async def create_portfolio_snapshot(
     portfolio_id: int,
     investment_amount: Optional[float] = None,
     db: Session = Depends(get_db),
+    performance_tracker: PerformanceTracker = Depends(deps.get_performance_tracker),
     current_user = Depends(deps.get_current_user)
 ):
     """Create a new snapshot of the portfolio with current market prices"""
@@ -30,7 +40,7 @@ async def create_portfolio_snapshot(
     
     if not portfolio:
         raise HTTPException(status_code=404, detail="Portfolio not found")
-        
+    
     try:
         snapshot = await performance_tracker.create_snapshot(
             db=db, portfolio_id=portfolio_id, investment_amount=investment_amount
@@ -38,14 +48,17 @@ async def create_portfolio_snapshot(
         return snapshot
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
-    
-@router.get("/{portfolio_id}/history", response_model=List[PortfolioSnapshot])
+
+@router.get("/{portfolio_id}/history", response_model=List[PerformanceHistoryPoint])
 def get_portfolio_history(
     portfolio_id: int,
     start_date: Optional[datetime] = None,
     end_date: Optional[datetime] = None,
-    interval: str = Query("daily", regex="^(daily|weekly|monthly)$"),
+    interval: str = Query("daily", regex="^(daily|weekly|monthly|auto)$"),
+    ohlc: bool = False,
+    max_points: int = Query(200, ge=2, le=settings.PERFORMANCE_HISTORY_MAX_POINTS),
     db: Session = Depends(get_db),
+    performance_tracker: PerformanceTracker = Depends(deps.get_performance_tracker),
     current_user = Depends(deps.get_current_user)
 ):
     """Get performance history for a portfolio"""
@@ -57,25 +70,30 @@ def get_portfolio_history(
     
     if not portfolio:
         raise HTTPException(status_code=404, detail="Portfolio not found")
-        
+    
     try:
         history = performance_tracker.get_performance_history(
             db=db, 
             portfolio_id=portfolio_id,
             start_date=start_date,
             end_date=end_date,
-            interval=interval
+            interval=interval,
+            ohlc=ohlc,
+            max_points=max_points
         )
         return history
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
-    
+
 @router.get("/{portfolio_id}/metrics", response_model=PerformanceMetrics)
 def get_portfolio_metrics(
     portfolio_id: int,
     start_date: Optional[datetime] = None,
     end_date: Optional[datetime] = None,
     db: Session = Depends(get_db),
+    performance_tracker: PerformanceTracker = Depends(deps.get_performance_tracker),
     current_user = Depends(deps.get_current_user)
 ):
     """Get performance metrics for a portfolio"""
@@ -87,7 +105,7 @@ def get_portfolio_metrics(
     
     if not portfolio:
         raise HTTPException(status_code=404, detail="Portfolio not found")
-        
+    
     try:
         metrics = performance_tracker.calculate_metrics(
             db=db,
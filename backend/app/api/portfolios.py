@@ -2,10 +2,12 @@ from typing import List, Optional, Dict, Any
 from fastapi import APIRouter, Depends, HTTPException, Query
 from sqlalchemy.orm import Session
 
+from ..api import deps
 from ..db.session import get_db
 from ..schemas.portfolio import Portfolio, PortfolioCreate, PortfolioUpdate, PortfolioGenerationRequest
 from ..models.portfolio import Portfolio as PortfolioModel, Allocation as AllocationModel
 from ..services.portfolio_generator import PortfolioGenerator
+from ..services.risk_analyzer import RiskAnalyzer
 
 router = APIRouter()
 portfolio_generator = PortfolioGenerator()
@@ -84,6 +86,7 @@ def update_portfolio(
     portfolio_id: int,
     portfolio_update: PortfolioUpdate,
     db: Session = Depends(get_db),
+    risk_analyzer: RiskAnalyzer = Depends(deps.get_risk_analyzer),
     # user: User = Depends(get_current_user)  # Uncomment when adding auth
 ):
     """Update a portfolio"""
@@ -116,6 +119,11 @@ def update_portfolio(
             db.add(db_allocation)
     
     db.commit()
+    
+    if portfolio_update.allocations:
+        # Cached risk metrics were computed for the old allocations
+        risk_analyzer.invalidate_portfolio(portfolio_id)
+    
     db.refresh(db_portfolio)
     return db_portfolio
 
@@ -123,6 +131,7 @@ def update_portfolio(
 def delete_portfolio(
     portfolio_id: int,
     db: Session = Depends(get_db),
+    risk_analyzer: RiskAnalyzer = Depends(deps.get_risk_analyzer),
     # user: User = Depends(get_current_user)  # Uncomment when adding auth
 ):
     """Delete a portfolio"""
@@ -134,4 +143,5 @@ def delete_portfolio(
     
     db.delete(db_portfolio)
     db.commit()
+    risk_analyzer.invalidate_portfolio(portfolio_id)
     return {}
\ No newline at end of file
@@ -38,6 +38,63 @@ class Settings(BaseSettings):
             path=f"/{values.get('POSTGRES_DB') or ''}",
         )
 
+    # Market data HTTP client pooling
+    MARKET_DATA_CONNECTION_LIMIT: int = 100  # Total open connections per provider
+    MARKET_DATA_CONNECTION_LIMIT_PER_HOST: int = 20
+    MARKET_DATA_KEEPALIVE_TIMEOUT: float = 30.0  # Seconds an idle connection is kept open
+    MARKET_DATA_DNS_CACHE_TTL: int = 300  # Seconds
+    MARKET_DATA_CONNECT_TIMEOUT: float = 5.0
+    MARKET_DATA_REQUEST_TIMEOUT: float = 15.0
+    MARKET_DATA_MAX_CONCURRENT_REQUESTS: int = 8  # In-flight provider calls for bulk quotes
+    
+    # Market data price cache
+    MARKET_DATA_PRICE_CACHE_MAX_ENTRIES: int = 5000
+    MARKET_DATA_PRICE_CACHE_TTL: float = 15 * 60  # Seconds a quote is fresh
+    MARKET_DATA_PRICE_CACHE_STALE_TTL: float = 5 * 60  # Extra seconds a stale quote is served while refreshing
+    MARKET_DATA_SEARCH_CACHE_MAX_ENTRIES: int = 1000
+    MARKET_DATA_SEARCH_CACHE_TTL: float = 24 * 60 * 60
+    
+    # Shared second cache tier: "" (disabled), "memory://", "sqlite:///path.db" or "redis://host:port/db"
+    MARKET_DATA_SHARED_CACHE_URL: str = ""
+    
+    # Local daily bar store
+    MARKET_DATA_BAR_STORE_DIR: str = "data/bars"
+    MARKET_DATA_BAR_STORE_MAX_AGE: float = 6 * 60 * 60  # Seconds before checking the provider for new bars
+    
+    # Provider request budgets
+    ALPHA_VANTAGE_REQUESTS_PER_MINUTE: float = 5
+    ALPHA_VANTAGE_BURST: int = 5
+    FINNHUB_REQUESTS_PER_MINUTE: float = 60
+    FINNHUB_BURST: int = 10
+    MARKET_DATA_THROTTLE_MIN_BACKOFF: float = 15.0  # Seconds to pause a provider after a throttle reply
+    MARKET_DATA_THROTTLE_MAX_BACKOFF: float = 120.0
+    
+    # Provider routing: circuit breakers and hedged requests
+    MARKET_DATA_CIRCUIT_FAILURE_THRESHOLD: int = 5  # Consecutive failures before a provider is skipped
+    MARKET_DATA_CIRCUIT_RESET_TIMEOUT: float = 30.0  # Seconds before a half-open probe
+    MARKET_DATA_HEDGE_PERCENTILE: float = 95.0  # Hedge once the primary is slower than this latency percentile
+    MARKET_DATA_HEDGE_MIN_SAMPLES: int = 20
+    MARKET_DATA_HEDGE_DEFAULT_DELAY: float = 2.0  # Seconds, used until enough samples are recorded
+    MARKET_DATA_HEDGE_MIN_DELAY: float = 0.2
+    
+    # Risk analysis
+    RISK_ANALYSIS_MAX_CONCURRENT_FETCHES: int = 8  # Historical loads in flight per analysis
+    RISK_FRONTIER_CHUNK_SIZE: int = 100_000  # Monte Carlo portfolios sampled per batch
+    RISK_METRICS_CACHE_MAX_ENTRIES: int = 1000
+    RISK_METRICS_CACHE_TTL: int = 24 * 60 * 60  # Seconds, entries are also keyed by the latest bar date
+    RISK_STATE_DIR: str = "data/risk_state"  # Incremental risk states, one .npz file per allocation
+    RISK_STATE_MAX_ENTRIES: int = 1000  # States kept in memory
+    RISK_STATE_REBUILD_INTERVAL: int = 250  # Incremental updates before a full rebuild
+    RISK_ANALYSIS_EXECUTOR: str = "thread"  # "thread", "process" or "inline" for CPU-bound stages
+    RISK_ANALYSIS_EXECUTOR_WORKERS: int = 0  # 0 uses the executor's default worker count
+    RISK_SIMULATION_CHUNK_DRAWS: int = 2_000_000  # Daily returns drawn per Monte Carlo VaR chunk
+    RISK_SIMULATION_MAX_PATHS: int = 1_000_000
+    
+    # Batch performance snapshots
+    PERFORMANCE_SNAPSHOT_SCHEDULE: str = ""  # "" (disabled) or a daily "HH:MM" UTC time for the in-process job; prefer cron with app.snapshot_job
+    PERFORMANCE_SNAPSHOT_CHUNK_SIZE: int = 1000  # Portfolios written and committed per chunk
+    PERFORMANCE_HISTORY_MAX_POINTS: int = 5000  # Upper bound for the history endpoint's max_points
+
     class Config:
         case_sensitive = True
         env_file = ".env"
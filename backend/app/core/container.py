@@ -0,0 +1,42 @@
+from ..core.config import settings
+from ..db.session import SessionLocal
+from ..services.market_data import MarketDataService
+from ..services.performance_tracker import PerformanceTracker
+from ..services.risk_analyzer import RiskAnalyzer
+from ..services.snapshot_scheduler import SnapshotScheduler
+
+class ServiceContainer:
+    """
+    Process-wide service instances, created once per application.
+    
+    All routers share the same MarketDataService, so its caches, request
+    coalescing and rate limits cover the whole process. Tests and benchmarks
+    can swap in doubles by assigning a different container (or individual
+    services) to app.state.services.
+    """
+    
+    def __init__(self, market_data: MarketDataService = None):
+        self.market_data = market_data or MarketDataService()
+        self.risk_analyzer = RiskAnalyzer(self.market_data)
+        self.performance_tracker = PerformanceTracker(self.market_data)
+        self.snapshot_scheduler = None
+        if settings.PERFORMANCE_SNAPSHOT_SCHEDULE:
+            self.snapshot_scheduler = SnapshotScheduler(
+                self.performance_tracker,
+                SessionLocal,
+                settings.PERFORMANCE_SNAPSHOT_SCHEDULE,
+                chunk_size=settings.PERFORMANCE_SNAPSHOT_CHUNK_SIZE
+            )
+    
+    async def start(self) -> None:
+        """Open long-lived resources (pooled HTTP sessions, the snapshot schedule)"""
+        await self.market_data.start()
+        if self.snapshot_scheduler:
+            self.snapshot_scheduler.start()
+    
+    async def close(self) -> None:
+        """Release long-lived resources (snapshot schedule, analytics workers, HTTP sessions)"""
+        if self.snapshot_scheduler:
+            await self.snapshot_scheduler.close()
+        self.risk_analyzer.close()
+        await self.market_data.close()
@@ -1,8 +1,9 @@
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
-from .api import portfolios, users
+from .api import analysis, market_data, performance, portfolios, users
 from .db.session import engine
 from .db.base import Base
+from .core.container import ServiceContainer
 
 # Create all tables in database
 Base.metadata.create_all(bind=engine)
@@ -25,6 +26,21 @@ app.add_middleware(
 # Include routers
 app.include_router(portfolios.router, prefix="/api/portfolios", tags=["portfolios"])
 app.include_router(users.router, prefix="/api/users", tags=["users"])
+app.include_router(market_data.router, prefix="/api/market-data", tags=["market-data"])
+app.include_router(performance.router, prefix="/api/performance", tags=["performance"])
+app.include_router(analysis.router, prefix="/api/analysis", tags=["analysis"])
+
+# Shared service instances follow the app lifecycle
+@app.on_event("startup")
+async def start_services():
+    # Keep a container (or test double) assigned before startup
+    if getattr(app.state, "services", None) is None:
+        app.state.services = ServiceContainer()
+    await app.state.services.start()
+
+@app.on_event("shutdown")
+async def stop_services():
+    await app.state.services.close()
 
 @app.get("/")
 def read_root():
@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, Float, ForeignKey, DateTime, String
+from sqlalchemy import Column, Integer, Float, ForeignKey, DateTime, String, Index, UniqueConstraint
 from sqlalchemy.sql import func
 from ..db.base import Base
 
@@ -15,15 +15,55 @@ class PortfolioSnapshot(Base):
     monthly_change_percent = Column(Float, nullable=True)
     yearly_change_percent = Column(Float, nullable=True)
     
+    __table_args__ = (
+        # Latest snapshot per portfolio (before a date) is an index scan
+        Index("ix_portfolio_snapshots_portfolio_id_date", portfolio_id, date.desc()),
+    )
+
 class AssetSnapshot(Base):
     __tablename__ = "asset_snapshots"
     
     id = Column(Integer, primary_key=True, index=True)
-    snapshot_id = Column(Integer, ForeignKey("portfolio_snapshots.id", ondelete="CASCADE"))
+    snapshot_id = Column(Integer, ForeignKey("portfolio_snapshots.id", ondelete="CASCADE"), index=True)
     allocation_id = Column(Integer, ForeignKey("allocations.id", ondelete="SET NULL"), nullable=True)
     asset_name = Column(String, index=True)
     ticker = Column(String, nullable=True, index=True)
     price = Column(Float)
     quantity = Column(Float)
     value = Column(Float)
-    allocation_percentage = Column(Float)
\ No newline at end of file
+    allocation_percentage = Column(Float)
+
+class PortfolioValueRollup(Base):
+    __tablename__ = "portfolio_value_rollups"
+    
+    id = Column(Integer, primary_key=True, index=True)
+    portfolio_id = Column(Integer, ForeignKey("portfolios.id", ondelete="CASCADE"), nullable=False)
+    period = Column(String, nullable=False)  # "day", "week" or "month"
+    bucket = Column(DateTime(timezone=True), nullable=False)  # Start of the period
+    
+    # total_value over the period's snapshots
+    first_date = Column(DateTime(timezone=True), nullable=False)
+    last_date = Column(DateTime(timezone=True), nullable=False)
+    open_value = Column(Float, nullable=False)
+    close_value = Column(Float, nullable=False)
+    high_value = Column(Float, nullable=False)
+    low_value = Column(Float, nullable=False)
+    snapshot_count = Column(Integer, nullable=False)
+    
+    # The period's last snapshot
+    last_snapshot_id = Column(Integer, ForeignKey("portfolio_snapshots.id", ondelete="SET NULL"), nullable=True)
+    daily_change_percent = Column(Float, nullable=True)
+    monthly_change_percent = Column(Float, nullable=True)
+    yearly_change_percent = Column(Float, nullable=True)
+    
+    __table_args__ = (
+        UniqueConstraint("portfolio_id", "period", "bucket", name="uq_portfolio_value_rollups_bucket"),
+    )
+
+class SnapshotJobRun(Base):
+    __tablename__ = "snapshot_job_runs"
+    
+    id = Column(Integer, primary_key=True, index=True)
+    # One row per scheduled run; the process that inserts it runs the job
+    scheduled_for = Column(DateTime(timezone=True), nullable=False, unique=True)
+    claimed_at = Column(DateTime(timezone=True), default=func.now())
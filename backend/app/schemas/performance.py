@@ -38,6 +38,15 @@ class PortfolioSnapshot(PortfolioSnapshotBase):
     class Config:
         orm_mode = True
 
+class PerformanceHistoryPoint(PortfolioSnapshot):
+    """Last snapshot of a history bucket, with the bucket's OHLC of total_value if requested"""
+    id: Optional[int] = None  # None once the snapshot behind a rollup bucket is deleted
+    bucket: datetime
+    open: Optional[float] = None
+    high: Optional[float] = None
+    low: Optional[float] = None
+    close: Optional[float] = None
+
 class PerformanceMetrics(BaseModel):
     period_start: datetime
     period_end: datetime
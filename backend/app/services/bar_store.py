@@ -0,0 +1,149 @@
+import os
+import re
+import tempfile
+from datetime import datetime
+from typing import Dict, Optional
+
+import numpy as np
+
+# One record per daily bar, sorted by date
+BAR_DTYPE = np.dtype([
+    ("date", "datetime64[D]"),
+    ("open", "f8"),
+    ("high", "f8"),
+    ("low", "f8"),
+    ("close", "f8"),
+    ("volume", "f8"),
+])
+VALUE_COLUMNS = BAR_DTYPE.names[1:]
+
+class HistoricalBarStore:
+    """
+    On-disk store of daily OHLCV bars, one .npy file per symbol.
+    
+    Files are read back memory-mapped, so window queries only touch the
+    pages they slice. Writes go to a temporary file that is atomically
+    renamed into place, so readers holding an old mapping are unaffected.
+    """
+    
+    def __init__(self, root_dir: str):
+        self.root_dir = root_dir
+        os.makedirs(self.root_dir, exist_ok=True)
+        self._stats = {"reads": 0, "writes": 0}
+    
+    def load(self, symbol: str) -> Optional[np.ndarray]:
+        """Load all stored bars for a symbol, or None if nothing is stored"""
+        path = self._path(symbol)
+        if not os.path.exists(path):
+            return None
+        
+        self._stats["reads"] += 1
+        return np.load(path, mmap_mode="r")
+    
+    def last_date(self, symbol: str) -> Optional[np.datetime64]:
+        """Get the date of the most recent stored bar for a symbol"""
+        bars = self.load(symbol)
+        if bars is None or len(bars) == 0:
+            return None
+        return bars["date"][-1]
+    
+    def updated_at(self, symbol: str) -> Optional[datetime]:
+        """Get when the bars for a symbol were last written (UTC)"""
+        path = self._path(symbol)
+        if not os.path.exists(path):
+            return None
+        return datetime.utcfromtimestamp(os.path.getmtime(path))
+    
+    def merge(self, symbol: str, new_bars: np.ndarray) -> np.ndarray:
+        """
+        Merge new bars into the stored history and persist the result.
+        
+        Bars for dates already stored are replaced by the new values.
+        Returns the merged, date-sorted array.
+        """
+        merged = merge_bars(self.load(symbol), new_bars)
+        self._write(symbol, merged)
+        return merged
+    
+    def save(self, symbol: str, bars: np.ndarray) -> np.ndarray:
+        """Replace the stored history for a symbol with date-sorted bars"""
+        self._write(symbol, bars)
+        return bars
+    
+    def touch(self, symbol: str) -> None:
+        """Mark a symbol's bars as checked now without rewriting them"""
+        path = self._path(symbol)
+        if os.path.exists(path):
+            os.utime(path, None)
+    
+    def get_stats(self) -> Dict:
+        """Get read and write counters"""
+        return dict(self._stats)
+    
+    def _write(self, symbol: str, bars: np.ndarray) -> None:
+        """Atomically replace the stored bars for a symbol"""
+        fd, tmp_path = tempfile.mkstemp(dir=self.root_dir, suffix=".tmp")
+        try:
+            with os.fdopen(fd, "wb") as f:
+                np.save(f, bars)
+            os.replace(tmp_path, self._path(symbol))
+        except Exception:
+            os.unlink(tmp_path)
+            raise
+        self._stats["writes"] += 1
+    
+    def _path(self, symbol: str) -> str:
+        """Get the file path for a symbol"""
+        safe_symbol = re.sub(r"[^A-Z0-9._-]", "_", symbol.upper())
+        return os.path.join(self.root_dir, f"{safe_symbol}.npy")
+
+def merge_bars(existing: Optional[np.ndarray], new_bars: np.ndarray) -> np.ndarray:
+    """Merge two bar arrays into one date-sorted array, new bars winning on duplicate dates"""
+    if existing is not None and len(existing) > 0:
+        # Keep existing bars not superseded by the new batch
+        keep = ~np.isin(existing["date"], new_bars["date"])
+        merged = np.concatenate([existing[keep], new_bars])
+    else:
+        merged = np.array(new_bars, dtype=BAR_DTYPE)
+    
+    return merged[np.argsort(merged["date"], kind="stable")]
+
+def slice_bars(bars: np.ndarray, start_date: datetime, end_date: datetime) -> np.ndarray:
+    """Slice date-sorted bars to those whose date falls within [start_date, end_date]"""
+    start_day = first_full_day(start_date)
+    end_day = np.datetime64(end_date, "D")
+    
+    dates = bars["date"]
+    lo = np.searchsorted(dates, start_day, side="left")
+    hi = np.searchsorted(dates, end_day, side="right")
+    return bars[lo:hi]
+
+def first_full_day(start_date: datetime) -> np.datetime64:
+    """First bar date on or after start_date"""
+    # A bar is dated at midnight, so a start with a time of day excludes that day
+    start_day = np.datetime64(start_date, "D")
+    if start_date != datetime(start_date.year, start_date.month, start_date.day):
+        start_day += 1
+    return start_day
+
+def parse_daily_series(time_series: Dict[str, Dict]) -> np.ndarray:
+    """Convert an Alpha Vantage daily time series into a date-sorted bar array"""
+    bars = np.empty(len(time_series), dtype=BAR_DTYPE)
+    bars["date"] = np.array(list(time_series.keys()), dtype="datetime64[D]")
+    
+    # Parse all value strings in one pass instead of one float() per field
+    values = np.array(
+        [
+            (v["1. open"], v["2. high"], v["3. low"], v["4. close"], v["5. volume"])
+            for v in time_series.values()
+        ],
+        dtype=str,
+    ).reshape(len(time_series), len(VALUE_COLUMNS)).astype("f8")
+    for i, column in enumerate(VALUE_COLUMNS):
+        bars[column] = values[:, i]
+    
+    return bars[np.argsort(bars["date"], kind="stable")]
+
+def to_columns(bars: np.ndarray) -> Dict[str, np.ndarray]:
+    """Split bars into contiguous per-column arrays (date as datetime64[D], values as float64)"""
+    return {column: np.ascontiguousarray(bars[column]) for column in BAR_DTYPE.names}
@@ -0,0 +1,101 @@
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Hashable, Optional, Tuple
+
+# Lookup states returned by TTLCache.lookup
+FRESH = "fresh"
+STALE = "stale"
+MISS = "miss"
+
+class TTLCache:
+    """
+    Bounded in-memory cache with LRU eviction and per-key TTL.
+    
+    Entries past their TTL are kept for an extra stale window so callers can
+    serve the stale value while refreshing it in the background
+    (stale-while-revalidate). Entries past the stale window count as misses.
+    """
+    
+    def __init__(self, max_entries: int, ttl: float, stale_ttl: float = 0.0):
+        self.max_entries = max_entries
+        self.ttl = ttl  # Seconds an entry is fresh
+        self.stale_ttl = stale_ttl  # Extra seconds an expired entry may still be served
+        
+        # key -> (value, fresh_until, stale_until), least recently used first
+        self._entries: "OrderedDict[Hashable, Tuple[Any, float, float]]" = OrderedDict()
+        self._stats = {
+            "hits": 0,
+            "stale_hits": 0,
+            "misses": 0,
+            "evictions": 0,
+            "expirations": 0,
+            "refreshes": 0,
+            "refresh_errors": 0,
+        }
+    
+    def lookup(self, key: Hashable) -> Tuple[Optional[Any], str]:
+        """Look up a key, returning (value, state) where state is FRESH, STALE or MISS"""
+        entry = self._entries.get(key)
+        if entry is None:
+            self._stats["misses"] += 1
+            return None, MISS
+        
+        value, fresh_until, stale_until = entry
+        now = time.monotonic()
+        if now >= stale_until:
+            # Too old to serve at all
+            del self._entries[key]
+            self._stats["expirations"] += 1
+            self._stats["misses"] += 1
+            return None, MISS
+        
+        self._entries.move_to_end(key)
+        if now < fresh_until:
+            self._stats["hits"] += 1
+            return value, FRESH
+        
+        self._stats["stale_hits"] += 1
+        return value, STALE
+    
+    def get(self, key: Hashable) -> Optional[Any]:
+        """Get a fresh value for a key, or None if missing or expired"""
+        value, state = self.lookup(key)
+        return value if state == FRESH else None
+    
+    def set(self, key: Hashable, value: Any, ttl: Optional[float] = None) -> None:
+        """Store a value, evicting the least recently used entries when full"""
+        ttl = self.ttl if ttl is None else ttl
+        now = time.monotonic()
+        self._entries[key] = (value, now + ttl, now + ttl + self.stale_ttl)
+        self._entries.move_to_end(key)
+        
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+            self._stats["evictions"] += 1
+    
+    def delete(self, key: Hashable) -> None:
+        """Remove a key if present"""
+        self._entries.pop(key, None)
+    
+    def clear(self) -> None:
+        """Remove all entries"""
+        self._entries.clear()
+    
+    def record_refresh(self, success: bool) -> None:
+        """Count a background refresh triggered by a stale hit"""
+        self._stats["refreshes"] += 1
+        if not success:
+            self._stats["refresh_errors"] += 1
+    
+    def get_stats(self) -> Dict:
+        """Get cache counters and current size"""
+        stats = dict(self._stats)
+        stats["size"] = len(self._entries)
+        stats["max_entries"] = self.max_entries
+        return stats
+    
+    def __len__(self) -> int:
+        return len(self._entries)
+    
+    def __contains__(self, key: Hashable) -> bool:
+        return key in self._entries
@@ -0,0 +1,119 @@
+import asyncio
+import multiprocessing
+import time
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from typing import Any, Callable, Dict, Optional, Tuple
+
+# Executor kinds: "thread" suits NumPy code that releases the GIL, "process" isolates
+# pure-Python hot loops, "inline" runs on the event loop (debugging, tests)
+EXECUTOR_KINDS = ("thread", "process", "inline")
+
+def _timed_call(func: Callable, args: Tuple) -> Tuple[Any, float, float]:
+    """Run func(*args) in a worker, returning (result, started_at, run_seconds)"""
+    started_at = time.time()
+    started = time.perf_counter()
+    result = func(*args)
+    return result, started_at, time.perf_counter() - started
+
+class ComputeExecutor:
+    """
+    Runs CPU-bound analytics stages off the event loop.
+    
+    Stage functions must be module-level and take and return plain arrays,
+    dicts and numbers, so a process pool only pickles compact inputs.
+    Queue time (submit to start) and run time are recorded per stage.
+    """
+    
+    def __init__(self, kind: str = "thread", max_workers: Optional[int] = None):
+        if kind not in EXECUTOR_KINDS:
+            raise ValueError(f"Invalid executor kind: {kind}. Must be one of: {list(EXECUTOR_KINDS)}")
+        
+        self.kind = kind
+        self.max_workers = max_workers
+        self._executor: Optional[Executor] = None
+        self._in_flight = 0
+        self._stats: Dict[str, Dict] = {}
+    
+    async def run(self, stage: str, func: Callable, *args) -> Any:
+        """Run func(*args) in the pool and wait for the result"""
+        submitted_at = time.time()
+        self._in_flight += 1
+        try:
+            if self.kind == "inline":
+                result, started_at, run_seconds = _timed_call(func, args)
+            else:
+                loop = asyncio.get_running_loop()
+                result, started_at, run_seconds = await loop.run_in_executor(
+                    self._get_executor(), _timed_call, func, args
+                )
+        except Exception:
+            self._record(stage, None, None, failed=True)
+            raise
+        finally:
+            self._in_flight -= 1
+        
+        self._record(stage, max(0.0, started_at - submitted_at), run_seconds)
+        return result
+    
+    def shutdown(self) -> None:
+        """Stop the worker pool, if one was started"""
+        if self._executor is not None:
+            self._executor.shutdown(wait=False)
+            self._executor = None
+    
+    def get_stats(self) -> Dict:
+        """Get the executor configuration and per-stage queue and run times"""
+        stages = {}
+        for stage, stats in self._stats.items():
+            stages[stage] = dict(stats)
+            completed = stats["calls"] - stats["errors"]
+            stages[stage]["avg_queue_time"] = stats["total_queue_time"] / completed if completed else 0.0
+            stages[stage]["avg_run_time"] = stats["total_run_time"] / completed if completed else 0.0
+        
+        return {
+            "kind": self.kind,
+            "max_workers": self.max_workers,
+            "in_flight": self._in_flight,
+            "stages": stages,
+        }
+    
+    def _get_executor(self) -> Executor:
+        """Create the worker pool on first use"""
+        if self._executor is None:
+            if self.kind == "process":
+                # Spawned workers do not inherit the event loop or open connections
+                self._executor = ProcessPoolExecutor(
+                    max_workers=self.max_workers,
+                    mp_context=multiprocessing.get_context("spawn")
+                )
+            else:
+                self._executor = ThreadPoolExecutor(
+                    max_workers=self.max_workers, thread_name_prefix="analytics"
+                )
+        return self._executor
+    
+    def _record(
+        self,
+        stage: str,
+        queue_time: Optional[float],
+        run_time: Optional[float],
+        failed: bool = False
+    ) -> None:
+        """Update the counters for one finished stage"""
+        stats = self._stats.setdefault(stage, {
+            "calls": 0,
+            "errors": 0,
+            "total_queue_time": 0.0,
+            "max_queue_time": 0.0,
+            "total_run_time": 0.0,
+            "max_run_time": 0.0,
+        })
+        stats["calls"] += 1
+        if failed:
+            stats["errors"] += 1
+            return
+        
+        stats["total_queue_time"] += queue_time
+        stats["max_queue_time"] = max(stats["max_queue_time"], queue_time)
+        stats["total_run_time"] += run_time
+        stats["max_run_time"] = max(stats["max_run_time"], run_time)
@@ -1,8 +1,30 @@
 import aiohttp
 import asyncio
-from typing import Dict, List, Optional
+import io
+import json
+import numpy as np
+from typing import Awaitable, Callable, Dict, List, Optional, Tuple
 from datetime import datetime, timedelta
 import os
+import time
+
+from ..core.config import settings
+from .bar_store import HistoricalBarStore, merge_bars, parse_daily_series, slice_bars, to_columns
+from .cache import TTLCache, FRESH, STALE
+from .provider_health import CircuitBreaker, LatencyHistogram
+from .rate_limiter import RateLimiter, ProviderThrottledError, INTERACTIVE, BACKGROUND
+from .shared_cache import create_shared_cache
+
+ALPHA_VANTAGE = "alpha_vantage"
+FINNHUB = "finnhub"
+PROVIDERS = (ALPHA_VANTAGE, FINNHUB)
+PROVIDER_NAMES = {ALPHA_VANTAGE: "Alpha Vantage", FINNHUB: "Finnhub"}
+
+# Phrases Alpha Vantage uses in "Note"/"Information" replies when it throttles us
+ALPHA_VANTAGE_THROTTLE_PHRASES = ("call frequency", "rate limit", "requests per")
+
+# Alpha Vantage "compact" output returns the latest 100 trading days (~140 calendar days)
+COMPACT_OUTPUT_MAX_GAP_DAYS = 130
 
 class MarketDataService:
     """Service to interact with financial market data APIs"""
@@ -12,85 +34,498 @@ class MarketDataService:
         self.alpha_vantage_api_key = os.getenv("ALPHA_VANTAGE_API_KEY", "demo")
         self.finnhub_api_key = os.getenv("FINNHUB_API_KEY", "")
         
-        # Cache for price data to reduce API calls
-        self._price_cache = {}
-        self._cache_expiry = {}
-        self._cache_duration = timedelta(minutes=15)  # Cache prices for 15 minutes
+        # Bounded cache for price data to reduce API calls
+        self._price_cache = TTLCache(
+            max_entries=settings.MARKET_DATA_PRICE_CACHE_MAX_ENTRIES,
+            ttl=settings.MARKET_DATA_PRICE_CACHE_TTL,
+            stale_ttl=settings.MARKET_DATA_PRICE_CACHE_STALE_TTL,
+        )
+        
+        # Symbol search results change rarely, keep them for a day
+        self._search_cache = TTLCache(
+            max_entries=settings.MARKET_DATA_SEARCH_CACHE_MAX_ENTRIES,
+            ttl=settings.MARKET_DATA_SEARCH_CACHE_TTL,
+        )
+        
+        # Optional second tier shared across workers and restarts (read/write-through)
+        self._shared_cache = create_shared_cache(settings.MARKET_DATA_SHARED_CACHE_URL)
+        
+        # Background refreshes started by stale cache hits
+        self._refresh_tasks = set()
+        
+        # Local history of daily bars, topped up incrementally from the provider
+        self._bar_store = HistoricalBarStore(settings.MARKET_DATA_BAR_STORE_DIR)
+        self._bar_store_stats = {
+            "local_reads": 0, "shared_reads": 0, "full_fetches": 0, "compact_fetches": 0, "failed_top_ups": 0
+        }
+        
+        # One pooled HTTP session per provider, kept open for the service lifetime
+        self._sessions: Dict[str, aiohttp.ClientSession] = {}
+        
+        # Per-provider request budgets, interactive requests are served first
+        self._rate_limiters = {
+            ALPHA_VANTAGE: RateLimiter(
+                ALPHA_VANTAGE,
+                requests_per_minute=settings.ALPHA_VANTAGE_REQUESTS_PER_MINUTE,
+                burst=settings.ALPHA_VANTAGE_BURST,
+                min_backoff=settings.MARKET_DATA_THROTTLE_MIN_BACKOFF,
+                max_backoff=settings.MARKET_DATA_THROTTLE_MAX_BACKOFF,
+            ),
+            FINNHUB: RateLimiter(
+                FINNHUB,
+                requests_per_minute=settings.FINNHUB_REQUESTS_PER_MINUTE,
+                burst=settings.FINNHUB_BURST,
+                min_backoff=settings.MARKET_DATA_THROTTLE_MIN_BACKOFF,
+                max_backoff=settings.MARKET_DATA_THROTTLE_MAX_BACKOFF,
+            ),
+        }
+        
+        # Provider health, used to skip failing providers and to time hedged requests
+        self._circuit_breakers = {
+            provider: CircuitBreaker(
+                provider,
+                failure_threshold=settings.MARKET_DATA_CIRCUIT_FAILURE_THRESHOLD,
+                reset_timeout=settings.MARKET_DATA_CIRCUIT_RESET_TIMEOUT,
+            )
+            for provider in PROVIDERS
+        }
+        self._latency = {provider: LatencyHistogram() for provider in PROVIDERS}
+        self._routing_stats = {"requests": 0, "hedged": 0, "hedge_wins": 0, "fallbacks": 0}
+        
+        # Bounds how many provider requests a bulk call keeps in flight
+        self._request_semaphore: Optional[asyncio.Semaphore] = None
+        
+        # In-flight provider fetches, so concurrent misses for a key share one call
+        self._in_flight: Dict[Tuple[str, str], asyncio.Task] = {}
+        self._coalescing_stats = {
+            kind: {"fetches": 0, "deduplicated": 0} for kind in ("price", "historical")
+        }
+    
+    async def start(self) -> None:
+        """Open the pooled HTTP sessions for all providers"""
+        for provider in PROVIDERS:
+            self._get_session(provider)
+    
+    async def close(self) -> None:
+        """Close the pooled HTTP sessions and release their connections"""
+        # Stop any background refreshes before their sessions go away
+        for task in list(self._refresh_tasks):
+            task.cancel()
+        if self._refresh_tasks:
+            await asyncio.gather(*self._refresh_tasks, return_exceptions=True)
+        
+        sessions = list(self._sessions.values())
+        self._sessions.clear()
+        for session in sessions:
+            await session.close()
+        
+        # Give the SSL transports a moment to shut down cleanly
+        if sessions:
+            await asyncio.sleep(0.250)
+        
+        if self._shared_cache is not None:
+            await self._shared_cache.close()
+    
+    def _get_session(self, provider: str) -> aiohttp.ClientSession:
+        """Get the pooled session for a provider, creating it on first use"""
+        session = self._sessions.get(provider)
+        if session is None or session.closed:
+            connector = aiohttp.TCPConnector(
+                limit=settings.MARKET_DATA_CONNECTION_LIMIT,
+                limit_per_host=settings.MARKET_DATA_CONNECTION_LIMIT_PER_HOST,
+                keepalive_timeout=settings.MARKET_DATA_KEEPALIVE_TIMEOUT,
+                ttl_dns_cache=settings.MARKET_DATA_DNS_CACHE_TTL,
+                use_dns_cache=True,
+            )
+            timeout = aiohttp.ClientTimeout(
+                total=settings.MARKET_DATA_REQUEST_TIMEOUT,
+                connect=settings.MARKET_DATA_CONNECT_TIMEOUT,
+            )
+            session = aiohttp.ClientSession(connector=connector, timeout=timeout)
+            self._sessions[provider] = session
+        return session
     
-    async def get_latest_price(self, symbol: str) -> float:
+    async def get_latest_price(self, symbol: str, priority: int = INTERACTIVE) -> float:
         """Get the latest price for a given ticker symbol"""
-        # Check cache first
-        now = datetime.utcnow()
-        if symbol in self._price_cache and now < self._cache_expiry.get(symbol, now):
-            return self._price_cache[symbol]
+        # Check cache first (a stale price is served while it refreshes)
+        price = self._get_cached_price(symbol)
+        if price is not None:
+            return price
         
         # Not in cache or cache expired, fetch from API
-        try:
-            price = await self._fetch_price_alpha_vantage(symbol)
-            
-            # Update cache
-            self._price_cache[symbol] = price
-            self._cache_expiry[symbol] = now + self._cache_duration
-            
+        return await self._single_flight("price", symbol, lambda: self._load_price(symbol, priority))
+    
+    async def get_latest_prices(
+        self, symbols: List[str], priority: int = INTERACTIVE
+    ) -> Tuple[Dict[str, float], Dict[str, str]]:
+        """
+        Get the latest prices for several ticker symbols at once.
+        
+        Cached (including stale) prices are served directly and the misses are fetched
+        concurrently. Returns a (prices, errors) pair keyed by symbol, so one
+        failing ticker does not fail the whole batch.
+        """
+        prices = {}
+        errors = {}
+        missing = []
+        
+        # Serve what we can from cache (dict.fromkeys drops duplicates, keeps order)
+        for symbol in dict.fromkeys(symbols):
+            price = self._get_cached_price(symbol)
+            if price is not None:
+                prices[symbol] = price
+            else:
+                missing.append(symbol)
+        
+        if not missing:
+            return prices, errors
+        
+        semaphore = self._get_request_semaphore()
+        
+        async def fetch(symbol: str) -> float:
+            async with semaphore:
+                return await self._single_flight("price", symbol, lambda: self._load_price(symbol, priority))
+        
+        results = await asyncio.gather(
+            *(fetch(symbol) for symbol in missing), return_exceptions=True
+        )
+        
+        for symbol, result in zip(missing, results):
+            if isinstance(result, Exception):
+                errors[symbol] = str(result)
+            else:
+                prices[symbol] = result
+        
+        return prices, errors
+    
+    def get_stats(self) -> Dict:
+        """Get cache and request coalescing counters for monitoring"""
+        return {
+            "coalescing": {kind: dict(counts) for kind, counts in self._coalescing_stats.items()},
+            "in_flight": len(self._in_flight),
+            "price_cache": self._price_cache.get_stats(),
+            "search_cache": self._search_cache.get_stats(),
+            "shared_cache": self._shared_cache.get_stats() if self._shared_cache is not None else None,
+            "bar_store": {**self._bar_store.get_stats(), **self._bar_store_stats},
+            "rate_limits": {
+                provider: limiter.get_stats() for provider, limiter in self._rate_limiters.items()
+            },
+            "routing": dict(self._routing_stats),
+            "providers": {
+                provider: {
+                    "circuit": self._circuit_breakers[provider].get_stats(),
+                    "latency": self._latency[provider].get_stats(),
+                }
+                for provider in PROVIDERS
+            },
+        }
+    
+    async def _single_flight(self, kind: str, key: str, fetch: Callable[[], Awaitable]):
+        """
+        Run fetch() once per (kind, key) among concurrent callers.
+        
+        The first caller starts the fetch as a task; callers arriving while it
+        is still running await the same task instead of issuing their own
+        provider request.
+        """
+        flight_key = (kind, key)
+        task = self._in_flight.get(flight_key)
+        if task is not None:
+            self._coalescing_stats[kind]["deduplicated"] += 1
+        else:
+            self._coalescing_stats[kind]["fetches"] += 1
+            task = asyncio.ensure_future(fetch())
+            self._in_flight[flight_key] = task
+            task.add_done_callback(lambda t: self._finish_flight(flight_key, t))
+        
+        # Shield so one cancelled caller does not cancel the fetch for the others
+        return await asyncio.shield(task)
+    
+    def _finish_flight(self, flight_key: Tuple[str, str], task: asyncio.Task) -> None:
+        """Drop a completed fetch from the in-flight table"""
+        if self._in_flight.get(flight_key) is task:
+            del self._in_flight[flight_key]
+        
+        # Mark the exception as retrieved in case every waiter was cancelled
+        if not task.cancelled():
+            task.exception()
+    
+    def _get_request_semaphore(self) -> asyncio.Semaphore:
+        """Get the semaphore bounding concurrent provider requests"""
+        # Created lazily so it binds to the running event loop
+        if self._request_semaphore is None:
+            self._request_semaphore = asyncio.Semaphore(settings.MARKET_DATA_MAX_CONCURRENT_REQUESTS)
+        return self._request_semaphore
+    
+    def _get_cached_price(self, symbol: str) -> Optional[float]:
+        """
+        Return the cached price for a symbol, or None on a miss.
+        
+        A stale price is returned as-is and a background refresh is started
+        so the next caller gets a fresh one.
+        """
+        price, state = self._price_cache.lookup(symbol)
+        if state == STALE:
+            self._schedule_refresh(symbol)
+        if state in (FRESH, STALE):
             return price
+        return None
+    
+    def _schedule_refresh(self, symbol: str) -> None:
+        """Refresh a stale price in the background unless a fetch is already running"""
+        if ("price", symbol) in self._in_flight:
+            return
+        
+        task = asyncio.ensure_future(self._refresh_price(symbol))
+        self._refresh_tasks.add(task)
+        task.add_done_callback(self._refresh_tasks.discard)
+    
+    async def _refresh_price(self, symbol: str) -> None:
+        """Fetch a fresh price for a stale cache entry"""
+        try:
+            await self._single_flight("price", symbol, lambda: self._load_price(symbol, BACKGROUND))
+            self._price_cache.record_refresh(success=True)
+        except asyncio.CancelledError:
+            raise
         except Exception as e:
-            # Fallback to another provider if primary fails
-            try:
-                price = await self._fetch_price_finnhub(symbol)
+            # Keep serving the stale price until it ages out
+            self._price_cache.record_refresh(success=False)
+            print(f"Error refreshing price for {symbol}: {e}")
+    
+    async def _load_price(self, symbol: str, priority: int = INTERACTIVE) -> float:
+        """Load a price from the shared cache tier, or fetch it from the providers"""
+        if self._shared_cache is not None:
+            value = await self._shared_cache.get(f"quote:{symbol}")
+            if value is not None:
+                quote = json.loads(value)
+                age = time.time() - quote["fetched_at"]
+                if age < settings.MARKET_DATA_PRICE_CACHE_TTL:
+                    # Keep the original expiry so tiers agree on freshness
+                    self._price_cache.set(symbol, quote["price"], ttl=settings.MARKET_DATA_PRICE_CACHE_TTL - age)
+                    return quote["price"]
+        
+        return await self._fetch_price(symbol, priority)
+    
+    async def _fetch_price(self, symbol: str, priority: int = INTERACTIVE) -> float:
+        """Fetch a price from the providers and store it in the cache"""
+        price = await self._route_price_request(symbol, priority)
+        
+        # Update cache
+        self._price_cache.set(symbol, price)
+        if self._shared_cache is not None:
+            await self._shared_cache.set(
+                f"quote:{symbol}",
+                json.dumps({"price": price, "fetched_at": time.time()}).encode(),
+                ttl=settings.MARKET_DATA_PRICE_CACHE_TTL + settings.MARKET_DATA_PRICE_CACHE_STALE_TTL,
+            )
+        
+        return price
+    
+    async def _route_price_request(self, symbol: str, priority: int = INTERACTIVE) -> float:
+        """
+        Fetch a price from the first healthy provider, hedging slow requests.
+        
+        Providers whose circuit is open are skipped. If the current provider
+        has not answered within its recent latency percentile, the next one is
+        queried in parallel and the first successful answer wins. A provider
+        that fails outright hands over to the next one immediately.
+        """
+        self._routing_stats["requests"] += 1
+        candidates = iter(self._price_providers())
+        task_providers: Dict[asyncio.Future, str] = {}
+        hedges = set()
+        pending = set()
+        errors = []
+        
+        def launch_next() -> Optional[asyncio.Future]:
+            for provider in candidates:
+                if self._circuit_breakers[provider].allow_request():
+                    task = asyncio.ensure_future(self._timed_price_fetch(provider, symbol, priority))
+                    task_providers[task] = provider
+                    pending.add(task)
+                    return task
+                errors.append(f"{PROVIDER_NAMES[provider]}: circuit open")
+            return None
+        
+        current = launch_next()
+        try:
+            while pending:
+                # Only wait out the hedge delay while there may be another provider to try
+                timeout = self._hedge_delay(task_providers[current]) if current is not None else None
+                done, pending = await asyncio.wait(
+                    pending, timeout=timeout, return_when=asyncio.FIRST_COMPLETED
+                )
+                
+                if not done:
+                    # Current provider is slow, hedge to the next one
+                    current = launch_next()
+                    if current is not None:
+                        hedges.add(current)
+                        self._routing_stats["hedged"] += 1
+                    continue
                 
-                # Update cache
-                self._price_cache[symbol] = price
-                self._cache_expiry[symbol] = now + self._cache_duration
+                for task in done:
+                    if task.exception() is None:
+                        if task in hedges:
+                            self._routing_stats["hedge_wins"] += 1
+                        return task.result()
+                    errors.append(f"{PROVIDER_NAMES[task_providers[task]]}: {task.exception()}")
                 
-                return price
-            except Exception as inner_e:
-                # If all providers fail, raise error
-                raise Exception(f"Failed to fetch price for {symbol}: {str(e)}, {str(inner_e)}")
+                # Current provider failed, fall back to the next one straight away
+                if not pending:
+                    current = launch_next()
+                    if current is not None:
+                        self._routing_stats["fallbacks"] += 1
+            
+            # If all providers fail, raise error
+            raise Exception(f"Failed to fetch price for {symbol}: {', '.join(errors) or 'no providers available'}")
+        finally:
+            for task in pending:
+                task.cancel()
+    
+    def _price_providers(self) -> List[str]:
+        """Get the price providers in order of preference"""
+        providers = [ALPHA_VANTAGE]
+        if self.finnhub_api_key:
+            providers.append(FINNHUB)
+        return providers
+    
+    def _hedge_delay(self, provider: str) -> float:
+        """Get how long to wait on a provider before sending a hedged request"""
+        delay = self._latency[provider].percentile(
+            settings.MARKET_DATA_HEDGE_PERCENTILE,
+            min_samples=settings.MARKET_DATA_HEDGE_MIN_SAMPLES,
+        )
+        if delay is None:
+            return settings.MARKET_DATA_HEDGE_DEFAULT_DELAY
+        return min(max(delay, settings.MARKET_DATA_HEDGE_MIN_DELAY), settings.MARKET_DATA_REQUEST_TIMEOUT)
     
-    async def _fetch_price_alpha_vantage(self, symbol: str) -> float:
+    async def _timed_price_fetch(self, provider: str, symbol: str, priority: int) -> float:
+        """Fetch a price from one provider, recording latency and circuit breaker outcome"""
+        breaker = self._circuit_breakers[provider]
+        fetch = self._fetch_price_alpha_vantage if provider == ALPHA_VANTAGE else self._fetch_price_finnhub
+        started = time.monotonic()
+        try:
+            price = await fetch(symbol, priority)
+        except (asyncio.CancelledError, ProviderThrottledError):
+            # Losing a hedge race or being throttled says nothing about provider health
+            breaker.release()
+            raise
+        except Exception:
+            breaker.record_failure()
+            raise
+        
+        breaker.record_success()
+        self._latency[provider].record(time.monotonic() - started)
+        return price
+    
+    async def _fetch_price_alpha_vantage(self, symbol: str, priority: int = INTERACTIVE) -> float:
         """Fetch price data from Alpha Vantage API"""
         url = f"https://www.alphavantage.co/query?function=GLOBAL_QUOTE&symbol={symbol}&apikey={self.alpha_vantage_api_key}"
         
-        async with aiohttp.ClientSession() as session:
-            async with session.get(url) as response:
-                if response.status == 200:
-                    data = await response.json()
-                    
-                    # Extract price from response
-                    if "Global Quote" in data and "05. price" in data["Global Quote"]:
-                        return float(data["Global Quote"]["05. price"])
-                    else:
-                        raise Exception(f"Invalid response format from Alpha Vantage for {symbol}")
-                else:
-                    raise Exception(f"Alpha Vantage API returned status code {response.status}")
-    
-    async def _fetch_price_finnhub(self, symbol: str) -> float:
+        data = await self._request_json(ALPHA_VANTAGE, url, priority)
+        
+        # Extract price from response
+        if "Global Quote" in data and "05. price" in data["Global Quote"]:
+            return float(data["Global Quote"]["05. price"])
+        else:
+            raise Exception(f"Invalid response format from Alpha Vantage for {symbol}")
+    
+    async def _fetch_price_finnhub(self, symbol: str, priority: int = INTERACTIVE) -> float:
         """Fetch price data from Finnhub API as fallback"""
         if not self.finnhub_api_key:
             raise Exception("Finnhub API key not set")
         
         url = f"https://finnhub.io/api/v1/quote?symbol={symbol}&token={self.finnhub_api_key}"
         
-        async with aiohttp.ClientSession() as session:
-            async with session.get(url) as response:
-                if response.status == 200:
-                    data = await response.json()
-                    
-                    # Extract price from response
-                    if "c" in data:  # Current price
-                        return float(data["c"])
-                    else:
-                        raise Exception(f"Invalid response format from Finnhub for {symbol}")
-                else:
-                    raise Exception(f"Finnhub API returned status code {response.status}")
+        data = await self._request_json(FINNHUB, url, priority)
+        
+        # Extract price from response
+        if "c" in data:  # Current price
+            return float(data["c"])
+        else:
+            raise Exception(f"Invalid response format from Finnhub for {symbol}")
+    
+    async def _request_json(self, provider: str, url: str, priority: int = INTERACTIVE) -> Dict:
+        """
+        Make a rate-limited GET request to a provider and return the JSON body.
+        
+        Throttle replies (HTTP 429, or Alpha Vantage's rate limit notes sent
+        with status 200) make the provider's limiter back off and raise
+        ProviderThrottledError.
+        """
+        limiter = self._rate_limiters[provider]
+        await limiter.acquire(priority)
+        
+        session = self._get_session(provider)
+        async with session.get(url) as response:
+            if response.status == 429:
+                limiter.report_throttled()
+                raise ProviderThrottledError(f"{PROVIDER_NAMES[provider]} API rate limit exceeded")
+            if response.status != 200:
+                raise Exception(f"{PROVIDER_NAMES[provider]} API returned status code {response.status}")
+            data = await response.json()
+        
+        if provider == ALPHA_VANTAGE and self._is_alpha_vantage_throttled(data):
+            limiter.report_throttled()
+            raise ProviderThrottledError(f"Alpha Vantage API rate limit exceeded: {data.get('Note') or data.get('Information')}")
+        
+        limiter.report_success()
+        return data
+    
+    @staticmethod
+    def _is_alpha_vantage_throttled(data: Dict) -> bool:
+        """Check whether an Alpha Vantage reply is a rate limit note instead of data"""
+        message = data.get("Note") or data.get("Information")
+        if not isinstance(message, str):
+            return False
+        message = message.lower()
+        return any(phrase in message for phrase in ALPHA_VANTAGE_THROTTLE_PHRASES)
     
     async def get_historical_data(
         self, 
         symbol: str, 
         start_date: Optional[datetime] = None,
-        end_date: Optional[datetime] = None
+        end_date: Optional[datetime] = None,
+        priority: int = INTERACTIVE
     ) -> List[Dict]:
         """Get historical price data for a given ticker symbol"""
+        arrays = await self.get_historical_arrays(symbol, start_date, end_date, priority)
+        
+        # Row view over the column arrays
+        dates = np.datetime_as_string(arrays["date"], unit="D").tolist()
+        return [
+            {
+                "date": date,
+                "open": open_,
+                "high": high,
+                "low": low,
+                "close": close,
+                "volume": volume
+            }
+            for date, open_, high, low, close, volume in zip(
+                dates,
+                arrays["open"].tolist(),
+                arrays["high"].tolist(),
+                arrays["low"].tolist(),
+                arrays["close"].tolist(),
+                arrays["volume"].tolist(),
+            )
+        ]
+    
+    async def get_historical_arrays(
+        self,
+        symbol: str,
+        start_date: Optional[datetime] = None,
+        end_date: Optional[datetime] = None,
+        priority: int = INTERACTIVE
+    ) -> Dict[str, np.ndarray]:
+        """
+        Get historical price data for a ticker symbol as column arrays.
+        
+        Returns contiguous, date-ascending arrays keyed by column: "date"
+        (datetime64[D]) and "open", "high", "low", "close", "volume" (float64).
+        """
         if not end_date:
             end_date = datetime.utcnow()
             
@@ -98,69 +533,171 @@ class MarketDataService:
             # Default to last 1 year
             start_date = end_date - timedelta(days=365)
         
-        # Format dates for API
-        start_str = start_date.strftime("%Y-%m-%d")
-        end_str = end_date.strftime("%Y-%m-%d")
+        # Concurrent callers for the same symbol share one store top-up
+        bars = await self._single_flight(
+            "historical", symbol, lambda: self._load_daily_bars(symbol, priority)
+        )
+        return to_columns(slice_bars(bars, start_date, end_date))
+    
+    def get_stored_bar_date(self, symbol: str) -> Optional[np.datetime64]:
+        """
+        Get the date of the latest daily bar stored locally for a symbol.
         
+        Returns None unless the stored bars were checked against the provider
+        recently, so callers can tell "no newer bar exists" apart from
+        "not checked yet" without any network round trip.
+        """
+        if not self._is_recent(self._bar_store.updated_at(symbol)):
+            return None
+        return self._bar_store.last_date(symbol)
+    
+    async def _load_daily_bars(self, symbol: str, priority: int = INTERACTIVE) -> np.ndarray:
+        """
+        Get all daily bars for a symbol, topping up the local store if needed.
+        
+        The first load downloads the full history. Later loads fetch only the
+        compact (latest ~100 bars) series and merge it in, and are skipped
+        entirely if the store was checked recently. Before going to the
+        provider the shared cache tier is consulted, in case another worker
+        has already topped the symbol up.
+        """
+        bars = self._bar_store.load(symbol)
+        if bars is not None and len(bars) > 0 and self._is_recent(self._bar_store.updated_at(symbol)):
+            self._bar_store_stats["local_reads"] += 1
+            return bars
+        
+        changed = False
+        shared = await self._get_shared_bars(symbol)
+        if shared is not None:
+            shared_bars, checked_at = shared
+            if bars is None or len(bars) == 0 or shared_bars["date"][-1] > bars["date"][-1]:
+                bars = merge_bars(bars, shared_bars)
+                changed = True
+            if self._is_recent(checked_at):
+                self._bar_store_stats["shared_reads"] += 1
+                return self._bar_store.save(symbol, bars)
+        
+        if bars is not None and len(bars) > 0:
+            # Compact output only covers ~100 trading days, fall back to full for older gaps
+            gap_days = (np.datetime64(datetime.utcnow(), "D") - bars["date"][-1]).astype(int)
+            outputsize = "compact" if gap_days <= COMPACT_OUTPUT_MAX_GAP_DAYS else "full"
+        else:
+            outputsize = "full"
+        
+        try:
+            time_series = await self._fetch_daily_series(symbol, outputsize=outputsize, priority=priority)
+            new_bars = parse_daily_series(time_series)
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            if bars is None or len(bars) == 0:
+                raise
+            # Serve the stored bars when a top-up fails (rate limit, provider outage)
+            self._bar_store_stats["failed_top_ups"] += 1
+            print(f"Error topping up daily bars for {symbol}, serving stored bars: {e}")
+            if changed:
+                self._bar_store.save(symbol, bars)
+            return bars
+
+        if bars is not None and len(bars) > 0 and (
+            len(new_bars) == 0 or new_bars["date"][-1] <= bars["date"][-1]
+        ):
+            # Nothing new since the last top-up (weekend, holiday)
+            self._bar_store_stats["local_reads"] += 1
+        else:
+            self._bar_store_stats[f"{outputsize}_fetches"] += 1
+            bars = merge_bars(bars, new_bars)
+            changed = True
+        
+        if changed:
+            self._bar_store.save(symbol, bars)
+        else:
+            self._bar_store.touch(symbol)
+        await self._set_shared_bars(symbol, bars)
+        return bars
+    
+    def _is_recent(self, checked_at: Optional[datetime]) -> bool:
+        """Check whether stored bars were checked against the provider recently enough"""
+        max_age = timedelta(seconds=settings.MARKET_DATA_BAR_STORE_MAX_AGE)
+        return checked_at is not None and datetime.utcnow() - checked_at < max_age
+    
+    async def _get_shared_bars(self, symbol: str) -> Optional[Tuple[np.ndarray, datetime]]:
+        """Get bars and their last provider check time from the shared cache tier"""
+        if self._shared_cache is None:
+            return None
+        value = await self._shared_cache.get(f"bars:{symbol}")
+        if value is None:
+            return None
+        
+        with np.load(io.BytesIO(value)) as data:
+            bars = data["bars"]
+            checked_at = datetime.utcfromtimestamp(float(data["checked_at"]))
+        if len(bars) == 0:
+            return None
+        return bars, checked_at
+    
+    async def _set_shared_bars(self, symbol: str, bars: np.ndarray) -> None:
+        """Write bars through to the shared cache tier, stamped as checked now"""
+        if self._shared_cache is None:
+            return
+        buffer = io.BytesIO()
+        np.savez(buffer, bars=bars, checked_at=np.array(time.time()))
+        await self._shared_cache.set(f"bars:{symbol}", buffer.getvalue())
+    
+    async def _fetch_daily_series(
+        self, symbol: str, outputsize: str = "full", priority: int = INTERACTIVE
+    ) -> Dict[str, Dict]:
+        """Fetch the raw daily time series for a symbol from Alpha Vantage"""
         url = (
             f"https://www.alphavantage.co/query?function=TIME_SERIES_DAILY"
             f"&symbol={symbol}&apikey={self.alpha_vantage_api_key}"
-            f"&outputsize=full"
+            f"&outputsize={outputsize}"
         )
         
-        async with aiohttp.ClientSession() as session:
-            async with session.get(url) as response:
-                if response.status == 200:
-                    data = await response.json()
-                    
-                    # Extract historical data
-                    if "Time Series (Daily)" in data:
-                        time_series = data["Time Series (Daily)"]
-                        result = []
-                        
-                        for date_str, values in time_series.items():
-                            date = datetime.strptime(date_str, "%Y-%m-%d")
-                            
-                            # Only include dates within the range
-                            if start_date <= date <= end_date:
-                                result.append({
-                                    "date": date_str,
-                                    "open": float(values["1. open"]),
-                                    "high": float(values["2. high"]),
-                                    "low": float(values["3. low"]),
-                                    "close": float(values["4. close"]),
-                                    "volume": float(values["5. volume"])
-                                })
-                        
-                        # Sort by date ascending
-                        return sorted(result, key=lambda x: x["date"])
-                    else:
-                        raise Exception(f"Invalid response format from Alpha Vantage for {symbol}")
-                else:
-                    raise Exception(f"Alpha Vantage API returned status code {response.status}")
+        data = await self._request_json(ALPHA_VANTAGE, url, priority)
+        
+        # Extract historical data
+        if "Time Series (Daily)" in data:
+            return data["Time Series (Daily)"]
+        else:
+            raise Exception(f"Invalid response format from Alpha Vantage for {symbol}")
     
     async def search_symbols(self, query: str) -> List[Dict]:
         """Search for ticker symbols based on a query"""
+        cache_key = query.strip().lower()
+        results = self._search_cache.get(cache_key)
+        if results is not None:
+            return results
+        
+        if self._shared_cache is not None:
+            value = await self._shared_cache.get(f"search:{cache_key}")
+            if value is not None:
+                results = json.loads(value)
+                self._search_cache.set(cache_key, results)
+                return results
+        
         url = f"https://www.alphavantage.co/query?function=SYMBOL_SEARCH&keywords={query}&apikey={self.alpha_vantage_api_key}"
         
-        async with aiohttp.ClientSession() as session:
-            async with session.get(url) as response:
-                if response.status == 200:
-                    data = await response.json()
-                    
-                    # Extract search results
-                    if "bestMatches" in data:
-                        return [
-                            {
-                                "symbol": item["1. symbol"],
-                                "name": item["2. name"],
-                                "type": item["3. type"],
-                                "region": item["4. region"],
-                                "currency": item["8. currency"],
-                            }
-                            for item in data["bestMatches"]
-                        ]
-                    else:
-                        return []
-                else:
-                    raise Exception(f"Alpha Vantage API returned status code {response.status}")
\ No newline at end of file
+        data = await self._request_json(ALPHA_VANTAGE, url)
+        
+        # Extract search results
+        if "bestMatches" in data:
+            results = [
+                {
+                    "symbol": item["1. symbol"],
+                    "name": item["2. name"],
+                    "type": item["3. type"],
+                    "region": item["4. region"],
+                    "currency": item["8. currency"],
+                }
+                for item in data["bestMatches"]
+            ]
+        else:
+            return []
+        
+        self._search_cache.set(cache_key, results)
+        if self._shared_cache is not None:
+            await self._shared_cache.set(
+                f"search:{cache_key}", json.dumps(results).encode(), ttl=settings.MARKET_DATA_SEARCH_CACHE_TTL
+            )
+        return results
\ No newline at end of file
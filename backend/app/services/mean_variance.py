@@ -0,0 +1,260 @@
+from typing import Optional, Tuple
+
+import numpy as np
+
+# Relative ridge added to the covariance diagonal so singular matrices (duplicate
+# or perfectly collinear assets, fewer observations than assets) stay solvable
+COVARIANCE_RIDGE = 1e-10
+
+# Tolerance for weights sitting on a bound and for multiplier sign checks
+TOLERANCE = 1e-12
+
+class MeanVarianceFrontier:
+    """
+    Exact long-only mean-variance efficient frontier (critical line algorithm).
+    
+    Solves min w'Σw/2 - λ μ'w subject to sum(w) = 1 and 0 <= w_i <= u_i for
+    every λ >= 0 at once. Between turning points the set of assets at a
+    bound is fixed and the optimal weights move linearly, so the whole
+    frontier is described by the turning point weights; any target return
+    or the maximum Sharpe ratio portfolio is read off by interpolating
+    between two of them.
+    """
+    
+    def __init__(
+        self,
+        mean_returns: np.ndarray,
+        cov_matrix: np.ndarray,
+        upper_bounds: Optional[np.ndarray] = None
+    ):
+        self.mean_returns = np.asarray(mean_returns, dtype=float)
+        num_assets = len(self.mean_returns)
+        cov_matrix = np.asarray(cov_matrix, dtype=float)
+        scale = max(np.trace(cov_matrix) / max(num_assets, 1), TOLERANCE)
+        self.cov_matrix = cov_matrix + np.eye(num_assets) * scale * COVARIANCE_RIDGE
+        
+        if upper_bounds is None:
+            upper_bounds = np.ones(num_assets)
+        self.upper_bounds = np.clip(np.asarray(upper_bounds, dtype=float), 0.0, 1.0)
+        if num_assets == 0 or self.upper_bounds.sum() < 1 - 1e-9:
+            raise ValueError("Maximum allocations must add up to at least 100%")
+        
+        # Turning points from the maximum return corner (λ = ∞) down to the minimum variance portfolio (λ = 0)
+        self.lambdas, self.turning_weights = self._trace()
+        self.turning_returns = self.turning_weights @ self.mean_returns
+    
+    def portfolio_for_return(self, target_return: float) -> np.ndarray:
+        """Get the minimum variance weights for a target return, clamped to the attainable range"""
+        returns = self.turning_returns
+        if target_return >= returns[0]:
+            return self.turning_weights[0].copy()
+        if target_return <= returns[-1]:
+            return self.turning_weights[-1].copy()
+        
+        # Turning point returns decrease along the frontier, find the segment holding the target
+        k = int(np.searchsorted(-returns, -target_return, side="right")) - 1
+        k = min(max(k, 0), len(returns) - 2)
+        span = returns[k] - returns[k + 1]
+        s = (returns[k] - target_return) / span if span > 0 else 0.0
+        return self.turning_weights[k] + s * (self.turning_weights[k + 1] - self.turning_weights[k])
+    
+    def max_sharpe_portfolio(self, risk_free_rate: float = 0.0) -> np.ndarray:
+        """Get the weights with the highest Sharpe ratio on the frontier"""
+        best_weights = self.turning_weights[0]
+        best_sharpe = -np.inf
+        
+        for start, end in zip(self.turning_weights[:-1], self.turning_weights[1:]):
+            # On a segment w(s) = start + s * step the excess return is p + q*s and the
+            # variance A*s² + 2B*s + C, so the Sharpe ratio has one stationary point
+            step = end - start
+            p = start @ self.mean_returns - risk_free_rate
+            q = step @ self.mean_returns
+            a = step @ self.cov_matrix @ step
+            b = start @ self.cov_matrix @ step
+            c = start @ self.cov_matrix @ start
+            
+            candidates = [0.0, 1.0]
+            denominator = q * b - p * a
+            if abs(denominator) > TOLERANCE:
+                s = (p * b - q * c) / denominator
+                if 0.0 < s < 1.0:
+                    candidates.append(s)
+            
+            for s in candidates:
+                variance = a * s * s + 2 * b * s + c
+                if variance <= 0:
+                    continue
+                sharpe = (p + q * s) / np.sqrt(variance)
+                if sharpe > best_sharpe:
+                    best_sharpe = sharpe
+                    best_weights = start + s * step
+        
+        if len(self.turning_weights) == 1:
+            return self.turning_weights[0].copy()
+        return np.clip(best_weights, 0.0, None)
+    
+    def sample(self, num_points: int) -> np.ndarray:
+        """Get weights for num_points returns evenly spaced from the minimum variance to the maximum return portfolio"""
+        targets = np.linspace(self.turning_returns[-1], self.turning_returns[0], num_points)
+        return np.array([self.portfolio_for_return(r) for r in targets])
+    
+    def statistics(self, weights: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+        """Get (returns, volatilities) for one weight vector or a matrix of them"""
+        weights = np.atleast_2d(weights)
+        returns = weights @ self.mean_returns
+        variances = np.einsum('ij,ij->i', weights @ self.cov_matrix, weights)
+        return returns, np.sqrt(np.clip(variances, 0.0, None))
+    
+    def _trace(self) -> Tuple[np.ndarray, np.ndarray]:
+        """Walk λ from ∞ down to 0, recording the weights at every change of the active set"""
+        mu = self.mean_returns
+        cov = self.cov_matrix
+        upper = self.upper_bounds
+        num_assets = len(mu)
+        
+        weights, free = self._max_return_corner()
+        at_upper = ~free & (weights > 0)
+        lambdas = [np.inf]
+        turning_weights = [weights.copy()]
+        current = np.inf
+        
+        for _ in range(4 * num_assets + 10):
+            w_free, nu, slope_free, slope_nu = self._solve_segment(free, weights)
+            
+            # A free asset already on a bound (the corner when bounds add up to exactly 100%, or
+            # two events at the same λ) that would move past it as λ falls stays on that bound
+            outward = np.where(
+                weights[free] >= upper[free] - TOLERANCE, slope_free < -TOLERANCE,
+                (weights[free] <= TOLERANCE) & (slope_free > TOLERANCE)
+            )
+            if outward.any() and not outward.all():
+                leaving = np.flatnonzero(free)[outward]
+                free[leaving] = False
+                at_upper[leaving] = weights[leaving] > TOLERANCE
+                weights[leaving] = np.where(at_upper[leaving], upper[leaving], 0.0)
+                continue
+            
+            # Gradient plus the budget multiplier for assets on a bound, affine in λ
+            bound = ~free
+            w0 = weights.copy()
+            w0[free] = w_free
+            w1 = np.zeros(num_assets)
+            w1[free] = slope_free
+            h0 = (cov @ w0)[bound] + nu
+            h1 = (cov @ w1)[bound] - mu[bound] + slope_nu
+            
+            next_lambda = 0.0
+            event = None
+            
+            # A free asset reaching a bound as λ falls
+            free_idx = np.flatnonzero(free)
+            with np.errstate(divide="ignore", invalid="ignore"):
+                hits = np.where(
+                    slope_free > TOLERANCE,
+                    -w_free / slope_free,
+                    np.where(slope_free < -TOLERANCE, (upper[free] - w_free) / slope_free, np.nan)
+                )
+            next_lambda, event = self._next_event(hits, current, next_lambda, event, free_idx, slope_free > 0)
+            
+            # A bounded asset whose multiplier reaches zero, so it should enter the free set
+            bound_idx = np.flatnonzero(bound)
+            moving = np.where(at_upper[bound], h1 < -TOLERANCE, h1 > TOLERANCE) & (upper[bound] > TOLERANCE)
+            with np.errstate(divide="ignore", invalid="ignore"):
+                hits = np.where(moving, -h0 / h1, np.nan)
+            next_lambda, event = self._next_event(hits, current, next_lambda, event, bound_idx, None)
+            
+            weights = w0 + next_lambda * w1
+            weights[free] = np.clip(weights[free], 0.0, upper[free])
+            lambdas.append(next_lambda)
+            turning_weights.append(weights.copy())
+            
+            if event is None:
+                break
+            
+            i, target = event
+            if target == "free":
+                free[i] = True
+                at_upper[i] = False
+            else:
+                free[i] = False
+                at_upper[i] = target == "upper"
+                weights[i] = upper[i] if at_upper[i] else 0.0
+            current = next_lambda
+        
+        return np.array(lambdas), np.array(turning_weights)
+    
+    @staticmethod
+    def _next_event(
+        hits: np.ndarray,
+        current: float,
+        next_lambda: float,
+        event: Optional[Tuple[int, str]],
+        indices: np.ndarray,
+        to_lower: Optional[np.ndarray]
+    ) -> Tuple[float, Optional[Tuple[int, str]]]:
+        """Pick the largest candidate λ below the current one, keeping the previous best if larger"""
+        valid = (hits > next_lambda) & (hits < current - TOLERANCE)
+        if not valid.any():
+            return next_lambda, event
+        
+        j = int(np.argmax(np.where(valid, hits, -np.inf)))
+        if to_lower is None:
+            target = "free"
+        else:
+            target = "lower" if to_lower[j] else "upper"
+        return float(hits[j]), (int(indices[j]), target)
+    
+    def _max_return_corner(self) -> Tuple[np.ndarray, np.ndarray]:
+        """Fill assets by descending expected return up to their bound; the last one filled stays free"""
+        num_assets = len(self.mean_returns)
+        weights = np.zeros(num_assets)
+        free = np.zeros(num_assets, dtype=bool)
+        remaining = 1.0
+        
+        for i in np.argsort(-self.mean_returns, kind="stable"):
+            if self.upper_bounds[i] <= 0:
+                continue
+            weights[i] = min(self.upper_bounds[i], remaining)
+            remaining -= weights[i]
+            if remaining <= TOLERANCE:
+                free[i] = True
+                break
+        
+        if not free.any():
+            # Bounds add up to exactly 100% up to rounding, free the last asset filled
+            free[np.flatnonzero(weights > 0)[-1]] = True
+        
+        return weights, free
+    
+    def _solve_segment(
+        self,
+        free: np.ndarray,
+        weights: np.ndarray
+    ) -> Tuple[np.ndarray, float, np.ndarray, float]:
+        """
+        Solve the KKT system for the free assets with the others held at their bounds.
+        
+        Returns (w_free, nu, slope_free, slope_nu) where the free weights are
+        w_free + λ * slope_free and the budget multiplier is nu + λ * slope_nu.
+        """
+        mu = self.mean_returns
+        cov = self.cov_matrix
+        bound = ~free
+        num_free = int(free.sum())
+        
+        kkt = np.zeros((num_free + 1, num_free + 1))
+        kkt[:num_free, :num_free] = cov[np.ix_(free, free)]
+        kkt[:num_free, num_free] = 1.0
+        kkt[num_free, :num_free] = 1.0
+        
+        rhs = np.zeros((num_free + 1, 2))
+        rhs[:num_free, 0] = -cov[np.ix_(free, bound)] @ weights[bound]
+        rhs[num_free, 0] = 1.0 - weights[bound].sum()
+        rhs[:num_free, 1] = mu[free]
+        
+        try:
+            solution = np.linalg.solve(kkt, rhs)
+        except np.linalg.LinAlgError:
+            solution = np.linalg.lstsq(kkt, rhs, rcond=None)[0]
+        
+        return solution[:num_free, 0], solution[num_free, 0], solution[:num_free, 1], solution[num_free, 1]
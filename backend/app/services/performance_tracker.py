@@ -1,12 +1,69 @@
-from datetime import datetime, timedelta
-from typing import Dict, List, Optional, Tuple
+import math
+import time
+from datetime import datetime, timedelta, timezone
+from typing import Callable, Dict, List, Optional, Tuple
+
+import numpy as np
 from sqlalchemy.orm import Session
 from sqlalchemy import func, and_, or_
 
 from ..models.portfolio import Portfolio, Allocation
-from ..models.portfolio_history import PortfolioSnapshot, AssetSnapshot
+from ..models.portfolio_history import PortfolioSnapshot, PortfolioValueRollup
 from ..schemas.performance import PerformanceMetrics
 from ..services.market_data import MarketDataService
+from ..services.rate_limiter import BACKGROUND
+from ..services.snapshot_writer import insert_snapshots
+from ..services.value_rollups import add_periods, bucket_start, period_index, period_index_expression
+
+# Investment amount for a portfolio's first snapshot
+DEFAULT_INVESTMENT_AMOUNT = 10000.0
+
+# Look-back periods (days) for the daily, monthly and yearly changes
+CHANGE_PERIODS = (1, 30, 365)
+
+# History downsampling: calendar buckets, or "auto" buckets of several days, weeks or months
+HISTORY_INTERVALS = ("daily", "weekly", "monthly", "auto")
+BUCKET_UNITS = {"daily": "day", "weekly": "week", "monthly": "month"}
+
+def _naive_utc(value: datetime) -> datetime:
+    """Convert an aware datetime to naive UTC, naive values are assumed to be UTC already"""
+    if value.tzinfo is None:
+        return value
+    return value.astimezone(timezone.utc).replace(tzinfo=None)
+
+def _auto_buckets(start_date: datetime, end_date: datetime, max_points: int) -> Tuple[str, int]:
+    """
+    Pick the bucket (period, periods per bucket) for at most max_points buckets.
+    
+    Uses days while a bucket is shorter than a week and weeks while it is
+    shorter than four, so buckets line up with a rollup period.
+    """
+    for period, max_count in (("day", 7), ("week", 4)):
+        periods = period_index(period, end_date) - period_index(period, start_date) + 1
+        count = math.ceil(periods / max_points)
+        if count < max_count:
+            return period, count
+    
+    months = period_index("month", end_date) - period_index("month", start_date) + 1
+    return "month", math.ceil(months / max_points)
+
+def _merge_points(points: Dict[int, Dict], new_points: Dict[int, Dict]) -> None:
+    """Merge bucket points aggregated from different sources into points"""
+    for index, new in new_points.items():
+        current = points.get(index)
+        if current is None:
+            points[index] = new
+            continue
+        
+        later = new if new["date"] > current["date"] else current
+        earlier = new if new["first_date"] < current["first_date"] else current
+        points[index] = {
+            **later,
+            "first_date": earlier["first_date"],
+            "open": earlier["open"],
+            "high": max(current["high"], new["high"]),
+            "low": min(current["low"], new["low"]),
+        }
 
 class PerformanceTracker:
     def __init__(self, market_data_service: MarketDataService):
@@ -44,21 +101,23 @@ class PerformanceTracker:
                 .first()
             )
             
-            investment_amount = 10000.0  # Default
+            investment_amount = DEFAULT_INVESTMENT_AMOUNT
             if latest_snapshot:
                 investment_amount = latest_snapshot.total_value
         
-        # Get current prices and calculate values
+        # Get current prices for all assets in one batch
+        tickers = [allocation.ticker for allocation in allocations if allocation.ticker]
+        prices, errors = await self.market_data.get_latest_prices(tickers, priority=BACKGROUND)
+        for ticker, error in errors.items():
+            print(f"Error getting price for {ticker}: {error}")
+        
+        # Calculate values
         for allocation in allocations:
             if not allocation.ticker:
                 continue
             
-            # Get current price for this asset
-            try:
-                price = await self.market_data.get_latest_price(allocation.ticker)
-            except Exception as e:
-                print(f"Error getting price for {allocation.ticker}: {e}")
-                price = 0.0  # Set to zero if price fetch fails
+            # Set to zero if price fetch failed
+            price = prices.get(allocation.ticker, 0.0)
             
             # Calculate quantity based on allocation percentage and investment amount
             quantity = (allocation.allocation_percentage * investment_amount) / price if price > 0 else 0
@@ -81,89 +140,221 @@ class PerformanceTracker:
             db, portfolio_id, total_value
         )
         
-        # Create portfolio snapshot
-        snapshot = PortfolioSnapshot(
-            portfolio_id=portfolio_id,
-            total_value=total_value,
-            date=datetime.utcnow(),
-            daily_change_percent=daily_change,
-            monthly_change_percent=monthly_change,
-            yearly_change_percent=yearly_change
+        # Write the snapshot and its asset rows in two statements
+        snapshot_id, = insert_snapshots(db, [{
+            "portfolio_id": portfolio_id,
+            "total_value": total_value,
+            "date": datetime.utcnow(),
+            "daily_change_percent": daily_change,
+            "monthly_change_percent": monthly_change,
+            "yearly_change_percent": yearly_change
+        }], [assets])
+        db.commit()
+        
+        return db.query(PortfolioSnapshot).filter(PortfolioSnapshot.id == snapshot_id).first()
+    
+    async def create_snapshots_batch(
+        self,
+        db: Session,
+        portfolio_ids: Optional[List[int]] = None,
+        chunk_size: int = 1000,
+        progress: Optional[Callable[[int, int], None]] = None
+    ) -> Dict:
+        """
+        Snapshot every portfolio (or the given ones) in one batch.
+        
+        Allocations are loaded in one query, each distinct ticker is priced
+        once and all portfolios are valued with array arithmetic, the same
+        way create_snapshot values a single one. Snapshots are written and
+        committed in chunks of chunk_size portfolios, so a failing chunk
+        only loses its own rows; progress(done, total) is called after each
+        chunk. Returns counts and per-phase timings of the run.
+        """
+        started = time.perf_counter()
+        now = datetime.utcnow()
+        
+        # Load all allocations at once, grouped by portfolio
+        query = db.query(
+            Allocation.portfolio_id,
+            Allocation.id,
+            Allocation.asset_name,
+            Allocation.ticker,
+            Allocation.allocation_percentage
+        ).filter(Allocation.portfolio_id.isnot(None))
+        if portfolio_ids is not None:
+            query = query.filter(Allocation.portfolio_id.in_(portfolio_ids))
+        rows = query.order_by(Allocation.portfolio_id, Allocation.id).all()
+        
+        stats = {
+            "started_at": now,
+            "portfolios": 0,
+            "snapshots": 0,
+            "asset_snapshots": 0,
+            "failed_portfolios": 0,
+            "tickers": 0,
+            "price_errors": 0,
+            "chunks": 0,
+        }
+        if not rows:
+            stats["elapsed_seconds"] = time.perf_counter() - started
+            stats["portfolios_per_second"] = 0.0
+            return stats
+        
+        row_portfolio_ids, allocation_ids, asset_names, row_tickers, percentages = zip(*rows)
+        ids, row_portfolio = np.unique(np.array(row_portfolio_ids), return_inverse=True)
+        
+        # Previous values: the latest one is the investment amount, the others give the changes
+        previous = [self._latest_snapshot_values(db, ids, None)]
+        previous += [
+            self._latest_snapshot_values(db, ids, now - timedelta(days=days))
+            for days in CHANGE_PERIODS
+        ]
+        stats["load_seconds"] = time.perf_counter() - started
+        
+        # Price each distinct ticker once
+        phase_started = time.perf_counter()
+        tickers = sorted({ticker for ticker in row_tickers if ticker})
+        prices, errors = await self.market_data.get_latest_prices(tickers, priority=BACKGROUND)
+        for ticker, error in errors.items():
+            print(f"Error getting price for {ticker}: {error}")
+        stats["tickers"] = len(tickers)
+        stats["price_errors"] = len(errors)
+        stats["price_seconds"] = time.perf_counter() - phase_started
+        
+        # Value every allocation, allocations without a ticker are skipped like in create_snapshot
+        phase_started = time.perf_counter()
+        has_ticker = np.array([bool(ticker) for ticker in row_tickers])
+        row_prices = np.array([prices.get(ticker, 0.0) if ticker else 0.0 for ticker in row_tickers])
+        row_percentages = np.array([pct if pct is not None else 0.0 for pct in percentages], dtype=float)
+        
+        investment = previous[0][row_portfolio]
+        investment = np.where(np.isnan(investment), DEFAULT_INVESTMENT_AMOUNT, investment)
+        with np.errstate(divide="ignore", invalid="ignore"):
+            quantities = np.where(row_prices > 0, row_percentages * investment / row_prices, 0.0)
+        values = row_prices * quantities
+        totals = np.bincount(row_portfolio, weights=np.where(has_ticker, values, 0.0), minlength=len(ids))
+        
+        changes = []
+        for previous_values in previous[1:]:
+            with np.errstate(divide="ignore", invalid="ignore"):
+                change = (totals - previous_values) / previous_values * 100
+            changes.append([float(c) if np.isfinite(c) else None for c in change])
+        stats["value_seconds"] = time.perf_counter() - phase_started
+        
+        # Write in chunks of portfolios, rows are sorted by portfolio so each chunk is a row slice
+        phase_started = time.perf_counter()
+        row_bounds = np.searchsorted(row_portfolio, np.arange(len(ids) + 1))
+        for chunk_start in range(0, len(ids), chunk_size):
+            chunk_end = min(chunk_start + chunk_size, len(ids))
+            try:
+                snapshots = [
+                    {
+                        "portfolio_id": int(ids[i]),
+                        "total_value": float(totals[i]),
+                        "date": now,
+                        "daily_change_percent": changes[0][i],
+                        "monthly_change_percent": changes[1][i],
+                        "yearly_change_percent": changes[2][i]
+                    }
+                    for i in range(chunk_start, chunk_end)
+                ]
+                assets = [
+                    [
+                        {
+                            "allocation_id": allocation_ids[row],
+                            "asset_name": asset_names[row],
+                            "ticker": row_tickers[row],
+                            "price": float(row_prices[row]),
+                            "quantity": float(quantities[row]),
+                            "value": float(values[row]),
+                            "allocation_percentage": percentages[row]
+                        }
+                        for row in range(row_bounds[i], row_bounds[i + 1])
+                        if has_ticker[row]
+                    ]
+                    for i in range(chunk_start, chunk_end)
+                ]
+                insert_snapshots(db, snapshots, assets, use_copy=True)
+                db.commit()
+            except Exception as e:
+                db.rollback()
+                print(f"Error writing snapshots for portfolios {ids[chunk_start]}-{ids[chunk_end - 1]}: {e}")
+                stats["failed_portfolios"] += chunk_end - chunk_start
+            else:
+                stats["snapshots"] += len(snapshots)
+                stats["asset_snapshots"] += sum(len(snapshot_assets) for snapshot_assets in assets)
+            
+            stats["portfolios"] = chunk_end
+            stats["chunks"] += 1
+            if progress:
+                progress(chunk_end, len(ids))
+        
+        stats["write_seconds"] = time.perf_counter() - phase_started
+        stats["elapsed_seconds"] = time.perf_counter() - started
+        stats["portfolios_per_second"] = stats["portfolios"] / stats["elapsed_seconds"]
+        return stats
+    
+    def _latest_snapshot_values(
+        self, db: Session, portfolio_ids: np.ndarray, before: Optional[datetime]
+    ) -> np.ndarray:
+        """
+        Total value of each portfolio's latest snapshot taken at or before a date.
+        
+        Returns an array aligned with portfolio_ids, NaN where a portfolio
+        has no such snapshot.
+        """
+        latest = db.query(
+            PortfolioSnapshot.portfolio_id,
+            func.max(PortfolioSnapshot.date).label("date")
+        ).filter(PortfolioSnapshot.portfolio_id.in_(portfolio_ids.tolist()))
+        if before is not None:
+            latest = latest.filter(PortfolioSnapshot.date <= before)
+        latest = latest.group_by(PortfolioSnapshot.portfolio_id).subquery()
+        
+        rows = (
+            db.query(PortfolioSnapshot.portfolio_id, PortfolioSnapshot.total_value)
+            .join(latest, and_(
+                PortfolioSnapshot.portfolio_id == latest.c.portfolio_id,
+                PortfolioSnapshot.date == latest.c.date
+            ))
+            .all()
         )
-        db.add(snapshot)
-        db.flush()  # Get snapshot ID without committing transaction
-        
-        # Create asset snapshots
-        for asset_data in assets:
-            asset_snapshot = AssetSnapshot(
-                snapshot_id=snapshot.id,
-                allocation_id=asset_data["allocation_id"],
-                asset_name=asset_data["asset_name"],
-                ticker=asset_data["ticker"],
-                price=asset_data["price"],
-                quantity=asset_data["quantity"],
-                value=asset_data["value"],
-                allocation_percentage=asset_data["allocation_percentage"]
-            )
-            db.add(asset_snapshot)
         
-        db.commit()
-        db.refresh(snapshot)
-        return snapshot
+        values = np.full(len(portfolio_ids), np.nan)
+        if rows:
+            found_ids, found_values = zip(*rows)
+            values[np.searchsorted(portfolio_ids, found_ids)] = found_values
+        return values
     
     def _calculate_changes(
         self, db: Session, portfolio_id: int, current_value: float
     ) -> Tuple[Optional[float], Optional[float], Optional[float]]:
         """Calculate daily, monthly, and yearly percentage changes"""
-        daily_change = None
-        monthly_change = None
-        yearly_change = None
-        
         now = datetime.utcnow()
         
-        # Find previous day's snapshot
-        day_snapshot = (
-            db.query(PortfolioSnapshot)
-            .filter(
-                PortfolioSnapshot.portfolio_id == portfolio_id,
-                PortfolioSnapshot.date <= now - timedelta(days=1)
-            )
-            .order_by(PortfolioSnapshot.date.desc())
-            .first()
-        )
-        
-        # Find previous month's snapshot
-        month_snapshot = (
-            db.query(PortfolioSnapshot)
-            .filter(
-                PortfolioSnapshot.portfolio_id == portfolio_id,
-                PortfolioSnapshot.date <= now - timedelta(days=30)
+        # Latest snapshot value at or before each look-back, all in one round trip. Each
+        # subquery is a LIMIT 1 scan of the (portfolio_id, date DESC) index.
+        def value_before(cutoff: datetime):
+            return (
+                db.query(PortfolioSnapshot.total_value)
+                .filter(
+                    PortfolioSnapshot.portfolio_id == portfolio_id,
+                    PortfolioSnapshot.date <= cutoff
+                )
+                .order_by(PortfolioSnapshot.date.desc())
+                .limit(1)
+                .scalar_subquery()
             )
-            .order_by(PortfolioSnapshot.date.desc())
-            .first()
-        )
         
-        # Find previous year's snapshot
-        year_snapshot = (
-            db.query(PortfolioSnapshot)
-            .filter(
-                PortfolioSnapshot.portfolio_id == portfolio_id,
-                PortfolioSnapshot.date <= now - timedelta(days=365)
-            )
-            .order_by(PortfolioSnapshot.date.desc())
-            .first()
-        )
+        previous_values = db.query(
+            *(value_before(now - timedelta(days=days)) for days in CHANGE_PERIODS)
+        ).one()
         
         # Calculate changes
-        if day_snapshot:
-            daily_change = ((current_value - day_snapshot.total_value) / day_snapshot.total_value) * 100
-            
-        if month_snapshot:
-            monthly_change = ((current_value - month_snapshot.total_value) / month_snapshot.total_value) * 100
-            
-        if year_snapshot:
-            yearly_change = ((current_value - year_snapshot.total_value) / year_snapshot.total_value) * 100
-            
+        daily_change, monthly_change, yearly_change = (
+            ((current_value - previous_value) / previous_value) * 100 if previous_value else None
+            for previous_value in previous_values
+        )
         return daily_change, monthly_change, yearly_change
     
     def get_performance_history(
@@ -172,38 +363,159 @@ class PerformanceTracker:
         portfolio_id: int, 
         start_date: Optional[datetime] = None,
         end_date: Optional[datetime] = None,
-        interval: str = "daily"  # daily, weekly, monthly
-    ) -> List[PortfolioSnapshot]:
+        interval: str = "daily",  # daily, weekly, monthly, auto
+        ohlc: bool = False,
+        max_points: int = 200
+    ) -> List[Dict]:
         """
         Get performance history for a portfolio within a date range
+        
+        Snapshots are downsampled to the last snapshot per bucket: calendar
+        days, weeks (starting Monday) or months, or for "auto" at most
+        max_points buckets of whole days, weeks or months. With ohlc, each
+        point also gets the open, high, low and close of total_value within
+        its bucket. Buckets fully inside the range are read from the
+        coarsest value rollup that lines up with them; only the partial
+        buckets at either end are aggregated from the snapshots.
         """
+        if interval not in HISTORY_INTERVALS:
+            raise ValueError(f"Invalid interval: {interval}. Must be one of: {list(HISTORY_INTERVALS)}")
+        
         if not end_date:
             end_date = datetime.utcnow()
-            
+        
         if not start_date:
             # Default to last 3 months
             start_date = end_date - timedelta(days=90)
         
-        query = (
-            db.query(PortfolioSnapshot)
-            .filter(
+        # Buckets are computed on naive UTC datetimes, like the stored snapshot dates
+        start_date, end_date = _naive_utc(start_date), _naive_utc(end_date)
+        
+        if interval == "auto":
+            if max_points < 1:
+                raise ValueError("max_points must be positive")
+            period, count = _auto_buckets(start_date, end_date, max_points)
+        else:
+            period, count = BUCKET_UNITS[interval], 1
+        
+        # Output buckets are `count` periods each, counted from the period containing start_date
+        origin = bucket_start(period, start_date)
+        origin_index = period_index(period, start_date)
+        
+        def output_index(column):
+            return func.floor((period_index_expression(period, column) - origin_index) / count)
+        
+        # Periods entirely within the range come from the rollup
+        first_full = start_date if start_date == origin else add_periods(period, origin, 1)
+        tail_start = max(bucket_start(period, end_date), first_full)
+        if first_full < tail_start and not self._has_rollups(db, portfolio_id, period):
+            # Snapshots not rolled up yet (no backfill), read the whole range from them
+            first_full = tail_start = start_date
+        
+        points = {}
+        if first_full < tail_start:
+            rollup_points = self._bucket_points(
+                db,
+                {
+                    "id": PortfolioValueRollup.last_snapshot_id,
+                    "portfolio_id": PortfolioValueRollup.portfolio_id,
+                    "total_value": PortfolioValueRollup.close_value,
+                    "date": PortfolioValueRollup.last_date,
+                    "daily_change_percent": PortfolioValueRollup.daily_change_percent,
+                    "monthly_change_percent": PortfolioValueRollup.monthly_change_percent,
+                    "yearly_change_percent": PortfolioValueRollup.yearly_change_percent,
+                    "first_date": PortfolioValueRollup.first_date,
+                    "open": PortfolioValueRollup.open_value,
+                    "high": PortfolioValueRollup.high_value,
+                    "low": PortfolioValueRollup.low_value,
+                },
+                [
+                    PortfolioValueRollup.portfolio_id == portfolio_id,
+                    PortfolioValueRollup.period == period,
+                    PortfolioValueRollup.bucket >= first_full,
+                    PortfolioValueRollup.bucket < tail_start,
+                ],
+                output_index(PortfolioValueRollup.bucket)
+            )
+            _merge_points(points, rollup_points)
+        
+        # Partial periods at the start and end of the range come from the snapshots
+        snapshot_points = self._bucket_points(
+            db,
+            {
+                "id": PortfolioSnapshot.id,
+                "portfolio_id": PortfolioSnapshot.portfolio_id,
+                "total_value": PortfolioSnapshot.total_value,
+                "date": PortfolioSnapshot.date,
+                "daily_change_percent": PortfolioSnapshot.daily_change_percent,
+                "monthly_change_percent": PortfolioSnapshot.monthly_change_percent,
+                "yearly_change_percent": PortfolioSnapshot.yearly_change_percent,
+                "first_date": PortfolioSnapshot.date,
+                "open": PortfolioSnapshot.total_value,
+                "high": PortfolioSnapshot.total_value,
+                "low": PortfolioSnapshot.total_value,
+            },
+            [
                 PortfolioSnapshot.portfolio_id == portfolio_id,
                 PortfolioSnapshot.date >= start_date,
-                PortfolioSnapshot.date <= end_date
+                PortfolioSnapshot.date <= end_date,
+                or_(PortfolioSnapshot.date < first_full, PortfolioSnapshot.date >= tail_start),
+            ],
+            output_index(PortfolioSnapshot.date)
+        )
+        _merge_points(points, snapshot_points)
+        
+        history = []
+        for index in sorted(points):
+            point = points[index]
+            point["bucket"] = add_periods(period, origin, index * count)
+            del point["first_date"]
+            if ohlc:
+                point["close"] = point["total_value"]
+            else:
+                del point["open"], point["high"], point["low"]
+            history.append(point)
+        return history
+    
+    def _bucket_points(self, db: Session, columns: Dict, filters: List, index) -> Dict[int, Dict]:
+        """
+        Aggregate rows into output buckets in the database.
+        
+        columns maps the point fields to a source's columns (snapshots or
+        rollups). Returns, per bucket index, the fields of the bucket's
+        last row with the earliest first_date and open, the highest high
+        and the lowest low.
+        """
+        ranked = (
+            db.query(
+                *(column.label(name) for name, column in columns.items() if name not in ("open", "high", "low")),
+                index.label("bucket_index"),
+                func.row_number().over(
+                    partition_by=index,
+                    order_by=(columns["date"].desc(), columns["id"].desc())
+                ).label("bucket_rank"),
+                func.first_value(columns["open"]).over(
+                    partition_by=index,
+                    order_by=(columns["first_date"].asc(), columns["id"].asc())
+                ).label("open"),
+                func.min(columns["first_date"]).over(partition_by=index).label("bucket_first_date"),
+                func.max(columns["high"]).over(partition_by=index).label("high"),
+                func.min(columns["low"]).over(partition_by=index).label("low"),
             )
+            .filter(*filters)
+            .subquery()
         )
         
-        # Apply interval sampling
-        if interval == "weekly":
-            # Extract the week and group by that
-            query = query.filter(func.date_part('dow', PortfolioSnapshot.date) == 1)
-        elif interval == "monthly":
-            # Extract the day of month and get only the 1st
-            query = query.filter(func.date_part('day', PortfolioSnapshot.date) == 1)
-        
-        # Order by date
-        snapshots = query.order_by(PortfolioSnapshot.date.asc()).all()
-        return snapshots
+        # Keep the last row of each bucket
+        rows = db.query(ranked).filter(ranked.c.bucket_rank == 1).all()
+        
+        points = {}
+        for row in rows:
+            point = dict(row._mapping)
+            point["first_date"] = point.pop("bucket_first_date")
+            del point["bucket_rank"]
+            points[int(point.pop("bucket_index"))] = point
+        return points
     
     def calculate_metrics(
         self, 
@@ -217,47 +529,91 @@ class PerformanceTracker:
         """
         if not end_date:
             end_date = datetime.utcnow()
-            
+        
         if not start_date:
             # Default to last 1 year
             start_date = end_date - timedelta(days=365)
         
-        # Get starting snapshot
-        start_snapshot = (
-            db.query(PortfolioSnapshot)
+        # Latest values at or before the start and end of the period
+        start_point = self._value_at(db, portfolio_id, start_date)
+        end_point = self._value_at(db, portfolio_id, end_date)
+        
+        if not start_point or not end_point:
+            raise ValueError("Insufficient snapshot data to calculate metrics")
+        
+        (period_start, starting_value), (period_end, ending_value) = start_point, end_point
+        
+        absolute_change = ending_value - starting_value
+        percent_change = (absolute_change / starting_value) * 100 if starting_value > 0 else 0
+        
+        return PerformanceMetrics(
+            period_start=period_start,
+            period_end=period_end,
+            starting_value=starting_value,
+            ending_value=ending_value,
+            percent_change=percent_change,
+            absolute_change=absolute_change
+        )
+    
+    def _value_at(
+        self, db: Session, portfolio_id: int, when: datetime
+    ) -> Optional[Tuple[datetime, float]]:
+        """
+        Date and total value of the latest snapshot at or before a date.
+        
+        Snapshots taken earlier on the same day are read directly, anything
+        older comes from the day rollup (the coarsest one that ends at the
+        day boundary), or from the snapshots if it has no earlier row.
+        """
+        day = bucket_start("day", when)
+        snapshot = (
+            db.query(PortfolioSnapshot.date, PortfolioSnapshot.total_value)
             .filter(
                 PortfolioSnapshot.portfolio_id == portfolio_id,
-                PortfolioSnapshot.date <= start_date
+                PortfolioSnapshot.date >= day,
+                PortfolioSnapshot.date <= when
             )
             .order_by(PortfolioSnapshot.date.desc())
             .first()
         )
+        if snapshot:
+            return snapshot.date, snapshot.total_value
+        
+        rollup = (
+            db.query(PortfolioValueRollup.last_date, PortfolioValueRollup.close_value)
+            .filter(
+                PortfolioValueRollup.portfolio_id == portfolio_id,
+                PortfolioValueRollup.period == "day",
+                PortfolioValueRollup.bucket < day
+            )
+            .order_by(PortfolioValueRollup.bucket.desc())
+            .first()
+        )
+        if rollup:
+            return rollup.last_date, rollup.close_value
         
-        # Get ending snapshot
-        end_snapshot = (
-            db.query(PortfolioSnapshot)
+        # Snapshots not rolled up yet (no backfill)
+        snapshot = (
+            db.query(PortfolioSnapshot.date, PortfolioSnapshot.total_value)
             .filter(
                 PortfolioSnapshot.portfolio_id == portfolio_id,
-                PortfolioSnapshot.date <= end_date
+                PortfolioSnapshot.date < day
             )
             .order_by(PortfolioSnapshot.date.desc())
             .first()
         )
-        
-        if not start_snapshot or not end_snapshot:
-            raise ValueError("Insufficient snapshot data to calculate metrics")
-        
-        starting_value = start_snapshot.total_value
-        ending_value = end_snapshot.total_value
-        
-        absolute_change = ending_value - starting_value
-        percent_change = (absolute_change / starting_value) * 100 if starting_value > 0 else 0
-        
-        return PerformanceMetrics(
-            period_start=start_snapshot.date,
-            period_end=end_snapshot.date,
-            starting_value=starting_value,
-            ending_value=ending_value,
-            percent_change=percent_change,
-            absolute_change=absolute_change
-        )
\ No newline at end of file
+        if snapshot:
+            return snapshot.date, snapshot.total_value
+        return None
+    
+    def _has_rollups(self, db: Session, portfolio_id: int, period: str) -> bool:
+        """Whether a portfolio has any rollup rows for a period"""
+        rollup = (
+            db.query(PortfolioValueRollup.id)
+            .filter(
+                PortfolioValueRollup.portfolio_id == portfolio_id,
+                PortfolioValueRollup.period == period
+            )
+            .first()
+        )
+        return rollup is not None
@@ -0,0 +1,112 @@
+import bisect
+import time
+from collections import deque
+from typing import Dict, Optional
+
+import numpy as np
+
+# Circuit breaker states
+CLOSED = "closed"
+OPEN = "open"
+HALF_OPEN = "half_open"
+
+# Upper bounds (seconds) of the latency histogram buckets, the last bucket is open-ended
+LATENCY_BUCKETS = (0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+class CircuitBreaker:
+    """
+    Circuit breaker for one upstream provider.
+    
+    Opens after `failure_threshold` consecutive failures, so the provider is
+    skipped instead of adding its timeout to every request. After
+    `reset_timeout` seconds a single probe request is let through
+    (half-open); success closes the circuit, failure opens it again.
+    """
+    
+    def __init__(self, name: str, failure_threshold: int = 5, reset_timeout: float = 30.0):
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        
+        self.state = CLOSED
+        self._failures = 0
+        self._opened_at = 0.0
+        self._probe_in_flight = False
+        self._stats = {"opened": 0, "rejected": 0, "failures": 0, "successes": 0}
+    
+    def allow_request(self) -> bool:
+        """Check whether a request may be sent, claiming the probe slot when half-open"""
+        if self.state == OPEN and time.monotonic() - self._opened_at >= self.reset_timeout:
+            self.state = HALF_OPEN
+            self._probe_in_flight = False
+        
+        if self.state == CLOSED:
+            return True
+        if self.state == HALF_OPEN and not self._probe_in_flight:
+            self._probe_in_flight = True
+            return True
+        
+        self._stats["rejected"] += 1
+        return False
+    
+    def record_success(self) -> None:
+        """Record a successful request, closing the circuit"""
+        self.state = CLOSED
+        self._failures = 0
+        self._probe_in_flight = False
+        self._stats["successes"] += 1
+    
+    def record_failure(self) -> None:
+        """Record a failed request, opening the circuit if the threshold is hit"""
+        self._failures += 1
+        self._stats["failures"] += 1
+        if self.state == HALF_OPEN or self._failures >= self.failure_threshold:
+            self.state = OPEN
+            self._opened_at = time.monotonic()
+            self._probe_in_flight = False
+            self._stats["opened"] += 1
+    
+    def release(self) -> None:
+        """Release a request that ended without a verdict (cancelled or throttled)"""
+        self._probe_in_flight = False
+    
+    def get_stats(self) -> Dict:
+        """Get the circuit state and counters"""
+        stats = dict(self._stats)
+        stats["state"] = self.state
+        stats["consecutive_failures"] = self._failures
+        return stats
+
+class LatencyHistogram:
+    """
+    Latency histogram for one provider.
+    
+    Keeps cumulative bucket counts for monitoring and a window of recent
+    samples for percentile estimates used in routing.
+    """
+    
+    def __init__(self, window: int = 200):
+        self._counts = [0] * (len(LATENCY_BUCKETS) + 1)
+        self._recent = deque(maxlen=window)
+    
+    def record(self, seconds: float) -> None:
+        """Record the latency of one successful request"""
+        self._counts[bisect.bisect_left(LATENCY_BUCKETS, seconds)] += 1
+        self._recent.append(seconds)
+    
+    def percentile(self, q: float, min_samples: int = 1) -> Optional[float]:
+        """Get the q-th percentile of recent latencies, or None with too few samples"""
+        if len(self._recent) < min_samples or not self._recent:
+            return None
+        return float(np.percentile(np.fromiter(self._recent, dtype=float), q))
+    
+    def get_stats(self) -> Dict:
+        """Get bucket counts and recent percentiles"""
+        labels = [f"le_{bound}" for bound in LATENCY_BUCKETS] + ["inf"]
+        return {
+            "buckets": dict(zip(labels, self._counts)),
+            "count": sum(self._counts),
+            "p50": self.percentile(50),
+            "p95": self.percentile(95),
+            "p99": self.percentile(99),
+        }
@@ -0,0 +1,143 @@
+import asyncio
+import heapq
+import itertools
+import time
+from typing import Dict, List, Optional
+
+# Request priorities, lower values are served first
+INTERACTIVE = 0
+BACKGROUND = 1
+PRIORITY_NAMES = {INTERACTIVE: "interactive", BACKGROUND: "background"}
+
+class ProviderThrottledError(Exception):
+    """Raised when a provider answers with a rate limit / throttle response"""
+    pass
+
+class RateLimiter:
+    """
+    Token-bucket rate limiter with a priority queue of waiters.
+    
+    Requests wait in (priority, arrival) order, so interactive requests jump
+    ahead of queued background work. When the provider reports throttling
+    the limiter backs off exponentially before granting more tokens, and
+    relaxes again after successful requests.
+    """
+    
+    def __init__(
+        self,
+        name: str,
+        requests_per_minute: float,
+        burst: int,
+        min_backoff: float = 15.0,
+        max_backoff: float = 120.0
+    ):
+        self.name = name
+        self.rate = requests_per_minute / 60.0  # Tokens per second
+        self.burst = burst
+        self.min_backoff = min_backoff
+        self.max_backoff = max_backoff
+        
+        self._tokens = float(burst)
+        self._updated = time.monotonic()
+        self._backoff = 0.0
+        self._backoff_until = 0.0
+        
+        # Waiters as [priority, sequence] entries, the heap head is served next
+        self._queue: List[List[int]] = []
+        self._counter = itertools.count()
+        self._condition: Optional[asyncio.Condition] = None
+        
+        self._stats = {
+            "granted": 0,
+            "throttled": 0,
+            "total_wait": 0.0,
+            "max_wait": 0.0,
+            "max_queue_depth": 0,
+        }
+    
+    async def acquire(self, priority: int = INTERACTIVE) -> None:
+        """Wait for a request slot, ahead of any queued lower-priority waiters"""
+        entry = [priority, next(self._counter)]
+        heapq.heappush(self._queue, entry)
+        self._stats["max_queue_depth"] = max(self._stats["max_queue_depth"], len(self._queue))
+        started = time.monotonic()
+        condition = self._get_condition()
+        
+        try:
+            async with condition:
+                while True:
+                    if self._queue[0] is entry:
+                        delay = self._time_until_available()
+                        if delay <= 0:
+                            break
+                        try:
+                            await asyncio.wait_for(condition.wait(), timeout=delay)
+                        except asyncio.TimeoutError:
+                            pass
+                    else:
+                        await condition.wait()
+                
+                heapq.heappop(self._queue)
+                self._tokens -= 1
+                condition.notify_all()
+        except BaseException:
+            # Drop a cancelled waiter so it does not block the queue
+            if any(e is entry for e in self._queue):
+                self._queue = [e for e in self._queue if e is not entry]
+                heapq.heapify(self._queue)
+                asyncio.ensure_future(self._notify())
+            raise
+        
+        waited = time.monotonic() - started
+        self._stats["granted"] += 1
+        self._stats["total_wait"] += waited
+        self._stats["max_wait"] = max(self._stats["max_wait"], waited)
+    
+    def report_throttled(self) -> None:
+        """Back off after the provider signalled that we are over its limit"""
+        self._backoff = min(max(self._backoff * 2, self.min_backoff), self.max_backoff)
+        self._backoff_until = time.monotonic() + self._backoff
+        self._tokens = 0.0
+        self._stats["throttled"] += 1
+    
+    def report_success(self) -> None:
+        """Relax the backoff after a successful request"""
+        self._backoff /= 2
+        if self._backoff < self.min_backoff:
+            self._backoff = 0.0
+    
+    def get_stats(self) -> Dict:
+        """Get queue depth, wait time and throttle counters"""
+        stats = dict(self._stats)
+        stats["queue_depth"] = len(self._queue)
+        stats["queue_depth_by_priority"] = {
+            name: sum(1 for e in self._queue if e[0] == priority)
+            for priority, name in PRIORITY_NAMES.items()
+        }
+        stats["avg_wait"] = stats["total_wait"] / stats["granted"] if stats["granted"] else 0.0
+        stats["backoff_remaining"] = max(0.0, self._backoff_until - time.monotonic())
+        return stats
+    
+    def _time_until_available(self) -> float:
+        """Refill the bucket and return seconds until a token can be taken"""
+        now = time.monotonic()
+        self._tokens = min(self.burst, self._tokens + (now - self._updated) * self.rate)
+        self._updated = now
+        
+        if now < self._backoff_until:
+            return self._backoff_until - now
+        if self._tokens >= 1:
+            return 0.0
+        return (1 - self._tokens) / self.rate
+    
+    def _get_condition(self) -> asyncio.Condition:
+        """Get the queue condition, created lazily so it binds to the running loop"""
+        if self._condition is None:
+            self._condition = asyncio.Condition()
+        return self._condition
+    
+    async def _notify(self) -> None:
+        """Wake waiters so the new queue head re-checks the bucket"""
+        condition = self._get_condition()
+        async with condition:
+            condition.notify_all()
@@ -1,22 +1,70 @@
+import asyncio
+import hashlib
+import json
 import numpy as np
 import pandas as pd
 from typing import Dict, List, Optional, Tuple
-from datetime import datetime, timedelta
+from datetime import datetime, time, timedelta
 from sqlalchemy.orm import Session
 
+from ..core.config import settings
 from ..models.portfolio import Portfolio, Allocation
-from ..models.portfolio_history import PortfolioSnapshot
+from ..services.cache import TTLCache
+from ..services.compute_executor import ComputeExecutor
 from ..services.market_data import MarketDataService
+from ..services.bar_store import first_full_day
+from ..services.mean_variance import MeanVarianceFrontier
+from ..services.risk_metrics import (
+    TRADING_DAYS_PER_YEAR, allocation_fingerprint, build_risk_state, compact_price_series,
+    compare_from_prices, efficient_frontier_from_prices, frontier_points, outer_join_prices,
+    sample_frontier, state_risk_metrics, ticker_max_allocations, value_at_risk_from_prices
+)
+from ..services.risk_simulation import CONFIDENCE_LEVELS
+from ..services.risk_state import IncrementalRiskState, RiskStateStore
 
 class RiskAnalyzer:
-    def __init__(self, market_data_service: MarketDataService):
+    def __init__(self, market_data_service: MarketDataService, executor: Optional[ComputeExecutor] = None):
         self.market_data = market_data_service
+        
+        # CPU-bound stages run here so large analyses do not stall the event loop
+        self.executor = executor or ComputeExecutor(
+            settings.RISK_ANALYSIS_EXECUTOR, settings.RISK_ANALYSIS_EXECUTOR_WORKERS or None
+        )
+        
+        # Risk metrics keyed by allocation fingerprint, window and latest bar date, shared by
+        # portfolios with identical allocations; plus the keys each portfolio has used
+        self._metrics_cache = TTLCache(
+            settings.RISK_METRICS_CACHE_MAX_ENTRIES, settings.RISK_METRICS_CACHE_TTL
+        )
+        # Current key per portfolio and options; a new bar or allocation replaces it, so this stays bounded
+        self._portfolio_cache_keys: Dict[int, Dict[Tuple, str]] = {}
+        
+        # Incremental risk states (running moments and drawdown) per allocation fingerprint,
+        # persisted so a new bar costs one O(n²) update instead of a full recomputation
+        self._risk_states = TTLCache(settings.RISK_STATE_MAX_ENTRIES, settings.RISK_METRICS_CACHE_TTL)
+        self._risk_state_store = RiskStateStore(settings.RISK_STATE_DIR)
+        self._portfolio_state_keys: Dict[int, Dict[Tuple, str]] = {}
+    
+    def close(self) -> None:
+        """Stop the analytics worker pool"""
+        self.executor.shutdown()
+    
+    def get_stats(self) -> Dict:
+        """Get analytics executor timings and risk metrics cache counters"""
+        return {
+            'executor': self.executor.get_stats(),
+            'metrics_cache': self._metrics_cache.get_stats(),
+            'risk_states': self._risk_states.get_stats(),
+            'risk_state_store': self._risk_state_store.get_stats()
+        }
     
     async def calculate_portfolio_risk_metrics(
         self, 
         db: Session, 
         portfolio_id: int,
-        days: int = 365
+        days: int = 365,
+        fill_policy: str = "drop",
+        correlation_format: str = "upper"
     ) -> Dict:
         """
         Calculate comprehensive risk metrics for a portfolio
@@ -25,6 +73,64 @@ class RiskAnalyzer:
         - Maximum Drawdown
         - Value at Risk (VaR)
         """
+        portfolio_weights = self._get_portfolio_weights(db, portfolio_id)
+        
+        # Get historical data for all tickers in portfolio
+        end_date = datetime.utcnow()
+        start_date = end_date - timedelta(days=days)
+        
+        # Results only change with the allocations or when a new bar closes
+        cache_options = (days, fill_policy, correlation_format)
+        cache_key = self._metrics_cache_key(portfolio_weights, cache_options)
+        if cache_key is not None:
+            cached = self._metrics_cache.get(cache_key)
+            if cached is not None:
+                return dict(cached)
+        
+        # Fast path: bring the stored risk state up to date with the bars it has not seen
+        state_key = self._risk_state_key(portfolio_weights, days, fill_policy)
+        state = await self._advance_risk_state(state_key, start_date, end_date) if state_key else None
+        excluded_tickers = {}
+        
+        if state is None:
+            price_series, excluded_tickers = await self._load_price_series(
+                list(portfolio_weights), start_date, end_date
+            )
+            
+            if not price_series:
+                reasons = "; ".join(f"{ticker}: {reason}" for ticker, reason in excluded_tickers.items())
+                raise ValueError(f"Could not retrieve historical data for any assets in portfolio ({reasons})")
+            
+            # Alignment, returns and moments are CPU-bound, run them off the event loop
+            state = await self.executor.run(
+                "risk_state",
+                build_risk_state,
+                compact_price_series(price_series),
+                portfolio_weights,
+                fill_policy
+            )
+            
+            # A state missing some assets would keep leaving them out, only keep complete ones
+            if state_key and not excluded_tickers:
+                self._store_risk_state(state_key, state)
+        
+        if state_key:
+            self._portfolio_state_keys.setdefault(portfolio_id, {})[(days, fill_policy)] = state_key
+        metrics = state_risk_metrics(state, correlation_format)
+        
+        # Tickers left out of the analysis and why
+        metrics['excluded_tickers'] = excluded_tickers
+        
+        # Bars are up to date now, so the key reflects the data just used
+        cache_key = self._metrics_cache_key(portfolio_weights, cache_options)
+        if cache_key is not None:
+            self._metrics_cache.set(cache_key, metrics)
+            self._portfolio_cache_keys.setdefault(portfolio_id, {})[cache_options] = cache_key
+        
+        return dict(metrics)
+    
+    def _get_portfolio_weights(self, db: Session, portfolio_id: int) -> Dict[str, float]:
+        """Get the allocation percentage per ticker of a portfolio, the last allocation for a ticker wins"""
         # Get portfolio and allocations
         portfolio = db.query(Portfolio).filter(Portfolio.id == portfolio_id).first()
         if not portfolio:
@@ -38,200 +144,422 @@ class RiskAnalyzer:
         if not allocations:
             raise ValueError(f"Portfolio with ID {portfolio_id} has no valid allocations")
         
-        # Get historical data for all tickers in portfolio
-        end_date = datetime.utcnow()
-        start_date = end_date - timedelta(days=days)
-        
-        asset_returns = {}
         portfolio_weights = {}
-        
         for allocation in allocations:
             if not allocation.ticker:
                 continue
-                
+            
             # Store weight for this asset
             portfolio_weights[allocation.ticker] = allocation.allocation_percentage
-            
-            try:
-                # Get historical data
-                data = await self.market_data.get_historical_data(
-                    allocation.ticker,
-                    start_date=start_date,
-                    end_date=end_date
-                )
-                
-                if not data:
-                    continue
-                
-                # Calculate daily returns
-                prices = [item['close'] for item in data]
-                dates = [item['date'] for item in data]
-                returns = [0]  # First day has no return
-                
-                for i in range(1, len(prices)):
-                    daily_return = (prices[i] - prices[i-1]) / prices[i-1]
-                    returns.append(daily_return)
-                
-                asset_returns[allocation.ticker] = {
-                    'dates': dates,
-                    'returns': returns
-                }
-            except Exception as e:
-                print(f"Error processing {allocation.ticker}: {e}")
         
-        if not asset_returns:
-            raise ValueError("Could not retrieve historical data for any assets in portfolio")
+        return portfolio_weights
+    
+    def _get_asset_classes(self, db: Session, portfolio_id: int, tickers: List[str]) -> Dict[str, str]:
+        """Get the asset class of each of a portfolio's tickers, the last allocation for a ticker wins"""
+        allocations = db.query(Allocation).filter(
+            Allocation.portfolio_id == portfolio_id,
+            Allocation.ticker.isnot(None)
+        ).all()
         
-        # Align all returns on same dates
-        common_dates = set()
-        for ticker, data in asset_returns.items():
-            if not common_dates:
-                common_dates = set(data['dates'])
-            else:
-                common_dates = common_dates.intersection(set(data['dates']))
+        asset_classes = {ticker: None for ticker in tickers}
+        for allocation in allocations:
+            if allocation.ticker in asset_classes:
+                asset_classes[allocation.ticker] = allocation.asset_class
         
-        common_dates = sorted(list(common_dates))
+        return asset_classes
+    
+    def invalidate_portfolio(self, portfolio_id: int) -> None:
+        """Drop cached risk metrics and risk states computed for a portfolio's allocations (call when they change)"""
+        for cache_key in self._portfolio_cache_keys.pop(portfolio_id, {}).values():
+            self._metrics_cache.delete(cache_key)
+        for state_key in self._portfolio_state_keys.pop(portfolio_id, {}).values():
+            self._risk_states.delete(state_key)
+            self._risk_state_store.delete(state_key)
+    
+    def _metrics_cache_key(self, portfolio_weights: Dict[str, float], options: Tuple) -> Optional[str]:
+        """
+        Build the metrics cache key, or None while any asset's latest bar date is unknown.
         
-        # Create returns dataframe
-        returns_data = {}
-        for ticker, data in asset_returns.items():
-            # Create a dictionary mapping dates to returns
-            date_to_return = dict(zip(data['dates'], data['returns']))
-            # Extract returns for common dates
-            ticker_returns = [date_to_return.get(date, 0) for date in common_dates]
-            returns_data[ticker] = ticker_returns
+        The key hashes the normalized (ticker, weight) pairs, so portfolios with
+        identical allocations share entries, together with the analysis options
+        and every asset's latest stored bar date. A new bar for any asset, not
+        only the most recent one, changes the key.
+        """
+        bar_dates = sorted(
+            (ticker, self.market_data.get_stored_bar_date(ticker)) for ticker in portfolio_weights
+        )
+        if not bar_dates or any(date is None for _, date in bar_dates):
+            return None
         
-        returns_df = pd.DataFrame(returns_data, index=common_dates)
+        fingerprint = allocation_fingerprint(portfolio_weights)
+        if fingerprint is None:
+            return None
         
-        # Calculate risk metrics
-        metrics = {}
+        payload = json.dumps([fingerprint, list(options), [[ticker, str(date)] for ticker, date in bar_dates]])
+        return hashlib.sha1(payload.encode()).hexdigest()
+    
+    def _risk_state_key(self, portfolio_weights: Dict[str, float], days: int, fill_policy: str) -> Optional[str]:
+        """Build the risk state key from the allocation fingerprint and window, None for zero weights"""
+        fingerprint = allocation_fingerprint(portfolio_weights)
+        if fingerprint is None:
+            return None
         
-        # Weights
-        weights = np.array([portfolio_weights.get(ticker, 0) for ticker in returns_df.columns])
-        weights = weights / weights.sum()  # Normalize weights
+        payload = json.dumps([fingerprint, days, fill_policy])
+        return hashlib.sha1(payload.encode()).hexdigest()
+    
+    async def _advance_risk_state(
+        self,
+        state_key: str,
+        start_date: datetime,
+        end_date: datetime
+    ) -> Optional[IncrementalRiskState]:
+        """
+        Get the stored risk state for a key, updated with bars newer than it holds.
         
-        # Portfolio returns
-        portfolio_returns = returns_df.dot(weights)
+        Only the bars after the state's last date are loaded. Returns None when
+        there is no usable state (missing, due for a full rebuild to shed
+        rounding drift, an asset failed to load, or the window is too short),
+        in which case the caller rebuilds it from the full history.
+        """
+        state = self._risk_states.get(state_key)
+        if state is None:
+            state = self._risk_state_store.load(state_key)
+            if state is None:
+                return None
+            self._risk_states.set(state_key, state)
         
-        # Volatility (annualized)
-        metrics['volatility'] = portfolio_returns.std() * np.sqrt(252)
+        if state.updates >= settings.RISK_STATE_REBUILD_INTERVAL:
+            return None
         
-        # Mean return (annualized)
-        mean_return = portfolio_returns.mean() * 252
-        metrics['expected_annual_return'] = mean_return
+        since = datetime.combine(state.last_date.item(), time()) + timedelta(days=1)
+        price_series, excluded = await self._load_price_series(
+            state.tickers, since, end_date, allow_empty=True
+        )
+        if excluded:
+            return None
         
-        # Risk-free rate (assume 2% for example)
-        risk_free_rate = 0.02
+        updates = state.updates
+        dates, _, prices = outer_join_prices(price_series)
+        state.advance(dates, prices, first_full_day(start_date))
+        if state.count < 2:
+            return None
         
-        # Sharpe ratio
-        metrics['sharpe_ratio'] = (mean_return - risk_free_rate) / metrics['volatility']
+        if state.updates != updates:
+            self._save_risk_state(state_key, state)
+        return state
+    
+    def _store_risk_state(self, state_key: str, state: IncrementalRiskState) -> None:
+        """Keep a freshly built risk state in memory and on disk"""
+        self._risk_states.set(state_key, state)
+        self._save_risk_state(state_key, state)
+    
+    def _save_risk_state(self, state_key: str, state: IncrementalRiskState) -> None:
+        """Write a risk state to disk; a failed write only costs a rebuild in other workers"""
+        try:
+            self._risk_state_store.save(state_key, state)
+        except OSError as e:
+            print(f"Could not persist risk state {state_key}: {e}")
+    
+    async def _load_price_series(
+        self,
+        tickers: List[str],
+        start_date: datetime,
+        end_date: datetime,
+        allow_empty: bool = False
+    ) -> Tuple[Dict[str, Dict[str, np.ndarray]], Dict[str, str]]:
+        """
+        Load historical price arrays for several tickers concurrently.
         
-        # Maximum drawdown
-        cum_returns = (1 + portfolio_returns).cumprod()
-        rolling_max = cum_returns.cummax()
-        drawdown = (cum_returns / rolling_max) - 1
-        metrics['max_drawdown'] = drawdown.min()
+        Returns (price_series, excluded) where excluded maps each ticker that
+        could not be used to the reason it was left out. With allow_empty,
+        tickers without bars in the period are returned with empty arrays
+        instead of being excluded.
+        """
+        semaphore = asyncio.Semaphore(settings.RISK_ANALYSIS_MAX_CONCURRENT_FETCHES)
+        
+        async def load(ticker: str) -> Dict[str, np.ndarray]:
+            async with semaphore:
+                return await self.market_data.get_historical_arrays(
+                    ticker,
+                    start_date=start_date,
+                    end_date=end_date
+                )
         
-        # Value at Risk (VaR) at 95% confidence
-        metrics['var_95'] = np.percentile(portfolio_returns, 5)
+        results = await asyncio.gather(*(load(ticker) for ticker in tickers), return_exceptions=True)
         
-        # Beta (compared to market if we had market data)
-        # For now just compute correlations between assets
-        metrics['correlations'] = {}
-        for i, ticker1 in enumerate(returns_df.columns):
-            metrics['correlations'][ticker1] = {}
-            for j, ticker2 in enumerate(returns_df.columns):
-                if i <= j:  # Only compute the upper triangular matrix
-                    corr = returns_df[ticker1].corr(returns_df[ticker2])
-                    metrics['correlations'][ticker1][ticker2] = corr
+        price_series = {}
+        excluded = {}
+        for ticker, data in zip(tickers, results):
+            if isinstance(data, Exception):
+                excluded[ticker] = str(data)
+            elif len(data['date']) == 0 and not allow_empty:
+                excluded[ticker] = "No historical data in the requested period"
+            else:
+                price_series[ticker] = data
         
-        return metrics
+        return price_series, excluded
     
     async def compare_portfolios(
         self, 
         db: Session, 
         portfolio_ids: List[int],
-        days: int = 365
+        days: int = 365,
+        fill_policy: str = "drop",
+        correlation_format: str = "upper"
     ) -> Dict:
         """
         Compare risk and performance metrics of multiple portfolios
+        
+        Portfolios and allocations are read in one query each, every ticker
+        held by any portfolio is loaded once, and all portfolios sharing the
+        same usable dates are evaluated with one matrix product against a
+        single aligned returns matrix. Portfolios that cannot be analysed
+        are left out, as before.
         """
-        results = {}
+        portfolios = db.query(Portfolio).filter(Portfolio.id.in_(portfolio_ids)).all()
+        allocations = db.query(Allocation).filter(
+            Allocation.portfolio_id.in_(portfolio_ids),
+            Allocation.ticker.isnot(None)  # Must have ticker for analysis
+        ).all()
+        
+        # Weight per ticker for each portfolio, the last allocation for a ticker wins
+        portfolio_weights: Dict[int, Dict[str, float]] = {portfolio.id: {} for portfolio in portfolios}
+        for allocation in allocations:
+            if allocation.ticker and allocation.portfolio_id in portfolio_weights:
+                portfolio_weights[allocation.portfolio_id][allocation.ticker] = allocation.allocation_percentage
         
+        end_date = datetime.utcnow()
+        start_date = end_date - timedelta(days=days)
+        all_tickers = sorted({ticker for weights in portfolio_weights.values() for ticker in weights})
+        price_series, excluded_tickers = await self._load_price_series(all_tickers, start_date, end_date)
+        
+        metrics_by_portfolio = await self.executor.run(
+            "compare",
+            compare_from_prices,
+            compact_price_series(price_series),
+            portfolio_weights,
+            excluded_tickers,
+            fill_policy,
+            correlation_format
+        )
+        
+        portfolio_by_id = {portfolio.id: portfolio for portfolio in portfolios}
+        results = {}
         for portfolio_id in portfolio_ids:
-            try:
-                metrics = await self.calculate_portfolio_risk_metrics(db, portfolio_id, days)
-                portfolio = db.query(Portfolio).filter(Portfolio.id == portfolio_id).first()
-                
-                if portfolio:
-                    results[portfolio_id] = {
-                        'name': portfolio.name,
-                        'risk_profile': portfolio.risk_profile,
-                        'metrics': metrics
-                    }
-            except Exception as e:
-                print(f"Error analyzing portfolio {portfolio_id}: {e}")
+            portfolio = portfolio_by_id.get(portfolio_id)
+            if portfolio and portfolio_id in metrics_by_portfolio:
+                results[portfolio_id] = {
+                    'name': portfolio.name,
+                    'risk_profile': portfolio.risk_profile,
+                    'metrics': metrics_by_portfolio[portfolio_id]
+                }
         
         return results
     
+    async def calculate_value_at_risk(
+        self,
+        db: Session,
+        portfolio_id: int,
+        days: int = 365,
+        confidence_levels: Tuple[float, ...] = CONFIDENCE_LEVELS,
+        horizon: int = 1,
+        method: str = "historical",
+        num_paths: int = 10000,
+        seed: Optional[int] = None,
+        fill_policy: str = "drop"
+    ) -> Dict:
+        """
+        Calculate VaR and Expected Shortfall for a portfolio
+        
+        method is "historical" (overlapping horizon returns over the window),
+        "bootstrap" (simulated paths resampling observed days) or
+        "parametric" (simulated paths from the fitted covariance); see
+        services/risk_simulation.py.
+        """
+        portfolio_weights = self._get_portfolio_weights(db, portfolio_id)
+        
+        end_date = datetime.utcnow()
+        start_date = end_date - timedelta(days=days)
+        price_series, excluded_tickers = await self._load_price_series(
+            list(portfolio_weights), start_date, end_date
+        )
+        
+        if not price_series:
+            reasons = "; ".join(f"{ticker}: {reason}" for ticker, reason in excluded_tickers.items())
+            raise ValueError(f"Could not retrieve historical data for any assets in portfolio ({reasons})")
+        
+        result = await self.executor.run(
+            "value_at_risk",
+            value_at_risk_from_prices,
+            compact_price_series(price_series),
+            portfolio_weights,
+            tuple(confidence_levels),
+            horizon,
+            method,
+            num_paths,
+            seed,
+            settings.RISK_SIMULATION_CHUNK_DRAWS,
+            fill_policy
+        )
+        result['excluded_tickers'] = excluded_tickers
+        
+        return result
+    
+    async def calculate_efficient_frontier(
+        self,
+        db: Session,
+        portfolio_id: int,
+        days: int = 365,
+        num_points: int = 50,
+        max_allocations: Optional[Dict[str, float]] = None
+    ) -> Dict:
+        """
+        Calculate the exact efficient frontier over a portfolio's assets
+        
+        Returns the frontier turning points, num_points evenly spaced
+        frontier portfolios, the maximum Sharpe ratio portfolio and where
+        the current allocation sits, plus any tickers left out.
+        max_allocations caps weights by ticker or by asset class, e.g.
+        {"US Stocks": 0.4, "AAPL": 0.1}.
+        """
+        portfolio_weights = self._get_portfolio_weights(db, portfolio_id)
+        
+        end_date = datetime.utcnow()
+        start_date = end_date - timedelta(days=days)
+        price_series, excluded_tickers = await self._load_price_series(
+            list(portfolio_weights), start_date, end_date
+        )
+        
+        if not price_series:
+            reasons = "; ".join(f"{ticker}: {reason}" for ticker, reason in excluded_tickers.items())
+            raise ValueError(f"Could not retrieve historical data for any assets in portfolio ({reasons})")
+        
+        if max_allocations:
+            # Asset class caps are split over the tickers that made it into the frontier
+            max_allocations = ticker_max_allocations(
+                max_allocations,
+                self._get_asset_classes(db, portfolio_id, list(price_series)),
+                portfolio_weights
+            )
+        
+        frontier = await self.executor.run(
+            "efficient_frontier",
+            efficient_frontier_from_prices,
+            compact_price_series(price_series),
+            portfolio_weights,
+            num_points,
+            max_allocations
+        )
+        frontier['excluded_tickers'] = excluded_tickers
+        
+        return frontier
+    
     def generate_efficient_frontier(
         self, 
         returns_df: pd.DataFrame, 
-        num_portfolios: int = 1000
+        num_portfolios: int = 1000,
+        chunk_size: Optional[int] = None,
+        seed: Optional[int] = None
     ) -> List[Dict]:
         """
         Generate the efficient frontier for a set of assets
+        
+        Samples num_portfolios random long-only portfolios in chunks and keeps
+        only those on the sampled Pareto frontier (no other sample has a
+        higher return for the same or lower volatility), plus the best
+        Sharpe ratio sample. Results are sorted by Sharpe ratio, best first.
         """
         # Get mean returns and covariance matrix
-        mean_returns = returns_df.mean() * 252
-        cov_matrix = returns_df.cov() * 252
+        mean_returns = returns_df.mean().to_numpy() * TRADING_DAYS_PER_YEAR
+        cov_matrix = returns_df.cov().to_numpy() * TRADING_DAYS_PER_YEAR
         
-        num_assets = len(mean_returns)
-        results = []
+        weights, returns, volatilities = sample_frontier(
+            mean_returns,
+            cov_matrix,
+            num_portfolios,
+            chunk_size or settings.RISK_FRONTIER_CHUNK_SIZE,
+            np.random.default_rng(seed)
+        )
         
-        # Generate random portfolios
-        for i in range(num_portfolios):
-            # Random weights
-            weights = np.random.random(num_assets)
-            weights = weights / np.sum(weights)
-            
-            # Portfolio return
-            portfolio_return = np.sum(mean_returns * weights)
-            
-            # Portfolio volatility (risk)
-            portfolio_volatility = np.sqrt(np.dot(weights.T, np.dot(cov_matrix, weights)))
-            
-            # Sharpe ratio (assuming 0% risk-free rate)
-            sharpe_ratio = portfolio_return / portfolio_volatility
-            
-            results.append({
-                'return': portfolio_return,
-                'volatility': portfolio_volatility,
-                'sharpe_ratio': sharpe_ratio,
-                'weights': {asset: weight for asset, weight in zip(returns_df.columns, weights)}
-            })
+        # Sharpe ratio (assuming 0% risk-free rate)
+        sharpe_ratios = returns / volatilities
         
-        # Sort by Sharpe ratio
-        results.sort(key=lambda x: x['sharpe_ratio'], reverse=True)
+        columns = list(returns_df.columns)
+        results = [
+            {
+                'return': float(returns[i]),
+                'volatility': float(volatilities[i]),
+                'sharpe_ratio': float(sharpe_ratios[i]),
+                'weights': dict(zip(columns, weights[i].tolist()))
+            }
+            for i in np.argsort(-sharpe_ratios)
+        ]
         
         return results
     
     def get_optimal_portfolio(
         self, 
         returns_df: pd.DataFrame, 
-        target_return: Optional[float] = None
+        target_return: Optional[float] = None,
+        max_allocations: Optional[Dict[str, float]] = None,
+        asset_classes: Optional[Dict[str, str]] = None
     ) -> Dict:
         """
-        Get the optimal portfolio based on efficient frontier analysis
+        Get the optimal portfolio on the exact long-only efficient frontier
+        
+        Without a target return this is the highest Sharpe ratio portfolio,
+        otherwise the minimum volatility portfolio for the target (clamped
+        to the attainable range). max_allocations caps the weight of
+        individual assets, e.g. {"AAPL": 0.2}, or of asset classes given
+        asset_classes mapping each column to its class.
         """
-        efficient_frontier = self.generate_efficient_frontier(returns_df)
+        frontier = self._build_frontier(returns_df, max_allocations, asset_classes)
         
         if target_return is None:
-            # Return the portfolio with the highest Sharpe ratio
-            return efficient_frontier[0]
+            # Sharpe ratio assuming 0% risk-free rate, as in generate_efficient_frontier
+            weights = frontier.max_sharpe_portfolio()
         else:
-            # Find portfolio closest to target return
-            return min(
-                efficient_frontier, 
-                key=lambda x: abs(x['return'] - target_return)
-            )
\ No newline at end of file
+            weights = frontier.portfolio_for_return(target_return)
+        
+        return frontier_points(frontier, weights, list(returns_df.columns))[0]
+    
+    def get_efficient_frontier(
+        self,
+        returns_df: pd.DataFrame,
+        num_points: int = 50,
+        max_allocations: Optional[Dict[str, float]] = None,
+        asset_classes: Optional[Dict[str, str]] = None
+    ) -> Dict:
+        """
+        Get the exact long-only efficient frontier
+        
+        Returns the turning points (where an asset enters or leaves the
+        portfolio; weights are linear in between) and num_points portfolios
+        evenly spaced in return from minimum variance to maximum return.
+        """
+        frontier = self._build_frontier(returns_df, max_allocations, asset_classes)
+        columns = list(returns_df.columns)
+        
+        return {
+            'turning_points': frontier_points(frontier, frontier.turning_weights[::-1], columns),
+            'points': frontier_points(frontier, frontier.sample(num_points), columns)
+        }
+    
+    def _build_frontier(
+        self,
+        returns_df: pd.DataFrame,
+        max_allocations: Optional[Dict[str, float]] = None,
+        asset_classes: Optional[Dict[str, str]] = None
+    ) -> MeanVarianceFrontier:
+        """Build the annualized mean-variance frontier for daily returns"""
+        mean_returns = returns_df.mean().to_numpy() * TRADING_DAYS_PER_YEAR
+        cov_matrix = returns_df.cov().to_numpy() * TRADING_DAYS_PER_YEAR
+        
+        asset_classes = asset_classes or {}
+        max_allocations = ticker_max_allocations(
+            max_allocations,
+            {column: asset_classes.get(column) for column in returns_df.columns}
+        )
+        upper_bounds = np.array([max_allocations.get(column, 1.0) for column in returns_df.columns])
+        
+        return MeanVarianceFrontier(mean_returns, cov_matrix, upper_bounds)
@@ -0,0 +1,450 @@
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+
+from ..services.mean_variance import MeanVarianceFrontier
+from ..services.risk_simulation import CONFIDENCE_LEVELS, value_at_risk
+from ..services.risk_state import IncrementalRiskState
+
+TRADING_DAYS_PER_YEAR = 252
+
+# Risk-free rate (assume 2% for example)
+RISK_FREE_RATE = 0.02
+
+# Response layouts for the correlation matrix, see format_correlations
+CORRELATION_FORMATS = ("upper", "matrix", "nested")
+
+# How dates missing for some assets are handled when aligning prices:
+# "drop" keeps only dates every asset traded, "ffill" carries the last price forward
+FILL_POLICIES = ("drop", "ffill")
+
+def align_price_series(
+    price_series: Dict[str, Dict[str, np.ndarray]],
+    fill_policy: str = "drop"
+) -> Tuple[np.ndarray, List[str], np.ndarray]:
+    """
+    Outer-join per-ticker close prices on their dates into one price matrix.
+    
+    Returns (dates, tickers, prices) where prices has one row per date and
+    one column per ticker. Rows still missing a price after applying the
+    fill policy are dropped.
+    """
+    dates, tickers, prices = outer_join_prices(price_series, fill_policy)
+    complete = ~np.isnan(prices).any(axis=1)
+    return dates[complete], tickers, prices[complete]
+
+def outer_join_prices(
+    price_series: Dict[str, Dict[str, np.ndarray]],
+    fill_policy: str = "drop"
+) -> Tuple[np.ndarray, List[str], np.ndarray]:
+    """Like align_price_series, but keeps every date with NaN where a price is still missing"""
+    if fill_policy not in FILL_POLICIES:
+        raise ValueError(f"Invalid fill policy: {fill_policy}. Must be one of: {list(FILL_POLICIES)}")
+    
+    tickers = list(price_series)
+    dates = np.unique(np.concatenate([price_series[ticker]['date'] for ticker in tickers]))
+    
+    prices = np.full((len(dates), len(tickers)), np.nan)
+    for column, ticker in enumerate(tickers):
+        rows = np.searchsorted(dates, price_series[ticker]['date'])
+        prices[rows, column] = price_series[ticker]['close']
+    
+    if fill_policy == "ffill":
+        prices = forward_fill(prices)
+    
+    return dates, tickers, prices
+
+def forward_fill(values: np.ndarray) -> np.ndarray:
+    """Replace NaNs in each column with the last preceding non-NaN value"""
+    row_index = np.where(np.isnan(values), 0, np.arange(len(values))[:, None])
+    np.maximum.accumulate(row_index, axis=0, out=row_index)
+    return values[row_index, np.arange(values.shape[1])]
+
+def simple_returns(prices: np.ndarray) -> np.ndarray:
+    """Daily simple returns for each column of a (dates x assets) price matrix"""
+    return prices[1:] / prices[:-1] - 1
+
+def portfolio_risk_metrics(returns: np.ndarray, weights: np.ndarray) -> Dict:
+    """Volatility, return, Sharpe ratio, drawdown and VaR for weighted asset returns"""
+    # Portfolio returns
+    return return_series_metrics(returns @ weights)
+
+def return_series_metrics(portfolio_returns: np.ndarray) -> Dict:
+    """Volatility, return, Sharpe ratio, drawdown and VaR for one series of portfolio returns"""
+    metrics = {}
+    
+    # Volatility (annualized)
+    metrics['volatility'] = float(portfolio_returns.std(ddof=1) * np.sqrt(TRADING_DAYS_PER_YEAR))
+    
+    # Mean return (annualized)
+    mean_return = float(portfolio_returns.mean() * TRADING_DAYS_PER_YEAR)
+    metrics['expected_annual_return'] = mean_return
+    
+    # Sharpe ratio
+    metrics['sharpe_ratio'] = (mean_return - RISK_FREE_RATE) / metrics['volatility']
+    
+    # Maximum drawdown
+    cum_returns = np.cumprod(1 + portfolio_returns)
+    rolling_max = np.maximum.accumulate(cum_returns)
+    drawdown = (cum_returns / rolling_max) - 1
+    metrics['max_drawdown'] = float(drawdown.min())
+    
+    # Value at Risk (VaR) at 95% confidence
+    metrics['var_95'] = float(np.percentile(portfolio_returns, 5))
+    
+    return metrics
+
+def correlation_matrix(returns: np.ndarray) -> np.ndarray:
+    """Pairwise correlation matrix of asset returns, from a single covariance computation"""
+    return covariance_to_correlation(np.atleast_2d(np.cov(returns, rowvar=False)))
+
+def covariance_to_correlation(covariance: np.ndarray) -> np.ndarray:
+    """Scale a covariance matrix to correlations"""
+    std = np.sqrt(np.diag(covariance))
+    with np.errstate(divide='ignore', invalid='ignore'):
+        correlation = covariance / np.outer(std, std)
+    
+    # Guard against rounding pushing values just outside [-1, 1]
+    return np.clip(correlation, -1.0, 1.0)
+
+def format_correlations(correlation: np.ndarray, tickers: List[str], fmt: str = "upper") -> Dict:
+    """
+    Format a correlation matrix for the API response.
+    
+    - "upper": labels plus the upper triangle (diagonal included) flattened row by row
+    - "matrix": labels plus the dense matrix as nested lists
+    - "nested": {ticker1: {ticker2: corr}} for the upper triangle
+    
+    Undefined correlations (e.g. a constant price series) are returned as None.
+    """
+    if fmt not in CORRELATION_FORMATS:
+        raise ValueError(f"Invalid correlation format: {fmt}. Must be one of: {list(CORRELATION_FORMATS)}")
+    
+    values = correlation.astype(object)
+    values[~np.isfinite(correlation)] = None
+    
+    if fmt == "matrix":
+        return {'labels': tickers, 'matrix': values.tolist()}
+    
+    rows, columns = np.triu_indices(len(tickers))
+    if fmt == "upper":
+        return {'labels': tickers, 'upper_triangle': values[rows, columns].tolist()}
+    
+    nested = {ticker: {} for ticker in tickers}
+    for i, j in zip(rows.tolist(), columns.tolist()):
+        nested[tickers[i]][tickers[j]] = values[i, j]
+    return nested
+
+def pareto_frontier_mask(returns: np.ndarray, volatilities: np.ndarray) -> np.ndarray:
+    """Mask of points not dominated by another with lower-or-equal volatility and higher return"""
+    # Walk points by increasing volatility, keeping each one that beats every return seen so far
+    order = np.lexsort((-returns, volatilities))
+    sorted_returns = returns[order]
+    best_before = np.maximum.accumulate(np.concatenate(([-np.inf], sorted_returns[:-1])))
+    
+    mask = np.zeros(len(returns), dtype=bool)
+    mask[order[sorted_returns > best_before]] = True
+    return mask
+
+def sample_frontier(
+    mean_returns: np.ndarray,
+    cov_matrix: np.ndarray,
+    num_portfolios: int,
+    chunk_size: int,
+    rng: np.random.Generator
+) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """
+    Monte Carlo sample long-only portfolios and keep the efficient ones.
+    
+    Weights are drawn uniformly from the simplex (Dirichlet(1, ..., 1)) one
+    chunk at a time, so memory stays bounded by chunk_size regardless of
+    num_portfolios. Returns (weights, returns, volatilities) of the Pareto
+    frontier points plus the highest Sharpe ratio sample.
+    """
+    num_assets = len(mean_returns)
+    frontier_weights = np.empty((0, num_assets))
+    frontier_returns = np.empty(0)
+    frontier_volatilities = np.empty(0)
+    best = None
+    best_sharpe = -np.inf
+    
+    remaining = num_portfolios
+    while remaining > 0:
+        size = min(chunk_size, remaining)
+        remaining -= size
+        
+        weights = rng.dirichlet(np.ones(num_assets), size)
+        returns = weights @ mean_returns
+        volatilities = np.sqrt(np.einsum('ij,ij->i', weights @ cov_matrix, weights))
+        
+        # Track the best Sharpe ratio sample, which may lie off the frontier when returns are negative
+        sharpe_ratios = returns / volatilities
+        top = int(np.argmax(sharpe_ratios))
+        if sharpe_ratios[top] > best_sharpe:
+            best_sharpe = sharpe_ratios[top]
+            best = (weights[top], returns[top], volatilities[top])
+        
+        # Frontier of (previous frontier + this chunk)
+        weights = np.vstack([frontier_weights, weights])
+        returns = np.concatenate([frontier_returns, returns])
+        volatilities = np.concatenate([frontier_volatilities, volatilities])
+        keep = pareto_frontier_mask(returns, volatilities)
+        frontier_weights, frontier_returns, frontier_volatilities = weights[keep], returns[keep], volatilities[keep]
+    
+    if best is not None and not np.any(np.all(frontier_weights == best[0], axis=1)):
+        frontier_weights = np.vstack([frontier_weights, best[0]])
+        frontier_returns = np.append(frontier_returns, best[1])
+        frontier_volatilities = np.append(frontier_volatilities, best[2])
+    
+    return frontier_weights, frontier_returns, frontier_volatilities
+
+def compare_from_prices(
+    price_series: Dict[str, Dict[str, np.ndarray]],
+    portfolio_weights: Dict[int, Dict[str, float]],
+    excluded_tickers: Dict[str, str],
+    fill_policy: str = "drop",
+    correlation_format: str = "upper"
+) -> Dict[int, Dict]:
+    """
+    Risk metrics for several portfolios from the close prices of all their tickers.
+    
+    Portfolios whose assets share the same usable dates are evaluated with
+    one matrix product against a single returns matrix. Portfolios that
+    cannot be analysed are left out of the result.
+    """
+    if price_series:
+        _, tickers, traded = outer_join_prices(price_series)
+    else:
+        tickers, traded = [], np.empty((0, 0))
+    if fill_policy not in FILL_POLICIES:
+        raise ValueError(f"Invalid fill policy: {fill_policy}. Must be one of: {list(FILL_POLICIES)}")
+    prices = forward_fill(traded) if fill_policy == "ffill" else traded
+    column_of = {ticker: column for column, ticker in enumerate(tickers)}
+    
+    # Weight vectors over the union of tickers, grouped by the dates usable for every held asset
+    groups: Dict[bytes, List[Tuple[int, np.ndarray, np.ndarray]]] = {}
+    group_rows: Dict[bytes, np.ndarray] = {}
+    for portfolio_id, weights_by_ticker in portfolio_weights.items():
+        columns = np.array(
+            [column_of[ticker] for ticker in weights_by_ticker if ticker in column_of], dtype=int
+        )
+        if len(columns) == 0:
+            print(f"Error analyzing portfolio {portfolio_id}: no historical data for any of its assets")
+            continue
+        
+        # Dates on which one of the portfolio's own assets traded and every asset has a price
+        rows = ~np.isnan(traded[:, columns]).all(axis=1) & ~np.isnan(prices[:, columns]).any(axis=1)
+        if rows.sum() < 2:
+            print(f"Error analyzing portfolio {portfolio_id}: not enough overlapping price history")
+            continue
+        
+        weights = np.zeros(len(tickers))
+        weights[columns] = [weights_by_ticker[tickers[column]] for column in columns]
+        weights /= weights.sum()  # Normalize weights
+        
+        key = rows.tobytes()
+        groups.setdefault(key, []).append((portfolio_id, columns, weights))
+        group_rows[key] = rows
+    
+    metrics_by_portfolio = {}
+    for key, members in groups.items():
+        # Assets nobody in the group holds may be missing on these dates, their weight is zero
+        returns = simple_returns(prices[group_rows[key]])
+        returns = np.where(np.isfinite(returns), returns, 0.0)
+        
+        weight_matrix = np.column_stack([weights for _, _, weights in members])
+        portfolio_returns = returns @ weight_matrix
+        
+        for i, (portfolio_id, columns, _) in enumerate(members):
+            metrics = return_series_metrics(portfolio_returns[:, i])
+            metrics['correlations'] = format_correlations(
+                correlation_matrix(returns[:, columns]),
+                [tickers[column] for column in columns],
+                correlation_format
+            )
+            metrics['excluded_tickers'] = {
+                ticker: reason for ticker, reason in excluded_tickers.items()
+                if ticker in portfolio_weights[portfolio_id]
+            }
+            metrics_by_portfolio[portfolio_id] = metrics
+    
+    return metrics_by_portfolio
+
+def allocation_fingerprint(portfolio_weights: Dict[str, float]) -> Optional[List[Tuple[str, float]]]:
+    """Sorted (ticker, normalized weight) pairs, equal for portfolios with identical allocations"""
+    total = sum(portfolio_weights.values())
+    if not total:
+        return None
+    return sorted((ticker, round(weight / total, 10)) for ticker, weight in portfolio_weights.items())
+
+def compact_price_series(price_series: Dict[str, Dict[str, np.ndarray]]) -> Dict[str, Dict[str, np.ndarray]]:
+    """Keep only the date and close arrays, the inputs analytics stages need"""
+    return {
+        ticker: {'date': data['date'], 'close': data['close']}
+        for ticker, data in price_series.items()
+    }
+
+def build_risk_state(
+    price_series: Dict[str, Dict[str, np.ndarray]],
+    portfolio_weights: Dict[str, float],
+    fill_policy: str = "drop"
+) -> IncrementalRiskState:
+    """Build the incremental risk state for one portfolio from per-ticker close prices"""
+    if fill_policy not in FILL_POLICIES:
+        raise ValueError(f"Invalid fill policy: {fill_policy}. Must be one of: {list(FILL_POLICIES)}")
+    
+    # Align all prices on one date index and compute returns for every asset at once
+    dates, tickers, traded = outer_join_prices(price_series)
+    
+    # Date each price was observed on, so forward filled prices can be aged out of the window
+    price_dates = np.where(np.isnan(traded), np.nan, dates.astype(np.int64)[:, None].astype(float))
+    if fill_policy == "ffill":
+        prices, price_dates = forward_fill(traded), forward_fill(price_dates)
+    else:
+        prices = traded
+    
+    complete = ~np.isnan(prices).any(axis=1)
+    dates, prices = dates[complete], prices[complete]
+    price_dates = price_dates[complete].astype(np.int64).astype("datetime64[D]")
+    if len(dates) < 2:
+        raise ValueError("Not enough overlapping price history to calculate risk metrics")
+    returns = simple_returns(prices)
+    
+    # Weights
+    weights = np.array([portfolio_weights.get(ticker, 0) for ticker in tickers])
+    weights = weights / weights.sum()  # Normalize weights
+    
+    return IncrementalRiskState(tickers, weights, dates, prices[-1], returns, fill_policy, price_dates)
+
+def state_risk_metrics(state: IncrementalRiskState, correlation_format: str = "upper") -> Dict:
+    """Risk metrics and asset correlations read off an incremental risk state"""
+    covariance = state.covariance()
+    weights = state.weights
+    metrics = {}
+    
+    # Volatility (annualized), the portfolio variance is w' C w
+    variance = max(float(weights @ covariance @ weights), 0.0)
+    metrics['volatility'] = float(np.sqrt(variance) * np.sqrt(TRADING_DAYS_PER_YEAR))
+    
+    # Mean return (annualized)
+    mean_return = float(state.mean @ weights * TRADING_DAYS_PER_YEAR)
+    metrics['expected_annual_return'] = mean_return
+    
+    # Sharpe ratio
+    metrics['sharpe_ratio'] = (mean_return - RISK_FREE_RATE) / metrics['volatility']
+    
+    # Maximum drawdown, tracked from the high-water mark
+    metrics['max_drawdown'] = state.max_drawdown()
+    
+    # Value at Risk (VaR) at 95% confidence
+    metrics['var_95'] = float(np.percentile(state.portfolio_returns, 5))
+    
+    # Beta (compared to market if we had market data)
+    # For now just compute correlations between assets
+    metrics['correlations'] = format_correlations(
+        covariance_to_correlation(covariance), state.tickers, correlation_format
+    )
+    
+    return metrics
+
+def ticker_max_allocations(
+    max_allocations: Optional[Dict[str, float]],
+    asset_classes: Dict[str, str],
+    portfolio_weights: Optional[Dict[str, float]] = None
+) -> Dict[str, float]:
+    """
+    Per-ticker weight caps from caps keyed by ticker or by asset class
+    
+    An asset class cap (e.g. {"US Stocks": 0.4}, as the portfolio generator
+    uses) is split across the class's tickers in proportion to their
+    portfolio weights (evenly without weights), so the class as a whole
+    stays under it. A ticker capped both ways keeps the tighter cap; caps
+    for names not in asset_classes are ignored.
+    """
+    caps = {}
+    for name, cap in (max_allocations or {}).items():
+        if cap < 0:
+            raise ValueError(f"Maximum allocation for {name} must not be negative")
+        
+        if name in asset_classes:
+            members = [name]
+            shares = np.ones(1)
+        else:
+            members = [ticker for ticker, asset_class in asset_classes.items() if asset_class == name]
+            if not members:
+                continue
+            shares = np.array([(portfolio_weights or {}).get(ticker, 0) for ticker in members], dtype=float)
+            if shares.sum() <= 0:
+                shares = np.ones(len(members))
+        
+        for ticker, share in zip(members, shares / shares.sum()):
+            caps[ticker] = min(caps.get(ticker, 1.0), cap * float(share))
+    
+    return caps
+
+def efficient_frontier_from_prices(
+    price_series: Dict[str, Dict[str, np.ndarray]],
+    portfolio_weights: Dict[str, float],
+    num_points: int = 50,
+    max_allocations: Optional[Dict[str, float]] = None
+) -> Dict:
+    """Exact efficient frontier over a portfolio's assets, with the portfolio's own position"""
+    dates, tickers, prices = align_price_series(price_series)
+    if len(dates) < 3:
+        raise ValueError("Not enough overlapping price history to calculate the efficient frontier")
+    returns = simple_returns(prices)
+    
+    max_allocations = max_allocations or {}
+    frontier = MeanVarianceFrontier(
+        returns.mean(axis=0) * TRADING_DAYS_PER_YEAR,
+        np.atleast_2d(np.cov(returns, rowvar=False)) * TRADING_DAYS_PER_YEAR,
+        np.array([max_allocations.get(ticker, 1.0) for ticker in tickers])
+    )
+    
+    weights = np.array([portfolio_weights.get(ticker, 0) for ticker in tickers])
+    weights = weights / weights.sum()
+    
+    return {
+        'turning_points': frontier_points(frontier, frontier.turning_weights[::-1], tickers),
+        'points': frontier_points(frontier, frontier.sample(num_points), tickers),
+        'max_sharpe': frontier_points(frontier, frontier.max_sharpe_portfolio(), tickers)[0],
+        'current': frontier_points(frontier, weights, tickers)[0]
+    }
+
+def value_at_risk_from_prices(
+    price_series: Dict[str, Dict[str, np.ndarray]],
+    portfolio_weights: Dict[str, float],
+    confidence_levels: Tuple[float, ...] = CONFIDENCE_LEVELS,
+    horizon: int = 1,
+    method: str = "historical",
+    num_paths: int = 10000,
+    seed: Optional[int] = None,
+    chunk_draws: int = 2_000_000,
+    fill_policy: str = "drop"
+) -> Dict:
+    """VaR and Expected Shortfall for one portfolio from per-ticker close prices"""
+    dates, tickers, prices = align_price_series(price_series, fill_policy)
+    if len(dates) < 2:
+        raise ValueError("Not enough overlapping price history to calculate VaR")
+    
+    weights = np.array([portfolio_weights.get(ticker, 0) for ticker in tickers])
+    weights = weights / weights.sum()  # Normalize weights
+    
+    return value_at_risk(
+        simple_returns(prices), weights, confidence_levels, horizon, method, num_paths, seed, chunk_draws
+    )
+
+def frontier_points(frontier: MeanVarianceFrontier, weights: np.ndarray, tickers: List[str]) -> List[Dict]:
+    """Format weight vectors as return / volatility / Sharpe ratio (0% risk-free rate) / weights dicts"""
+    weights = np.atleast_2d(weights)
+    returns, volatilities = frontier.statistics(weights)
+    
+    return [
+        {
+            'return': float(returns[i]),
+            'volatility': float(volatilities[i]),
+            'sharpe_ratio': float(returns[i] / volatilities[i]) if volatilities[i] > 0 else 0.0,
+            'weights': dict(zip(tickers, weights[i].tolist()))
+        }
+        for i in range(len(weights))
+    ]
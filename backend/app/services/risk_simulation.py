@@ -0,0 +1,129 @@
+import time
+from typing import Dict, Optional, Sequence
+
+import numpy as np
+
+# Default confidence levels for VaR / Expected Shortfall
+CONFIDENCE_LEVELS = (0.95, 0.975, 0.99)
+
+# "historical": overlapping horizon returns of the observed portfolio returns
+# "bootstrap": Monte Carlo paths resampling observed trading days with replacement
+# "parametric": Monte Carlo paths drawn from the fitted mean and covariance (normal)
+VAR_METHODS = ("historical", "bootstrap", "parametric")
+
+def horizon_returns(daily_returns: np.ndarray, horizon: int) -> np.ndarray:
+    """Compounded returns over every window of `horizon` consecutive days (overlapping)"""
+    log_growth = np.concatenate(([0.0], np.cumsum(np.log1p(daily_returns))))
+    return np.expm1(log_growth[horizon:] - log_growth[:-horizon])
+
+def tail_statistics(returns: np.ndarray, confidence_levels: Sequence[float]) -> Dict[str, Dict]:
+    """
+    VaR and Expected Shortfall (CVaR) of a return sample per confidence level.
+    
+    Both are reported as returns, like var_95 in the risk metrics: VaR is the
+    (1 - confidence) quantile and CVaR the mean return at or below it, so a
+    loss shows up as a negative number.
+    """
+    sorted_returns = np.sort(returns)
+    tail_sums = np.cumsum(sorted_returns)
+    
+    stats = {}
+    for confidence in confidence_levels:
+        var = float(np.percentile(sorted_returns, (1 - confidence) * 100))
+        tail_count = int(np.searchsorted(sorted_returns, var, side="right"))
+        cvar = float(tail_sums[tail_count - 1] / tail_count) if tail_count else var
+        stats[f"{confidence * 100:g}"] = {"var": var, "cvar": cvar}
+    return stats
+
+def simulate_horizon_returns(
+    asset_returns: np.ndarray,
+    weights: np.ndarray,
+    horizon: int,
+    num_paths: int,
+    method: str,
+    rng: np.random.Generator,
+    chunk_draws: int
+) -> np.ndarray:
+    """
+    Simulate num_paths compounded portfolio returns over `horizon` days.
+    
+    Paths are generated in chunks of about chunk_draws daily draws, so
+    memory is bounded by the chunk plus one float per path. Weights are
+    held constant (rebalanced daily) along each path.
+    """
+    if method == "bootstrap":
+        # Resampling whole days keeps the cross-asset dependence of each day
+        daily_portfolio_returns = asset_returns @ weights
+    else:
+        # A fixed-weight combination of normal asset returns is normal, so drawing the
+        # portfolio return from its fitted mean and variance is exact and n times cheaper
+        mean = float(asset_returns.mean(axis=0) @ weights)
+        cov_matrix = np.atleast_2d(np.cov(asset_returns, rowvar=False))
+        std = float(np.sqrt(max(weights @ cov_matrix @ weights, 0.0)))
+    
+    chunk_paths = max(1, chunk_draws // horizon)
+    results = np.empty(num_paths)
+    for start in range(0, num_paths, chunk_paths):
+        size = min(chunk_paths, num_paths - start)
+        if method == "bootstrap":
+            days = rng.integers(0, len(daily_portfolio_returns), size=(size, horizon))
+            paths = daily_portfolio_returns[days]
+        else:
+            paths = rng.normal(mean, std, size=(size, horizon))
+        results[start:start + size] = np.expm1(np.log1p(paths).sum(axis=1))
+    
+    return results
+
+def value_at_risk(
+    asset_returns: np.ndarray,
+    weights: np.ndarray,
+    confidence_levels: Sequence[float] = CONFIDENCE_LEVELS,
+    horizon: int = 1,
+    method: str = "historical",
+    num_paths: int = 10000,
+    seed: Optional[int] = None,
+    chunk_draws: int = 2_000_000
+) -> Dict:
+    """
+    VaR and Expected Shortfall of a portfolio over a horizon of trading days.
+    
+    asset_returns is a (days x assets) matrix of daily simple returns and
+    weights the normalized portfolio weights. Returns the tail statistics
+    per confidence level (keyed "95", "97.5", "99") with the run settings
+    and how long the run took.
+    """
+    if method not in VAR_METHODS:
+        raise ValueError(f"Invalid VaR method: {method}. Must be one of: {list(VAR_METHODS)}")
+    if horizon < 1:
+        raise ValueError("VaR horizon must be at least one day")
+    for confidence in confidence_levels:
+        if not 0.5 <= confidence < 1:
+            raise ValueError(f"Invalid confidence level: {confidence}. Must be between 0.5 and 1")
+    
+    started = time.perf_counter()
+    
+    if method == "historical":
+        if len(asset_returns) < horizon + 1:
+            raise ValueError(f"Not enough price history for a {horizon}-day historical VaR")
+        sample = horizon_returns(asset_returns @ weights, horizon)
+        num_paths = None
+        seed = None
+    else:
+        if len(asset_returns) < 2:
+            raise ValueError("Not enough price history to simulate VaR")
+        if num_paths < 1:
+            raise ValueError("Number of simulated paths must be positive")
+        sample = simulate_horizon_returns(
+            asset_returns, weights, horizon, num_paths, method,
+            np.random.default_rng(seed), chunk_draws
+        )
+    
+    return {
+        "method": method,
+        "horizon_days": horizon,
+        "paths": num_paths,
+        "seed": seed,
+        "observations": len(asset_returns),
+        "levels": tail_statistics(sample, confidence_levels),
+        "elapsed_seconds": time.perf_counter() - started,
+    }
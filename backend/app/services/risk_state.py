@@ -0,0 +1,339 @@
+import io
+import json
+import os
+import re
+import tempfile
+from typing import Dict, List, Optional
+
+import numpy as np
+
+# Smallest number of rows allocated for a window's buffers, which double when full
+MIN_BUFFER_ROWS = 64
+
+class IncrementalRiskState:
+    """
+    Running risk statistics for one portfolio over a sliding date window.
+    
+    Keeps the window's aligned asset returns together with Welford-style
+    running mean and co-moment (M2) matrix, so appending a new bar or
+    dropping the oldest one costs O(n²) for n assets instead of a pass
+    over the whole history. The portfolio's max drawdown is tracked with a
+    high-water mark; it is only recomputed (over the 1-D portfolio return
+    series) when the bar leaving the window was the peak it depends on.
+    
+    The window's rows live in buffers with spare capacity: a new bar is
+    written after the last row and a dropped bar only moves the start
+    offset, so neither copies the window. dates, price_dates, returns and
+    portfolio_returns are views of the rows currently in the window.
+    """
+    
+    def __init__(
+        self,
+        tickers: List[str],
+        weights: np.ndarray,
+        dates: np.ndarray,
+        last_prices: np.ndarray,
+        returns: np.ndarray,
+        fill_policy: str = "drop",
+        price_dates: Optional[np.ndarray] = None,
+        mean: Optional[np.ndarray] = None,
+        m2: Optional[np.ndarray] = None,
+        updates: int = 0
+    ):
+        self.tickers = list(tickers)
+        self.weights = np.asarray(weights, dtype=float)
+        self.fill_policy = fill_policy
+        self.last_prices = np.asarray(last_prices, dtype=float)
+        self.updates = updates  # Bars added or removed since the last full build
+        
+        # Row i of the buffers holds a price row and the returns ending on it (none for the first row)
+        dates = np.asarray(dates, dtype="datetime64[D]")
+        returns = np.asarray(returns, dtype=float).reshape(-1, len(self.tickers))
+        # Date each price was actually observed on, earlier than the row date when forward filled
+        if price_dates is None:
+            price_dates = np.repeat(dates[:, None], len(self.tickers), axis=1)
+        rows = len(dates)
+        self._allocate(max(MIN_BUFFER_ROWS, 2 * rows))
+        self._start, self._end = 0, rows
+        self._dates[:rows] = dates
+        self._price_dates[:rows] = np.asarray(price_dates, dtype="datetime64[D]")
+        self._returns[1:rows] = returns
+        self._portfolio_returns[1:rows] = returns @ self.weights
+        
+        if mean is None or m2 is None:
+            mean = returns.mean(axis=0) if len(returns) else np.zeros(len(self.tickers))
+            deviations = returns - mean
+            m2 = deviations.T @ deviations
+        self.mean = np.asarray(mean, dtype=float)
+        self.m2 = np.asarray(m2, dtype=float)
+        self._rebuild_drawdown()
+    
+    @property
+    def dates(self) -> np.ndarray:
+        """Price row dates in the window, one more than returns"""
+        return self._dates[self._start:self._end]
+    
+    @property
+    def price_dates(self) -> np.ndarray:
+        """Date each price in the window was observed on, per row and ticker"""
+        return self._price_dates[self._start:self._end]
+    
+    @property
+    def returns(self) -> np.ndarray:
+        """Asset returns in the window, one row per price row after the first"""
+        return self._returns[self._start + 1:self._end]
+    
+    @property
+    def portfolio_returns(self) -> np.ndarray:
+        """Weighted portfolio returns in the window"""
+        return self._portfolio_returns[self._start + 1:self._end]
+    
+    @property
+    def count(self) -> int:
+        """Number of return observations in the window"""
+        return max(self._end - self._start - 1, 0)
+    
+    @property
+    def last_date(self) -> np.datetime64:
+        """Date of the most recent price row"""
+        return self.dates[-1]
+    
+    def covariance(self) -> np.ndarray:
+        """Sample covariance (ddof=1) of the asset returns in the window"""
+        return self.m2 / (self.count - 1)
+    
+    def advance(self, dates: np.ndarray, prices: np.ndarray, first_day: np.datetime64) -> int:
+        """
+        Add new aligned price rows and drop the rows before first_day.
+        
+        prices has one column per ticker, in self.tickers order, with NaN
+        where a price is missing. Rows not after the last stored date are
+        ignored, so a concurrent caller passing the same bars twice is
+        harmless. Returns the number of bars added.
+        """
+        newer = dates > self.last_date
+        dates, prices = dates[newer], prices[newer]
+        
+        price_dates = np.where(np.isnan(prices), np.datetime64("NaT"), dates[:, None])
+        if self.fill_policy == "ffill" and len(prices):
+            # Carry the last stored prices (and the dates they were observed) into the new rows
+            filled = np.vstack([self.last_prices, prices])
+            row_index = np.where(np.isnan(filled), 0, np.arange(len(filled))[:, None])
+            np.maximum.accumulate(row_index, axis=0, out=row_index)
+            columns = np.arange(filled.shape[1])
+            prices = filled[row_index, columns][1:]
+            price_dates = np.vstack([self.price_dates[-1:], price_dates])[row_index, columns][1:]
+        
+        added = 0
+        for date, row, row_price_dates in zip(dates, prices, price_dates):
+            if np.isnan(row).any():
+                continue
+            self._append(date, row / self.last_prices - 1, row, row_price_dates)
+            added += 1
+        
+        # Forward filling only carries prices observed within the window, so (like
+        # align_price_series on the window) it starts once every asset has a price in it
+        while len(self.dates) > 1 and self.price_dates[0].min() < first_day:
+            self._remove_oldest()
+        
+        return added
+    
+    def max_drawdown(self) -> float:
+        """Largest peak-to-trough decline of the portfolio within the window"""
+        return self._max_drawdown
+    
+    def to_bytes(self) -> bytes:
+        """Serialize the state as an .npz archive"""
+        buffer = io.BytesIO()
+        np.savez(
+            buffer,
+            weights=self.weights,
+            dates=self.dates,
+            last_prices=self.last_prices,
+            returns=self.returns,
+            price_dates=self.price_dates,
+            mean=self.mean,
+            m2=self.m2,
+            meta=np.array(json.dumps({
+                "tickers": self.tickers,
+                "fill_policy": self.fill_policy,
+                "updates": self.updates,
+            })),
+        )
+        return buffer.getvalue()
+    
+    @classmethod
+    def from_bytes(cls, data: bytes) -> "IncrementalRiskState":
+        """Restore a state written by to_bytes"""
+        with np.load(io.BytesIO(data)) as archive:
+            meta = json.loads(str(archive["meta"]))
+            state = cls(
+                meta["tickers"],
+                archive["weights"],
+                archive["dates"],
+                archive["last_prices"],
+                archive["returns"],
+                meta["fill_policy"],
+                price_dates=archive["price_dates"],
+                mean=archive["mean"],
+                m2=archive["m2"],
+                updates=meta["updates"],
+            )
+        return state
+    
+    def _append(
+        self,
+        date: np.datetime64,
+        asset_returns: np.ndarray,
+        prices: np.ndarray,
+        price_dates: np.ndarray
+    ) -> None:
+        """Welford update with one new observation"""
+        if self._end == len(self._dates):
+            self._make_room()
+        row = self._end
+        portfolio_return = float(asset_returns @ self.weights)
+        self._dates[row] = date
+        self._price_dates[row] = price_dates
+        self._returns[row] = asset_returns
+        self._portfolio_returns[row] = portfolio_return
+        self._end += 1
+        self.last_prices = prices
+        self.updates += 1
+        
+        count = self.count
+        delta = asset_returns - self.mean
+        self.mean = self.mean + delta / count
+        self.m2 = self.m2 + np.outer(delta, asset_returns - self.mean)
+        
+        # Extend the drawdown from the high-water mark
+        self._log_wealth += np.log1p(portfolio_return)
+        if self._log_wealth > self._peak:
+            self._peak, self._peak_index = self._log_wealth, count - 1
+        drawdown = float(np.expm1(self._log_wealth - self._peak))
+        if drawdown < self._max_drawdown:
+            self._max_drawdown, self._drawdown_peak_index = drawdown, self._peak_index
+    
+    def _remove_oldest(self) -> None:
+        """Reverse Welford update dropping the oldest observation"""
+        oldest = self.returns[0].copy()
+        count = self.count
+        removed_return = self.portfolio_returns[0]
+        self._start += 1
+        self.updates += 1
+        
+        if count <= 1:
+            self.mean = np.zeros(len(self.tickers))
+            self.m2 = np.zeros((len(self.tickers), len(self.tickers)))
+        else:
+            previous_mean = self.mean - (oldest - self.mean) / (count - 1)
+            self.m2 = self.m2 - np.outer(oldest - previous_mean, oldest - self.mean)
+            self.mean = previous_mean
+        
+        if self._peak_index == 0 or self._drawdown_peak_index == 0:
+            # The peak left the window, rescan the (1-D) portfolio returns
+            self._rebuild_drawdown()
+        else:
+            # Wealth is measured from the window start, shift it by the removed return
+            shift = np.log1p(removed_return)
+            self._log_wealth -= shift
+            self._peak -= shift
+            self._peak_index -= 1
+            self._drawdown_peak_index -= 1
+    
+    def _allocate(self, capacity: int) -> None:
+        """Allocate empty window buffers with room for capacity rows"""
+        num_assets = len(self.tickers)
+        self._dates = np.empty(capacity, dtype="datetime64[D]")
+        self._price_dates = np.empty((capacity, num_assets), dtype="datetime64[D]")
+        self._returns = np.empty((capacity, num_assets))
+        self._portfolio_returns = np.empty(capacity)
+    
+    def _make_room(self) -> None:
+        """Free rows after the window: slide it to the front, or double the buffers if it fills half"""
+        rows = self._end - self._start
+        buffers = (self._dates, self._price_dates, self._returns, self._portfolio_returns)
+        if 2 * rows > len(self._dates):
+            self._allocate(2 * len(self._dates))
+        for old, new in zip(buffers, (self._dates, self._price_dates, self._returns, self._portfolio_returns)):
+            new[:rows] = old[self._start:self._end]
+        self._start, self._end = 0, rows
+    
+    def _rebuild_drawdown(self) -> None:
+        """Recompute the high-water mark and max drawdown from the portfolio returns"""
+        if len(self.portfolio_returns) == 0:
+            self._log_wealth, self._peak, self._peak_index = 0.0, -np.inf, -1
+            self._max_drawdown, self._drawdown_peak_index = 0.0, -1
+            return
+        
+        log_wealth = np.cumsum(np.log1p(self.portfolio_returns))
+        running_peak = np.maximum.accumulate(log_wealth)
+        drawdowns = np.expm1(log_wealth - running_peak)
+        trough = int(np.argmin(drawdowns))
+        
+        self._log_wealth = float(log_wealth[-1])
+        self._peak_index = int(np.argmax(log_wealth))
+        self._peak = float(log_wealth[self._peak_index])
+        self._max_drawdown = float(drawdowns[trough])
+        self._drawdown_peak_index = int(np.argmax(log_wealth[:trough + 1]))
+
+class RiskStateStore:
+    """
+    On-disk store of incremental risk states, one .npz file per key.
+    
+    Writes go to a temporary file that is atomically renamed into place, as
+    in HistoricalBarStore, so workers sharing the directory never read a
+    partially written state.
+    """
+    
+    def __init__(self, root_dir: str):
+        self.root_dir = root_dir
+        os.makedirs(self.root_dir, exist_ok=True)
+        self._stats = {"reads": 0, "writes": 0, "errors": 0}
+    
+    def load(self, key: str) -> Optional[IncrementalRiskState]:
+        """Load the state stored under a key, or None if missing or unreadable"""
+        path = self._path(key)
+        if not os.path.exists(path):
+            return None
+        
+        try:
+            with open(path, "rb") as f:
+                state = IncrementalRiskState.from_bytes(f.read())
+        except Exception as e:
+            self._stats["errors"] += 1
+            print(f"Could not read risk state {key}: {e}")
+            return None
+        
+        self._stats["reads"] += 1
+        return state
+    
+    def save(self, key: str, state: IncrementalRiskState) -> None:
+        """Atomically replace the state stored under a key"""
+        tmp_path = None
+        try:
+            fd, tmp_path = tempfile.mkstemp(dir=self.root_dir, suffix=".tmp")
+            with os.fdopen(fd, "wb") as f:
+                f.write(state.to_bytes())
+            os.replace(tmp_path, self._path(key))
+        except Exception:
+            self._stats["errors"] += 1
+            if tmp_path is not None and os.path.exists(tmp_path):
+                os.unlink(tmp_path)
+            raise
+        self._stats["writes"] += 1
+    
+    def delete(self, key: str) -> None:
+        """Remove the state stored under a key, if any"""
+        path = self._path(key)
+        if os.path.exists(path):
+            os.unlink(path)
+    
+    def get_stats(self) -> Dict:
+        """Get read, write and error (failed read or write) counters"""
+        return dict(self._stats)
+    
+    def _path(self, key: str) -> str:
+        """Get the file path for a key"""
+        safe_key = re.sub(r"[^A-Za-z0-9._-]", "_", key)
+        return os.path.join(self.root_dir, f"{safe_key}.npz")
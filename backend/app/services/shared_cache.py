@@ -0,0 +1,197 @@
+import asyncio
+import os
+import sqlite3
+import threading
+import time
+from typing import Dict, Optional, Tuple
+
+class SharedCacheBackend:
+    """
+    Second-tier cache shared by all workers (and surviving restarts).
+    
+    Values are opaque bytes; callers handle serialization. Backends only
+    need to implement _get/_set/_delete; errors are counted and swallowed by
+    the public methods so a broken shared tier degrades to a cache miss.
+    """
+    
+    def __init__(self):
+        self._stats = {"hits": 0, "misses": 0, "writes": 0, "errors": 0}
+    
+    async def get(self, key: str) -> Optional[bytes]:
+        """Get a value, or None if missing, expired or the backend failed"""
+        try:
+            value = await self._get(key)
+        except Exception as e:
+            self._stats["errors"] += 1
+            print(f"Shared cache read failed for {key}: {e}")
+            return None
+        
+        self._stats["hits" if value is not None else "misses"] += 1
+        return value
+    
+    async def set(self, key: str, value: bytes, ttl: Optional[float] = None) -> None:
+        """Store a value, expiring after ttl seconds (None keeps it until overwritten)"""
+        try:
+            await self._set(key, value, ttl)
+            self._stats["writes"] += 1
+        except Exception as e:
+            self._stats["errors"] += 1
+            print(f"Shared cache write failed for {key}: {e}")
+    
+    async def delete(self, key: str) -> None:
+        """Remove a key if present"""
+        try:
+            await self._delete(key)
+        except Exception as e:
+            self._stats["errors"] += 1
+            print(f"Shared cache delete failed for {key}: {e}")
+    
+    async def close(self) -> None:
+        """Release any connections held by the backend"""
+        pass
+    
+    def get_stats(self) -> Dict:
+        """Get hit, miss, write and error counters"""
+        stats = dict(self._stats)
+        stats["backend"] = type(self).__name__
+        return stats
+    
+    async def _get(self, key: str) -> Optional[bytes]:
+        raise NotImplementedError
+    
+    async def _set(self, key: str, value: bytes, ttl: Optional[float]) -> None:
+        raise NotImplementedError
+    
+    async def _delete(self, key: str) -> None:
+        raise NotImplementedError
+
+class MemorySharedCache(SharedCacheBackend):
+    """In-process stand-in for the shared tier, for tests and single-worker setups"""
+    
+    def __init__(self):
+        super().__init__()
+        self._entries: Dict[str, Tuple[bytes, Optional[float]]] = {}
+    
+    async def _get(self, key: str) -> Optional[bytes]:
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        value, expires_at = entry
+        if expires_at is not None and time.time() >= expires_at:
+            del self._entries[key]
+            return None
+        return value
+    
+    async def _set(self, key: str, value: bytes, ttl: Optional[float]) -> None:
+        expires_at = time.time() + ttl if ttl is not None else None
+        self._entries[key] = (value, expires_at)
+    
+    async def _delete(self, key: str) -> None:
+        self._entries.pop(key, None)
+
+class SQLiteSharedCache(SharedCacheBackend):
+    """
+    Shared tier backed by a local SQLite file.
+    
+    Shared by every worker on the host and kept across restarts. WAL mode
+    lets readers proceed while a worker writes; queries run in the default
+    executor so they do not block the event loop.
+    """
+    
+    # Purge expired rows every this many writes
+    PURGE_INTERVAL = 500
+    
+    def __init__(self, path: str):
+        super().__init__()
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        
+        self._lock = threading.Lock()
+        self._writes_since_purge = 0
+        self._conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS cache ("
+            "key TEXT PRIMARY KEY, value BLOB NOT NULL, expires_at REAL)"
+        )
+    
+    async def close(self) -> None:
+        await self._run(self._conn.close)
+    
+    async def _get(self, key: str) -> Optional[bytes]:
+        def query():
+            row = self._conn.execute(
+                "SELECT value FROM cache WHERE key = ? AND (expires_at IS NULL OR expires_at > ?)",
+                (key, time.time()),
+            ).fetchone()
+            return row[0] if row else None
+        return await self._run(query)
+    
+    async def _set(self, key: str, value: bytes, ttl: Optional[float]) -> None:
+        expires_at = time.time() + ttl if ttl is not None else None
+        
+        def write():
+            self._conn.execute(
+                "INSERT OR REPLACE INTO cache (key, value, expires_at) VALUES (?, ?, ?)",
+                (key, sqlite3.Binary(value), expires_at),
+            )
+            self._writes_since_purge += 1
+            if self._writes_since_purge >= self.PURGE_INTERVAL:
+                self._writes_since_purge = 0
+                self._conn.execute("DELETE FROM cache WHERE expires_at <= ?", (time.time(),))
+        await self._run(write)
+    
+    async def _delete(self, key: str) -> None:
+        await self._run(lambda: self._conn.execute("DELETE FROM cache WHERE key = ?", (key,)))
+    
+    async def _run(self, func):
+        """Run a database call in the executor, one at a time on the shared connection"""
+        def locked():
+            with self._lock:
+                return func()
+        return await asyncio.get_running_loop().run_in_executor(None, locked)
+
+class RedisSharedCache(SharedCacheBackend):
+    """Shared tier backed by Redis (or any Redis-protocol server); needs the redis package"""
+    
+    def __init__(self, url: str):
+        super().__init__()
+        try:
+            import redis.asyncio as aioredis
+        except ImportError:
+            raise ImportError("RedisSharedCache requires the 'redis' package (redis>=4.2)")
+        self._client = aioredis.from_url(url)
+    
+    async def close(self) -> None:
+        await self._client.close()
+    
+    async def _get(self, key: str) -> Optional[bytes]:
+        return await self._client.get(key)
+    
+    async def _set(self, key: str, value: bytes, ttl: Optional[float]) -> None:
+        if ttl is not None:
+            await self._client.set(key, value, px=max(1, int(ttl * 1000)))
+        else:
+            await self._client.set(key, value)
+    
+    async def _delete(self, key: str) -> None:
+        await self._client.delete(key)
+
+def create_shared_cache(url: str) -> Optional[SharedCacheBackend]:
+    """
+    Create a shared cache backend from a URL, or None if url is empty.
+    
+    Supported: "memory://", "sqlite:///relative/path.db" or
+    "sqlite:////absolute/path.db", and "redis://host:port/db".
+    """
+    if not url:
+        return None
+    if url.startswith("memory://"):
+        return MemorySharedCache()
+    if url.startswith("sqlite:///"):
+        return SQLiteSharedCache(url[len("sqlite:///"):])
+    if url.startswith(("redis://", "rediss://", "unix://")):
+        return RedisSharedCache(url)
+    raise ValueError(f"Unsupported shared cache URL: {url}")
@@ -0,0 +1,137 @@
+import asyncio
+from datetime import datetime, timedelta
+from typing import Callable, Dict, Optional
+
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+
+from ..models.portfolio_history import SnapshotJobRun
+from .performance_tracker import PerformanceTracker
+
+class SnapshotScheduler:
+    """
+    Runs the batch snapshot job in-process once a day.
+    
+    Prefer running `python -m app.snapshot_job` from cron (or a scheduled
+    container) instead; this schedule is off by default and meant for
+    single-host deployments. run_at is a "HH:MM" UTC time. Each run opens
+    its own database session from session_factory; only one run is active
+    at a time, so a manual run_once() during a scheduled one waits for it
+    instead of doubling the snapshots. With several app processes (workers
+    or replicas), every one of them wakes at run_at, but only the one that
+    claims the slot (by inserting its snapshot_job_runs row) runs the job.
+    """
+    
+    def __init__(
+        self,
+        performance_tracker: PerformanceTracker,
+        session_factory: Callable[[], Session],
+        run_at: str,
+        chunk_size: int = 1000
+    ):
+        hour, minute = (int(part) for part in run_at.split(":"))
+        if not (0 <= hour < 24 and 0 <= minute < 60):
+            raise ValueError(f"Invalid snapshot schedule: {run_at}. Must be HH:MM (UTC)")
+        
+        self.performance_tracker = performance_tracker
+        self.session_factory = session_factory
+        self.run_at = run_at
+        self.chunk_size = chunk_size
+        self._hour, self._minute = hour, minute
+        self._task: Optional[asyncio.Task] = None
+        self._lock: Optional[asyncio.Lock] = None
+        self._next_run: Optional[datetime] = None
+        self._progress = {"done": 0, "total": 0}
+        self._last_run: Optional[Dict] = None
+        self._stats = {"runs": 0, "failures": 0, "skipped": 0}
+    
+    def start(self) -> None:
+        """Start the daily loop on the running event loop"""
+        if self._task is None:
+            self._task = asyncio.create_task(self._run_forever())
+    
+    async def close(self) -> None:
+        """Stop the daily loop, cancelling a run in progress"""
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+    
+    async def run_once(self) -> Dict:
+        """Snapshot every portfolio now and return the run statistics"""
+        if self._lock is None:
+            self._lock = asyncio.Lock()
+        
+        async with self._lock:
+            self._progress = {"done": 0, "total": 0}
+            db = self.session_factory()
+            try:
+                stats = await self.performance_tracker.create_snapshots_batch(
+                    db, chunk_size=self.chunk_size, progress=self._record_progress
+                )
+            except Exception:
+                self._stats["failures"] += 1
+                raise
+            finally:
+                db.close()
+            
+            self._stats["runs"] += 1
+            self._last_run = stats
+            return stats
+    
+    def get_stats(self) -> Dict:
+        """Get the schedule, the progress of a running job and the last run's statistics"""
+        return {
+            "run_at": self.run_at,
+            "next_run": self._next_run,
+            "running": self._lock is not None and self._lock.locked(),
+            "progress": dict(self._progress),
+            "last_run": self._last_run,
+            **self._stats,
+        }
+    
+    async def _run_forever(self) -> None:
+        """Sleep until the next scheduled time, run the job, repeat"""
+        while True:
+            self._next_run = self._next_run_time(datetime.utcnow())
+            await asyncio.sleep((self._next_run - datetime.utcnow()).total_seconds())
+            try:
+                if not self._claim_run(self._next_run):
+                    self._stats["skipped"] += 1
+                    print(f"Snapshot job for {self._next_run} UTC already claimed by another process")
+                    continue
+                
+                stats = await self.run_once()
+                print(
+                    f"Snapshot job: {stats['snapshots']} snapshots in "
+                    f"{stats['elapsed_seconds']:.1f}s ({stats['portfolios_per_second']:.0f} portfolios/s)"
+                )
+            except Exception as e:
+                print(f"Snapshot job failed: {e}")
+    
+    def _claim_run(self, scheduled_for: datetime) -> bool:
+        """Claim a scheduled run for this process; False if another process already has it"""
+        db = self.session_factory()
+        try:
+            db.add(SnapshotJobRun(scheduled_for=scheduled_for))
+            db.commit()
+            return True
+        except IntegrityError:
+            db.rollback()
+            return False
+        finally:
+            db.close()
+    
+    def _next_run_time(self, now: datetime) -> datetime:
+        """Next occurrence of the scheduled time after now"""
+        next_run = now.replace(hour=self._hour, minute=self._minute, second=0, microsecond=0)
+        if next_run <= now:
+            next_run += timedelta(days=1)
+        return next_run
+    
+    def _record_progress(self, done: int, total: int) -> None:
+        """Progress callback for the batch job"""
+        self._progress = {"done": done, "total": total}
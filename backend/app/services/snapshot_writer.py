@@ -0,0 +1,109 @@
+import csv
+import io
+from typing import Dict, List
+
+from sqlalchemy import insert
+from sqlalchemy.orm import Session
+
+from ..models.portfolio_history import PortfolioSnapshot, AssetSnapshot
+from .value_rollups import update_rollups
+
+# Columns written for each asset snapshot, in COPY order
+ASSET_COLUMNS = (
+    "snapshot_id",
+    "allocation_id",
+    "asset_name",
+    "ticker",
+    "price",
+    "quantity",
+    "value",
+    "allocation_percentage",
+)
+
+# Parent rows per multi-row INSERT, keeps the bind parameters well under PostgreSQL's 65535
+MAX_VALUES_ROWS = 5000
+
+# Marks NULL in COPY input, so empty strings are kept as empty strings
+COPY_NULL = "\\N"
+
+def insert_snapshots(
+    db: Session,
+    snapshots: List[Dict],
+    assets: List[List[Dict]],
+    use_copy: bool = False
+) -> List[int]:
+    """
+    Insert portfolio snapshots and their asset rows in a few statements.
+    
+    snapshots holds the PortfolioSnapshot column values and assets the
+    AssetSnapshot rows of each snapshot (without snapshot_id). The parents
+    go in multi-row INSERT ... RETURNING statements of up to
+    MAX_VALUES_ROWS rows, the children in one executemany (batched by the
+    driver) or, with use_copy on PostgreSQL, one COPY. The value rollups
+    are updated in the same transaction. Each portfolio may appear at most
+    once per call, since the returned IDs are matched back by portfolio_id.
+    Returns the new snapshot IDs in input order; the caller commits.
+    """
+    if not snapshots:
+        return []
+    
+    portfolio_ids = [snapshot["portfolio_id"] for snapshot in snapshots]
+    if len(set(portfolio_ids)) != len(portfolio_ids):
+        raise ValueError("Each portfolio can only have one snapshot per bulk insert")
+    
+    table = PortfolioSnapshot.__table__
+    if db.get_bind().dialect.implicit_returning:
+        ids_by_portfolio = {}
+        for start in range(0, len(snapshots), MAX_VALUES_ROWS):
+            result = db.execute(
+                insert(table)
+                .values(snapshots[start:start + MAX_VALUES_ROWS])
+                .returning(table.c.id, table.c.portfolio_id)
+            )
+            # RETURNING row order is not guaranteed for multi-row VALUES, match on portfolio_id
+            ids_by_portfolio.update({portfolio_id: snapshot_id for snapshot_id, portfolio_id in result})
+        snapshot_ids = [ids_by_portfolio[portfolio_id] for portfolio_id in portfolio_ids]
+    else:
+        # No RETURNING (SQLite in development): one INSERT per parent row
+        snapshot_ids = [
+            db.execute(insert(table).values(snapshot)).inserted_primary_key[0]
+            for snapshot in snapshots
+        ]
+    
+    update_rollups(db, [
+        {**snapshot, "id": snapshot_id} for snapshot_id, snapshot in zip(snapshot_ids, snapshots)
+    ])
+    
+    rows = [
+        {**asset, "snapshot_id": snapshot_id}
+        for snapshot_id, snapshot_assets in zip(snapshot_ids, assets)
+        for asset in snapshot_assets
+    ]
+    if rows:
+        if use_copy and db.get_bind().dialect.driver == "psycopg2":
+            _copy_asset_snapshots(db, rows)
+        else:
+            db.execute(insert(AssetSnapshot.__table__), rows)
+    
+    return snapshot_ids
+
+def _copy_asset_snapshots(db: Session, rows: List[Dict]) -> None:
+    """Stream asset snapshot rows into PostgreSQL with COPY FROM STDIN"""
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    for row in rows:
+        writer.writerow([
+            COPY_NULL if row.get(column) is None else row[column] for column in ASSET_COLUMNS
+        ])
+    buffer.seek(0)
+    
+    # Runs on the session's connection, so it is part of the same transaction
+    cursor = db.connection().connection.cursor()
+    try:
+        cursor.copy_expert(
+            f"COPY {AssetSnapshot.__tablename__} ({', '.join(ASSET_COLUMNS)}) "
+            f"FROM STDIN WITH (FORMAT csv, NULL '{COPY_NULL}')",
+            buffer
+        )
+    finally:
+        cursor.close()
@@ -0,0 +1,172 @@
+from datetime import datetime, timedelta
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from sqlalchemy import case, func
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.orm import Session
+
+from ..models.portfolio_history import PortfolioSnapshot, PortfolioValueRollup
+
+# Rollup periods, finest first; buckets start like PostgreSQL's date_trunc (weeks on Monday)
+ROLLUP_PERIODS = ("day", "week", "month")
+
+# Length of the fixed-size periods, in days
+PERIOD_DAYS = {"day": 1, "week": 7}
+
+# Rollup rows per upsert statement (about 15 bind parameters each)
+MAX_UPSERT_ROWS = 2000
+
+# Snapshot columns carried over from a period's last snapshot
+LAST_SNAPSHOT_COLUMNS = ("daily_change_percent", "monthly_change_percent", "yearly_change_percent")
+
+def bucket_start(period: str, value: datetime) -> datetime:
+    """Start of the period bucket containing value"""
+    day = value.replace(hour=0, minute=0, second=0, microsecond=0)
+    if period == "day":
+        return day
+    if period == "week":
+        return day - timedelta(days=day.weekday())
+    if period == "month":
+        return day.replace(day=1)
+    raise ValueError(f"Invalid rollup period: {period}. Must be one of: {list(ROLLUP_PERIODS)}")
+
+def add_periods(period: str, bucket: datetime, count: int) -> datetime:
+    """Start of the bucket count periods after bucket (a bucket start)"""
+    if period == "month":
+        months = bucket.year * 12 + bucket.month - 1 + count
+        return bucket.replace(year=months // 12, month=months % 12 + 1)
+    return bucket + timedelta(days=PERIOD_DAYS[period] * count)
+
+def period_index(period: str, value: datetime) -> int:
+    """Number of whole periods from the epoch (1970-01-01, a Thursday) to value's bucket"""
+    bucket = bucket_start(period, value)
+    if period == "month":
+        return (bucket.year - 1970) * 12 + bucket.month - 1
+    return (bucket - bucket_start(period, datetime(1970, 1, 1))).days // PERIOD_DAYS[period]
+
+def period_index_expression(period: str, column):
+    """SQL expression for period_index of a timestamp column"""
+    if period == "month":
+        return (func.date_part("year", column) - 1970) * 12 + func.date_part("month", column) - 1
+    origin = bucket_start(period, datetime(1970, 1, 1))
+    origin_days = (origin - datetime(1970, 1, 1)).days
+    days = func.floor(func.date_part("epoch", func.date_trunc("day", column)) / 86400) - origin_days
+    return func.floor(days / PERIOD_DAYS[period])
+
+def rollup_rows(snapshots: Iterable[Dict]) -> List[Dict]:
+    """
+    Rollup rows for snapshots, merged per (portfolio, period, bucket).
+    
+    Each snapshot needs id, portfolio_id, total_value, date and the change
+    columns. The result has one row per key, as an upsert statement may
+    not touch the same row twice.
+    """
+    merged: Dict[Tuple[int, str, datetime], Dict] = {}
+    for snapshot in snapshots:
+        for period in ROLLUP_PERIODS:
+            row = {
+                "portfolio_id": snapshot["portfolio_id"],
+                "period": period,
+                "bucket": bucket_start(period, snapshot["date"]),
+                "first_date": snapshot["date"],
+                "last_date": snapshot["date"],
+                "open_value": snapshot["total_value"],
+                "close_value": snapshot["total_value"],
+                "high_value": snapshot["total_value"],
+                "low_value": snapshot["total_value"],
+                "snapshot_count": 1,
+                "last_snapshot_id": snapshot["id"],
+            }
+            row.update({column: snapshot.get(column) for column in LAST_SNAPSHOT_COLUMNS})
+            
+            key = (row["portfolio_id"], period, row["bucket"])
+            merged[key] = merge_rollup_row(merged[key], row) if key in merged else row
+    return list(merged.values())
+
+def merge_rollup_row(current: Dict, new: Dict) -> Dict:
+    """Combine two rollup rows of the same bucket"""
+    later = new if new["last_date"] >= current["last_date"] else current
+    earlier = new if new["first_date"] < current["first_date"] else current
+    return {
+        **later,
+        "first_date": earlier["first_date"],
+        "open_value": earlier["open_value"],
+        "high_value": max(current["high_value"], new["high_value"]),
+        "low_value": min(current["low_value"], new["low_value"]),
+        "snapshot_count": current["snapshot_count"] + new["snapshot_count"],
+    }
+
+def update_rollups(db: Session, snapshots: List[Dict]) -> None:
+    """
+    Fold newly written snapshots into the rollups with upserts.
+    
+    Buckets are merged in the database (INSERT ... ON CONFLICT DO UPDATE),
+    so concurrent writers and out-of-order snapshots keep the rollups
+    exact. The caller commits, normally together with the snapshots.
+    """
+    rows = rollup_rows(snapshots)
+    if not rows:
+        return
+    
+    dialect = db.get_bind().dialect.name
+    if dialect == "postgresql":
+        dialect_insert = postgresql.insert
+    elif dialect == "sqlite":
+        dialect_insert = sqlite.insert
+    else:
+        raise ValueError(f"Rollup upserts are not supported on {dialect}")
+    
+    table = PortfolioValueRollup.__table__
+    for start in range(0, len(rows), MAX_UPSERT_ROWS):
+        statement = dialect_insert(table).values(rows[start:start + MAX_UPSERT_ROWS])
+        new = statement.excluded
+        is_later = new.last_date >= table.c.last_date
+        is_earlier = new.first_date < table.c.first_date
+        
+        updates = {
+            "first_date": case((is_earlier, new.first_date), else_=table.c.first_date),
+            "open_value": case((is_earlier, new.open_value), else_=table.c.open_value),
+            "high_value": case((new.high_value > table.c.high_value, new.high_value), else_=table.c.high_value),
+            "low_value": case((new.low_value < table.c.low_value, new.low_value), else_=table.c.low_value),
+            "snapshot_count": table.c.snapshot_count + new.snapshot_count,
+        }
+        for column in ("last_date", "close_value", "last_snapshot_id") + LAST_SNAPSHOT_COLUMNS:
+            updates[column] = case((is_later, new[column]), else_=table.c[column])
+        
+        db.execute(statement.on_conflict_do_update(
+            index_elements=["portfolio_id", "period", "bucket"],
+            set_=updates
+        ))
+
+def rebuild_rollups(
+    db: Session, portfolio_ids: Optional[List[int]] = None, chunk_size: int = 10000
+) -> int:
+    """
+    Recompute the rollups of all (or the given) portfolios from their snapshots.
+    
+    Used to backfill the rollups of snapshots written before they existed.
+    Returns the number of snapshots read; the caller commits.
+    """
+    deleted = db.query(PortfolioValueRollup)
+    snapshots = db.query(
+        PortfolioSnapshot.id,
+        PortfolioSnapshot.portfolio_id,
+        PortfolioSnapshot.total_value,
+        PortfolioSnapshot.date,
+        *(getattr(PortfolioSnapshot, column) for column in LAST_SNAPSHOT_COLUMNS)
+    ).filter(PortfolioSnapshot.portfolio_id.isnot(None))
+    if portfolio_ids is not None:
+        deleted = deleted.filter(PortfolioValueRollup.portfolio_id.in_(portfolio_ids))
+        snapshots = snapshots.filter(PortfolioSnapshot.portfolio_id.in_(portfolio_ids))
+    deleted.delete(synchronize_session=False)
+    
+    count = 0
+    chunk = []
+    for snapshot in snapshots.order_by(PortfolioSnapshot.portfolio_id, PortfolioSnapshot.date).yield_per(chunk_size):
+        chunk.append(dict(snapshot._mapping))
+        if len(chunk) >= chunk_size:
+            update_rollups(db, chunk)
+            count += len(chunk)
+            chunk = []
+    update_rollups(db, chunk)
+    return count + len(chunk)
@@ -0,0 +1,95 @@
+"""
+Take a performance snapshot of every portfolio in one batch.
+
+Usage (from the backend directory):
+
+    python -m app.snapshot_job [--chunk-size N] [--portfolio ID ...]
+
+This is the preferred way to take the daily snapshots: run it once a day
+from cron (or a scheduled container) rather than enabling the in-process
+PERFORMANCE_SNAPSHOT_SCHEDULE, which every app worker would carry.
+
+With --rebuild-rollups, the value rollups are recomputed from the stored
+snapshots instead (backfill outside the migration), and no snapshot is taken.
+"""
+import argparse
+import asyncio
+import sys
+import time
+from typing import List, Optional
+
+from .core.config import settings
+from .db.session import SessionLocal
+from .services.market_data import MarketDataService
+from .services.performance_tracker import PerformanceTracker
+from .services.value_rollups import rebuild_rollups
+
+async def run(portfolio_ids: Optional[List[int]], chunk_size: int) -> dict:
+    market_data = MarketDataService()
+    await market_data.start()
+    db = SessionLocal()
+    started = time.perf_counter()
+    
+    def report(done: int, total: int) -> None:
+        rate = done / max(time.perf_counter() - started, 1e-9)
+        print(f"{done}/{total} portfolios ({rate:.0f}/s)", flush=True)
+    
+    try:
+        tracker = PerformanceTracker(market_data)
+        return await tracker.create_snapshots_batch(
+            db, portfolio_ids=portfolio_ids, chunk_size=chunk_size, progress=report
+        )
+    finally:
+        db.close()
+        await market_data.close()
+
+def rebuild(portfolio_ids: Optional[List[int]]) -> int:
+    db = SessionLocal()
+    started = time.perf_counter()
+    try:
+        count = rebuild_rollups(db, portfolio_ids=portfolio_ids)
+        db.commit()
+    finally:
+        db.close()
+    
+    print(f"Rolled up {count} snapshots in {time.perf_counter() - started:.2f}s")
+    return 0
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Snapshot every portfolio with current market prices")
+    parser.add_argument(
+        "--chunk-size", type=int, default=settings.PERFORMANCE_SNAPSHOT_CHUNK_SIZE,
+        help="portfolios written and committed per chunk"
+    )
+    parser.add_argument(
+        "--portfolio", type=int, action="append", dest="portfolio_ids",
+        help="only snapshot this portfolio (repeatable)"
+    )
+    parser.add_argument(
+        "--rebuild-rollups", action="store_true",
+        help="recompute the value rollups from the stored snapshots instead"
+    )
+    args = parser.parse_args(argv)
+    if args.chunk_size < 1:
+        parser.error("--chunk-size must be positive")
+    
+    if args.rebuild_rollups:
+        return rebuild(args.portfolio_ids)
+    
+    stats = asyncio.run(run(args.portfolio_ids, args.chunk_size))
+    
+    print(
+        f"{stats['snapshots']} snapshots, {stats['asset_snapshots']} asset snapshots, "
+        f"{stats['tickers']} tickers ({stats['price_errors']} price errors), "
+        f"{stats['failed_portfolios']} failed portfolios"
+    )
+    print(
+        f"{stats['elapsed_seconds']:.2f}s total, "
+        f"{stats['portfolios_per_second']:.0f} portfolios/s "
+        f"(load {stats.get('load_seconds', 0):.2f}s, price {stats.get('price_seconds', 0):.2f}s, "
+        f"value {stats.get('value_seconds', 0):.2f}s, write {stats.get('write_seconds', 0):.2f}s)"
+    )
+    return 1 if stats["failed_portfolios"] else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
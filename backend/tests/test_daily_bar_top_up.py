@@ -0,0 +1,46 @@
+import asyncio
+import os
+
+import numpy as np
+import pytest
+
+from app.core.config import settings
+from app.services.bar_store import BAR_DTYPE
+from app.services.market_data import MarketDataService
+
+def make_bars(first_day: str, num_days: int) -> np.ndarray:
+    bars = np.zeros(num_days, dtype=BAR_DTYPE)
+    bars["date"] = np.arange(np.datetime64(first_day), np.datetime64(first_day) + num_days)
+    bars["close"] = np.linspace(100, 110, num_days)
+    return bars
+
+@pytest.fixture
+def service(tmp_path, monkeypatch):
+    monkeypatch.setattr(settings, "MARKET_DATA_BAR_STORE_DIR", str(tmp_path / "bars"))
+    monkeypatch.setattr(settings, "MARKET_DATA_SHARED_CACHE_URL", "")
+    service = MarketDataService()
+
+    async def fail(symbol, outputsize="full", priority=None):
+        raise Exception("Alpha Vantage rate limit reached")
+
+    monkeypatch.setattr(service, "_fetch_daily_series", fail)
+    return service
+
+def test_failed_top_up_serves_stored_bars(service):
+    stored = make_bars("2025-01-01", 30)
+    service._bar_store.save("AAA", stored)
+    # Checked a day ago, so the load goes to the provider for a top-up
+    path = service._bar_store._path("AAA")
+    checked_at = os.path.getmtime(path) - 24 * 60 * 60
+    os.utime(path, (checked_at, checked_at))
+
+    bars = asyncio.run(service._load_daily_bars("AAA"))
+
+    np.testing.assert_array_equal(bars, stored)
+    assert service._bar_store_stats["failed_top_ups"] == 1
+    assert os.path.getmtime(path) == checked_at
+
+def test_failed_fetch_without_stored_bars_raises(service):
+    with pytest.raises(Exception, match="rate limit"):
+        asyncio.run(service._load_daily_bars("AAA"))
+    assert service._bar_store_stats["failed_top_ups"] == 0
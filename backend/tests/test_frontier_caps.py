@@ -0,0 +1,93 @@
+import asyncio
+from types import SimpleNamespace
+
+import numpy as np
+import pytest
+
+from app.services.risk_metrics import efficient_frontier_from_prices, ticker_max_allocations
+
+ASSET_CLASSES = {"VTI": "US Stocks", "VOO": "US Stocks", "BND": "Bonds", "GLD": "Commodities"}
+WEIGHTS = {"VTI": 30.0, "VOO": 10.0, "BND": 40.0, "GLD": 20.0}
+
+def make_price_series(seed: int = 0):
+    """Daily closes over two years, stocks with the highest expected return so caps bind"""
+    rng = np.random.default_rng(seed)
+    days = np.arange(np.datetime64("2024-01-01"), np.datetime64("2026-01-01"))
+    drifts = {"VTI": 0.0012, "VOO": 0.0011, "BND": 0.0001, "GLD": 0.0004}
+    return {
+        ticker: {"date": days, "close": 100 * np.cumprod(1 + rng.normal(drift, 0.01, len(days)))}
+        for ticker, drift in drifts.items()
+    }
+
+def class_totals(point):
+    totals = {}
+    for ticker, weight in point["weights"].items():
+        totals[ASSET_CLASSES[ticker]] = totals.get(ASSET_CLASSES[ticker], 0.0) + weight
+    return totals
+
+def all_points(frontier):
+    return frontier["turning_points"] + frontier["points"] + [frontier["max_sharpe"]]
+
+def test_class_cap_is_split_by_portfolio_weight():
+    caps = ticker_max_allocations({"US Stocks": 0.4, "GLD": 0.15}, ASSET_CLASSES, WEIGHTS)
+    assert caps == pytest.approx({"VTI": 0.3, "VOO": 0.1, "GLD": 0.15})
+
+def test_tighter_of_ticker_and_class_cap_wins():
+    caps = ticker_max_allocations({"US Stocks": 0.4, "VTI": 0.2, "VOO": 0.3}, ASSET_CLASSES, WEIGHTS)
+    assert caps == pytest.approx({"VTI": 0.2, "VOO": 0.1})
+
+def test_unknown_names_are_ignored_and_negative_caps_rejected():
+    assert ticker_max_allocations({"Real Estate": 0.1}, ASSET_CLASSES, WEIGHTS) == {}
+    with pytest.raises(ValueError):
+        ticker_max_allocations({"Bonds": -0.1}, ASSET_CLASSES, WEIGHTS)
+
+def test_frontier_respects_class_caps():
+    caps = ticker_max_allocations({"US Stocks": 0.4}, ASSET_CLASSES, WEIGHTS)
+    frontier = efficient_frontier_from_prices(make_price_series(), WEIGHTS, 20, caps)
+    uncapped = efficient_frontier_from_prices(make_price_series(), WEIGHTS, 20)
+
+    assert max(class_totals(point)["US Stocks"] for point in all_points(uncapped)) > 0.4 + 1e-6
+    for point in all_points(frontier):
+        assert class_totals(point)["US Stocks"] <= 0.4 + 1e-9
+
+def test_analyzer_applies_class_caps():
+    risk_analyzer = pytest.importorskip("app.services.risk_analyzer")
+    price_series = make_price_series()
+
+    class Query:
+        def __init__(self, rows):
+            self.rows = rows
+
+        def filter(self, *criteria):
+            return self
+
+        def first(self):
+            return self.rows[0] if self.rows else None
+
+        def all(self):
+            return self.rows
+
+    class Session:
+        def query(self, model):
+            if model is risk_analyzer.Portfolio:
+                return Query([SimpleNamespace(id=1)])
+            return Query([
+                SimpleNamespace(ticker=ticker, asset_class=ASSET_CLASSES[ticker], allocation_percentage=weight)
+                for ticker, weight in WEIGHTS.items()
+            ])
+
+    class MarketData:
+        async def get_historical_arrays(self, ticker, start_date, end_date):
+            return price_series[ticker]
+
+    analyzer = risk_analyzer.RiskAnalyzer(MarketData())
+    try:
+        frontier = asyncio.run(analyzer.calculate_efficient_frontier(
+            Session(), 1, num_points=20, max_allocations={"US Stocks": 0.4}
+        ))
+    finally:
+        analyzer.close()
+
+    assert frontier["excluded_tickers"] == {}
+    for point in all_points(frontier):
+        assert class_totals(point)["US Stocks"] <= 0.4 + 1e-9
@@ -0,0 +1,105 @@
+import numpy as np
+import pytest
+
+from app.services.mean_variance import MeanVarianceFrontier
+
+RISK_FREE_RATE = 0.02
+
+def make_moments(num_assets: int, seed: int):
+    """Annualized mean returns and covariance of correlated random daily returns"""
+    rng = np.random.default_rng(seed)
+    returns = rng.normal(0.0005, 0.01, (500, num_assets)) + rng.normal(0, 0.005, (500, 1))
+    return returns.mean(axis=0) * 252, np.cov(returns, rowvar=False) * 252
+
+def project(values: np.ndarray, upper: np.ndarray) -> np.ndarray:
+    """Euclidean projection onto {sum(w) = 1, 0 <= w <= upper}"""
+    # sum(clip(values - t, 0, upper)) falls piecewise linearly in t, with breaks at values and values - upper
+    breaks = np.sort(np.concatenate([values, values - upper]))
+    totals = np.clip(values - breaks[:, None], 0, upper).sum(axis=1)
+    k = int(np.searchsorted(-totals, -1.0))
+    if k == 0:
+        return np.clip(values - breaks[0], 0, upper)
+    shift = breaks[k - 1] + (totals[k - 1] - 1) / (totals[k - 1] - totals[k]) * (breaks[k] - breaks[k - 1])
+    return np.clip(values - shift, 0, upper)
+
+def projected_gradient(mean_returns, cov_matrix, upper, lam, iterations=3000):
+    """Reference solution of min w'Σw/2 - λ μ'w over the bounded simplex (accelerated projected gradient)"""
+    step = 1 / np.linalg.eigvalsh(cov_matrix).max()
+    weights = momentum = project(np.full(len(mean_returns), 1 / len(mean_returns)), upper)
+    t = 1.0
+    for _ in range(iterations):
+        previous = weights
+        weights = project(momentum - step * (cov_matrix @ momentum - lam * mean_returns), upper)
+        t_next = (1 + np.sqrt(1 + 4 * t * t)) / 2
+        momentum = weights + (t - 1) / t_next * (weights - previous)
+        t = t_next
+    return weights
+
+def weights_at_lambda(frontier: MeanVarianceFrontier, lam: float) -> np.ndarray:
+    """Optimal weights for λ, interpolated between the turning points around it"""
+    lambdas = frontier.lambdas
+    if lam <= lambdas[-1]:
+        return frontier.turning_weights[-1]
+    k = max(int(np.searchsorted(-lambdas, -lam)), 1)
+    upper_lambda, lower_lambda = lambdas[k - 1], lambdas[k]
+    if np.isinf(upper_lambda):
+        return frontier.turning_weights[k - 1]
+    s = (lam - lower_lambda) / (upper_lambda - lower_lambda)
+    return frontier.turning_weights[k] + s * (frontier.turning_weights[k - 1] - frontier.turning_weights[k])
+
+def sharpe_ratios(weights: np.ndarray, mean_returns: np.ndarray, cov_matrix: np.ndarray) -> np.ndarray:
+    weights = np.atleast_2d(weights)
+    volatilities = np.sqrt(np.einsum('ij,ij->i', weights @ cov_matrix, weights))
+    return (weights @ mean_returns - RISK_FREE_RATE) / volatilities
+
+@pytest.mark.parametrize("num_assets, cap", [(8, 1.0), (8, 0.3), (30, 0.1)])
+def test_frontier_weights_are_feasible(num_assets, cap):
+    mean_returns, cov_matrix = make_moments(num_assets, seed=num_assets)
+    upper = np.full(num_assets, cap)
+    frontier = MeanVarianceFrontier(mean_returns, cov_matrix, upper)
+
+    portfolios = np.vstack([
+        frontier.turning_weights,
+        frontier.sample(25),
+        frontier.max_sharpe_portfolio(RISK_FREE_RATE),
+    ])
+    assert np.allclose(portfolios.sum(axis=1), 1.0, atol=1e-9)
+    assert (portfolios >= -1e-12).all()
+    assert (portfolios <= upper + 1e-12).all()
+
+@pytest.mark.parametrize("num_assets, cap", [(8, 1.0), (8, 0.3), (30, 0.1)])
+@pytest.mark.parametrize("lam", [0.0, 0.05, 0.2, 1.0, 5.0])
+def test_frontier_matches_projected_gradient(num_assets, cap, lam):
+    mean_returns, cov_matrix = make_moments(num_assets, seed=num_assets)
+    upper = np.full(num_assets, cap)
+    frontier = MeanVarianceFrontier(mean_returns, cov_matrix, upper)
+
+    def objective(weights):
+        return 0.5 * weights @ cov_matrix @ weights - lam * mean_returns @ weights
+
+    exact = weights_at_lambda(frontier, lam)
+    reference = projected_gradient(mean_returns, cov_matrix, upper, lam)
+    assert objective(exact) <= objective(reference) + 1e-10
+    assert objective(exact) == pytest.approx(objective(reference), abs=1e-8)
+
+def test_portfolio_for_return_hits_target():
+    mean_returns, cov_matrix = make_moments(8, seed=8)
+    frontier = MeanVarianceFrontier(mean_returns, cov_matrix, np.full(8, 0.3))
+
+    target = (frontier.turning_returns[0] + frontier.turning_returns[-1]) / 2
+    assert frontier.portfolio_for_return(target) @ mean_returns == pytest.approx(target, abs=1e-12)
+
+@pytest.mark.parametrize("cap", [1.0, 0.5])
+def test_max_sharpe_beats_dense_sample(cap):
+    num_assets = 3
+    mean_returns, cov_matrix = make_moments(num_assets, seed=7)
+    upper = np.full(num_assets, cap)
+    frontier = MeanVarianceFrontier(mean_returns, cov_matrix, upper)
+    best = sharpe_ratios(frontier.max_sharpe_portfolio(RISK_FREE_RATE), mean_returns, cov_matrix)[0]
+
+    # A dense sample of the (bounded) simplex gets arbitrarily close to the optimum but never beyond it
+    samples = np.random.default_rng(0).dirichlet(np.ones(num_assets), 200_000)
+    samples = samples[(samples <= cap).all(axis=1)]
+    sampled = sharpe_ratios(samples, mean_returns, cov_matrix).max()
+    assert best >= sampled - 1e-12
+    assert best == pytest.approx(sampled, abs=1e-3)
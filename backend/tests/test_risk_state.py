@@ -0,0 +1,101 @@
+import numpy as np
+import pytest
+
+from app.services.risk_metrics import (
+    build_risk_state, outer_join_prices, portfolio_risk_metrics, state_risk_metrics
+)
+from app.services.risk_state import IncrementalRiskState, RiskStateStore
+
+WEIGHTS = {"AAA": 40.0, "BBB": 30.0, "CCC": 20.0, "DDD": 10.0}
+WINDOW_DAYS = 250
+METRICS = ("volatility", "expected_annual_return", "sharpe_ratio", "max_drawdown", "var_95")
+
+def make_price_series(seed: int = 0):
+    """Random-walk closes over three years, each ticker missing about 30% of the days"""
+    rng = np.random.default_rng(seed)
+    days = np.arange(np.datetime64("2023-01-01"), np.datetime64("2026-01-01"))
+    price_series = {}
+    for ticker in WEIGHTS:
+        closes = 100 * np.cumprod(1 + rng.normal(0.0003, 0.02, len(days)))
+        kept = rng.random(len(days)) > 0.3
+        price_series[ticker] = {"date": days[kept], "close": closes[kept]}
+    return price_series
+
+def slice_series(price_series, first_day, last_day):
+    """The bars of every ticker dated first_day to last_day, inclusive"""
+    sliced = {}
+    for ticker, data in price_series.items():
+        rows = (data["date"] >= first_day) & (data["date"] <= last_day)
+        sliced[ticker] = {"date": data["date"][rows], "close": data["close"][rows]}
+    return sliced
+
+def advance(state: IncrementalRiskState, price_series, last_day) -> np.datetime64:
+    """Feed the bars after the state's last date up to last_day, like RiskAnalyzer does"""
+    first_day = last_day - WINDOW_DAYS
+    dates, _, prices = outer_join_prices(slice_series(price_series, state.last_date + 1, last_day))
+    state.advance(dates, prices, first_day)
+    return first_day
+
+def assert_states_equal(actual: IncrementalRiskState, expected: IncrementalRiskState):
+    assert actual.tickers == expected.tickers
+    assert actual.fill_policy == expected.fill_policy
+    assert actual.updates == expected.updates
+    for name in ("weights", "dates", "last_prices", "returns", "price_dates", "mean", "m2"):
+        np.testing.assert_array_equal(getattr(actual, name), getattr(expected, name))
+    # Derived on load (a matrix product instead of one dot product per appended bar), equal up to rounding
+    np.testing.assert_allclose(actual.portfolio_returns, expected.portfolio_returns, rtol=0, atol=1e-15)
+    assert actual.max_drawdown() == pytest.approx(expected.max_drawdown(), rel=0, abs=1e-15)
+
+@pytest.mark.parametrize("fill_policy", ["drop", "ffill"])
+def test_advance_matches_full_rebuild(fill_policy):
+    price_series = make_price_series()
+    rng = np.random.default_rng(1)
+    last_day = np.datetime64("2023-12-01")
+    state = build_risk_state(slice_series(price_series, last_day - WINDOW_DAYS, last_day), WEIGHTS, fill_policy)
+
+    for _ in range(200):
+        last_day += int(rng.integers(1, 4))
+        first_day = advance(state, price_series, last_day)
+        full = build_risk_state(slice_series(price_series, first_day, last_day), WEIGHTS, fill_policy)
+
+        np.testing.assert_array_equal(state.dates, full.dates)
+        np.testing.assert_allclose(state.returns, full.returns, rtol=0, atol=1e-10)
+        np.testing.assert_allclose(state.covariance(), np.cov(full.returns, rowvar=False), rtol=0, atol=1e-10)
+
+        actual = state_risk_metrics(state)
+        expected = portfolio_risk_metrics(full.returns, full.weights)
+        for name in METRICS:
+            assert actual[name] == pytest.approx(expected[name], rel=0, abs=1e-10), name
+
+@pytest.mark.parametrize("fill_policy", ["drop", "ffill"])
+def test_state_round_trips_through_store(tmp_path, fill_policy):
+    price_series = make_price_series()
+    last_day = np.datetime64("2024-06-01")
+    state = build_risk_state(slice_series(price_series, last_day - WINDOW_DAYS, last_day), WEIGHTS, fill_policy)
+    for _ in range(20):
+        last_day += 2
+        advance(state, price_series, last_day)
+
+    store = RiskStateStore(str(tmp_path))
+    store.save("portfolio:1", state)
+    restored = store.load("portfolio:1")
+    assert_states_equal(restored, state)
+
+    # The restored state keeps updating exactly like the original
+    for _ in range(20):
+        last_day += 2
+        advance(state, price_series, last_day)
+        advance(restored, price_series, last_day)
+    assert_states_equal(restored, state)
+    assert store.get_stats() == {"reads": 1, "writes": 1, "errors": 0}
+
+def test_failed_save_is_counted(tmp_path):
+    price_series = make_price_series()
+    last_day = np.datetime64("2024-06-01")
+    state = build_risk_state(slice_series(price_series, last_day - WINDOW_DAYS, last_day), WEIGHTS)
+    store = RiskStateStore(str(tmp_path / "states"))
+    (tmp_path / "states").rmdir()
+
+    with pytest.raises(OSError):
+        store.save("portfolio:1", state)
+    assert store.get_stats() == {"reads": 0, "writes": 0, "errors": 1}